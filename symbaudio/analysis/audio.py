@@ -1,5 +1,38 @@
+import numpy
+import numpy.lib.stride_tricks
 import scipy.io.wavfile
 
+import symbaudio.utils.time
+
+@symbaudio.utils.time.PROFILER.timed("audio.frame_view")
+def frame_view(series, width, hop=None):
+    """ Views a time-series as a matrix of fixed width frames.
+
+    The frames are produced through stride tricks, so no samples are copied.
+    Each row of the result is a frame, and consecutive frames begin hop samples
+    apart (so frames overlap if hop < width). The view is read-only, and a
+    trailing partial frame is truncated.
+
+    If series has several channels (one per column), the result has a third
+    axis, with one entry per channel.
+
+    Arguments:
+    series -- an array of samples, with time along the first axis (may be strided)
+    width -- the number of samples in each frame
+    hop -- keyword argument to set the samples between frames (default: width)
+    """
+    assert(width > 0)
+    if hop is None:
+        hop = width
+    assert(hop > 0)
+    series = numpy.asarray(series)
+    count = max(0, (len(series) - width) // hop + 1)
+    stride = series.strides[0]
+    return numpy.lib.stride_tricks.as_strided(
+        series, shape=(count, width) + series.shape[1:],
+        strides=(hop * stride, stride) + series.strides[1:], writeable=False)
+
+
 class AudioFile:
     """ Wrapper class for raw scipy wave files. """
     
@@ -10,13 +43,20 @@ class AudioFile:
         frames, with negligible memory overhead.
 
         The resulting class will expose fields:
+        path -- the path the file was opened from
         sample_rate_hz -- the rate at which the wave is sampled, in Hertz
         sample_count -- the number of samples taken to produce the wave file
         channel_count -- the number of channels encoded in each sample
         raw -- the time-series of nd samples, given as a numpy matrix
 
+        A mono file is also given as a matrix, with a single column.
+
         Arguments:
         fn -- a relative or absolute path to the wave file
         """
-        self.sample_rate_hz, self.raw = scipy.io.wavfile.read(fn, mmap = True)
+        self.path = fn
+        with symbaudio.utils.time.PROFILER.scope("audio.open"):
+            self.sample_rate_hz, self.raw = scipy.io.wavfile.read(fn, mmap = True)
+        if self.raw.ndim == 1:
+            self.raw = self.raw.reshape((-1, 1))
         self.sample_count, self.channel_count = self.raw.shape
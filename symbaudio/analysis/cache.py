@@ -0,0 +1,123 @@
+import hashlib
+import json
+import numpy
+import os
+
+class FeatureCache:
+    """ A persistent, size-bounded store of first-order feature matrices.
+
+    Each entry is a .npy file, named by a digest of the audio file's path,
+    followed by a digest of its size, modification time and the analysis
+    parameters. Modifying an audio file therefore invalidates its entries.
+    Entries are evicted in least recently used order once the total size of the
+    cache exceeds its bound.
+    """
+
+    # Bumped whenever the layout of cached feature matrices changes.
+    VERSION = 1
+
+    def __init__(self, root, max_bytes=1 << 30):
+        """ Opens (or creates) a cache in the given directory.
+
+        Arguments:
+        root -- the directory in which to store entries
+        max_bytes -- keyword argument to bound the size of the cache (default: 1GiB)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _prefix(self, path):
+        """ Returns the digest of an audio file's absolute path. """
+        return hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+
+    def entry(self, path, params):
+        """ Returns the location of the entry for a file and its parameters.
+
+        Arguments:
+        path -- the path to the audio file
+        params -- a JSON-serializable dictionary of analysis parameters
+        """
+        stat = os.stat(path)
+        desc = json.dumps([FeatureCache.VERSION, stat.st_size, stat.st_mtime_ns, params],
+                          sort_keys=True)
+        digest = hashlib.sha1(desc.encode()).hexdigest()
+        return os.path.join(self.root, "%s-%s.npy" % (self._prefix(path), digest))
+
+    def load(self, path, params):
+        """ Returns the cached features for a file, or None on a miss.
+
+        Arguments:
+        path -- the path to the audio file
+        params -- a JSON-serializable dictionary of analysis parameters
+        """
+        fn = self.entry(path, params)
+        try:
+            features = numpy.load(fn)
+            os.utime(fn)
+        except (OSError, ValueError):
+            return None
+        return features
+
+    def store(self, path, params, features):
+        """ Caches the features for a file, and evicts old entries if needed.
+
+        The entry is written to a temporary file and then renamed, so that
+        concurrent readers never observe a partial entry.
+
+        Arguments:
+        path -- the path to the audio file
+        params -- a JSON-serializable dictionary of analysis parameters
+        features -- the feature matrix to cache
+        """
+        fn = self.entry(path, params)
+        tmp = "%s.%i.tmp" % (fn, os.getpid())
+        with open(tmp, "wb") as f:
+            numpy.save(f, features)
+        os.replace(tmp, fn)
+        self.evict()
+
+    def _entries(self):
+        """ Lists (mtime, size, path) for each entry in the cache. """
+        entries = []
+        for fn in os.listdir(self.root):
+            if fn.endswith(".npy"):
+                fn = os.path.join(self.root, fn)
+                try:
+                    stat = os.stat(fn)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, fn))
+        return entries
+
+    def size(self):
+        """ Returns the total size of all entries, in bytes. """
+        return sum(size for (_, size, _) in self._entries())
+
+    def evict(self):
+        """ Removes least recently used entries until the size bound is met. """
+        entries = sorted(self._entries())
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, fn) in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(fn)
+            total -= size
+
+    def invalidate(self, path=None):
+        """ Removes the entries of a single audio file, or of all files.
+
+        Arguments:
+        path -- the audio file to invalidate, or None to clear the cache (default: None)
+        """
+        prefix = "" if path is None else self._prefix(path)
+        for (_, _, fn) in self._entries():
+            if os.path.basename(fn).startswith(prefix):
+                self._remove(fn)
+
+    def _remove(self, fn):
+        """ Removes an entry, tolerating concurrent removal. """
+        try:
+            os.remove(fn)
+        except FileNotFoundError:
+            pass
@@ -1,5 +1,48 @@
 import numpy
+import symbaudio.analysis.audio
+import symbaudio.analysis.registry
 import symbaudio.analysis.spectral
+import symbaudio.utils.time
+
+def frame_features(frames, plan, fields=None):
+    """ Computes the first-order statistics for a block of frames.
+
+    The result is a matrix with a row per frame, and a column per field. Since
+    each call is independent, features which depend on the preceding frame
+    (such as flux) restart at each block; use a FeatureExtractor instead.
+
+    Arguments:
+    frames -- a matrix of temporal frames, with one frame per row
+    plan -- the SpectralPlan for a frame
+    fields -- keyword argument to name the features (default: FeatureSeries.FIELDS)
+    """
+    if fields is None:
+        fields = FeatureSeries.FIELDS
+    return symbaudio.analysis.registry.FeatureExtractor(fields, plan)(frames)
+
+# Downmixes which may be analyzed alongside (or instead of) raw channels.
+MIXES = ["mono", "mid", "side"]
+
+def mix_channels(samples, chan):
+    """ Selects a channel, or computes a downmix, from multi-channel samples.
+
+    A raw channel is returned as a view of the samples. The mono mix is the mean
+    of all channels, while the mid and side mixes are (L + R) / 2 and
+    (L - R) / 2 of a stereo signal.
+
+    Arguments:
+    samples -- an array of samples, with a channel per entry of the last axis
+    chan -- a channel index, or a name from MIXES
+    """
+    if chan == "mono":
+        return numpy.mean(samples, axis=-1)
+    elif chan == "mid" or chan == "side":
+        assert(samples.shape[-1] == 2)
+        left = samples[..., 0].astype(numpy.float64)
+        right = samples[..., 1].astype(numpy.float64)
+        return (left + right) / 2 if chan == "mid" else (left - right) / 2
+    else:
+        return samples[..., chan]
 
 class FeatureAggregation:
     """ Describes the mean and modulation of a first-order statistic. """
@@ -11,43 +54,61 @@ class FeatureAggregation:
         x -- the time series's first-order statistics
         fs -- the downsampling rate for the first-order statistics
         """
-        freqs = symbaudio.analysis.spectral.make_freq_table(fs, len(x))
-        spectrum = numpy.fft.fft(x)
-        mu, _ = symbaudio.analysis.spectral.spectral_shape(spectrum, freqs)
+        plan = symbaudio.analysis.spectral.SpectralPlan(fs, len(x))
+        mu, _ = plan.shape(plan.transform(x))
         self.mean = numpy.mean(x)
         self.modulation = mu
 
 class FeatureSeries:
     """ Provides a structure for managing series of audio features. """
 
+    # The default features (see symbaudio.analysis.registry.FEATURES).
     FIELDS = ["centroid", "spread", "energy", "zeros"]
 
-    def __init__(self, samps, size, fs):
+    def __init__(self, samps, size, fs, hop=None, fields=None):
         """ Creates a fixed length mapping of frames to features.
 
         Arguments:
         samps -- the number of samples being analyzed
         size -- the width of each frame
         fs -- the sample rate
+        hop -- keyword argument to set the samples between frames (default: size)
+        fields -- keyword argument to name the features (default: FIELDS)
 
         Note: this will truncate a partial window.
         """
-        self.downsample_hz = fs / size
-        self.count = int(samps / size)
-        self.features = numpy.ndarray((self.count, len(FeatureSeries.FIELDS)))
+        if hop is None:
+            hop = size
+        if fields is None:
+            fields = FeatureSeries.FIELDS
+        self.fields = list(fields)
+        self.downsample_hz = fs / hop
+        self.count = max(0, (samps - size) // hop + 1)
+        self.features = numpy.ndarray((self.count, len(self.fields)))
 
-    def record(self, n, centroid, spread, energy, zeros):
+    def record(self, n, *values):
         """ Records a set of metrics to a given data frame.
 
+        For the default fields, the values are the spectral centroid, the
+        spectral spread, the total energy, and the zero-crossing rate.
+
         Arguments:
         n -- sthe index of the frame
-        centroid -- the spectral centroid of the frame
-        spread -- the spectral spread of the frame
-        energy -- the total energy across the frame
-        zeros -- the zero-crossing rate for the frame
+        values -- the value of each field, in order
         """
-        self.features[n] = [centroid, spread, energy, zeros]
+        assert(len(values) == len(self.fields))
+        self.features[n] = values
 
+    def record_block(self, n, block):
+        """ Records the metrics for a block of consecutive frames.
+
+        Arguments:
+        n -- the index of the first frame in the block
+        block -- a matrix of metrics, with one row per frame (see record)
+        """
+        self.features[n:n+len(block)] = block
+
+    @symbaudio.utils.time.PROFILER.timed("features.aggregate")
     def aggregate(self):
         """ Calculates statistics over this feature set.
 
@@ -57,8 +118,8 @@ class FeatureSeries:
         agg = {}
 
         feature_count = (len(self.features) // 2) * 2
-        for i in range(0, len(FeatureSeries.FIELDS)):
-            field = FeatureSeries.FIELDS[i]
+        for i in range(0, len(self.fields)):
+            field = self.fields[i]
             seq = self.features[:feature_count,i]
             agg[field] = FeatureAggregation(seq, self.downsample_hz)
 
@@ -67,36 +128,148 @@ class FeatureSeries:
 class AudioSummary:
     """ Produces first and second order statistics about the audio. """
 
-    def __init__(self, audio, framesize=1024, chan=0):
-        """ Processes the audio across adjacent, fixed witdth windows.
+    def __init__(self, audio, framesize=1024, chan=0, blocksize=256, cache=None, real=True,
+                 hop=None, window="rect", fields=None):
+        """ Processes the audio across fixed witdth windows.
 
-        All analysis is performed in mono.
+        All analysis is performed in mono. The selected channel is viewed as a
+        matrix of frames (without copying), and the frames are analyzed in
+        blocks. Larger blocks are faster, but have a higher peak memory usage.
+        By default, frames are adjacent. A hop smaller than the frame size
+        gives overlapping frames, for a finer time resolution.
+
+        The first-order statistics are exposed as first_order (a FeatureSeries),
+        so that they may be re-aggregated. If a FeatureCache is given, they are
+        loaded from the cache when possible, and are otherwise stored to it.
 
         Arguments:
         audio -- the file to analyze
         framesize -- keyword argument to adjust the window width (default: 1024)
         chan -- keyword argument to select analysis channel (default: 0)
+        blocksize -- keyword argument to set the frames per block (default: 256)
+        cache -- keyword argument to set a FeatureCache (default: None)
+        real -- keyword argument to analyze half spectra (default: True)
+        hop -- keyword argument to set the samples between frames (default: framesize)
+        window -- keyword argument to name a window function (default: "rect")
+        fields -- keyword argument to name the features (default: FeatureSeries.FIELDS)
 
-        Note: A trailing, odd sample will be truncated in the analysis.
+        Note: A trailing, partial frame will be truncated in the analysis.
         """
+        if hop is None:
+            hop = framesize
+        if fields is None:
+            fields = FeatureSeries.FIELDS
         assert(framesize > 0)
         assert(framesize % 2 == 0)
+        assert(blocksize > 0)
+        assert(hop > 0)
         assert(0 <= chan and chan < audio.channel_count)
 
-        freqs = symbaudio.analysis.spectral.make_freq_table(audio.sample_rate_hz, framesize)
-
         self.length_s = audio.sample_count / audio.sample_rate_hz
 
-        frames = FeatureSeries(audio.sample_count, framesize, audio.sample_rate_hz)
-        for n in range(0, frames.count):
-            framestart = n * framesize
-            temporal_frame = audio.raw[framestart:framestart+framesize, chan]
-            if len(temporal_frame) % 2 == 1:
-                temporal_frame = temporal_frame[:-1]
-            spectral_frame = numpy.absolute(numpy.fft.fft(temporal_frame))
-
-            (mu, sigma) = symbaudio.analysis.spectral.spectral_shape(spectral_frame, freqs)
-            eng = symbaudio.analysis.spectral.spectral_energy(spectral_frame)
-            zc = symbaudio.analysis.spectral.zcr(temporal_frame)
-            frames.record(n, mu, sigma, eng, zc)
+        frames = FeatureSeries(audio.sample_count, framesize, audio.sample_rate_hz, hop, fields)
+        params = {"framesize": framesize, "chan": chan, "real": real, "hop": hop,
+                  "window": window, "fields": list(fields)}
+        cached = None
+        if cache is not None:
+            cached = cache.load(audio.path, params)
+        if cached is not None and cached.shape == frames.features.shape:
+            frames.features = cached
+        else:
+            plan = symbaudio.analysis.spectral.get_plan(
+                audio.sample_rate_hz, framesize, real, window)
+            extract = symbaudio.analysis.registry.FeatureExtractor(fields, plan)
+            temporal_frames = symbaudio.analysis.audio.frame_view(
+                audio.raw[:, chan], framesize, hop)
+            for n in range(0, frames.count, blocksize):
+                block = temporal_frames[n:n+blocksize]
+                frames.record_block(n, extract(block))
+            if cache is not None:
+                cache.store(audio.path, params, frames.features)
+        self.first_order = frames
         self.second_order = frames.aggregate()
+
+class MultiChannelSummary:
+    """ Produces first and second order statistics about several channels.
+
+    This is a multi-channel counterpart to AudioSummary. Rather than viewing
+    one channel at a time, each block of frames is read once across all
+    channels, in file order, and every selected channel (or downmix) is
+    analyzed from that block. This avoids re-reading the file per channel.
+    """
+
+    def __init__(self, audio, channels=None, framesize=1024, blocksize=256, cache=None,
+                 real=True, hop=None, window="rect", fields=None):
+        """ Processes the audio across fixed width windows.
+
+        The results are exposed as:
+        channels -- the channel (or mix) of each entry below
+        features -- a (channel, frame, field) tensor of first-order statistics
+        first_order -- a FeatureSeries per channel, viewing features
+        second_order -- a mapping from field name to FeatureAggregation, per channel
+
+        Arguments:
+        audio -- the file to analyze
+        channels -- keyword argument to list channel indices, or names from MIXES (default: all)
+        framesize -- keyword argument to adjust the window width (default: 1024)
+        blocksize -- keyword argument to set the frames per block (default: 256)
+        cache -- keyword argument to set a FeatureCache (default: None)
+        real -- keyword argument to analyze half spectra (default: True)
+        hop -- keyword argument to set the samples between frames (default: framesize)
+        window -- keyword argument to name a window function (default: "rect")
+        fields -- keyword argument to name the features (default: FeatureSeries.FIELDS)
+
+        Note: A trailing, partial frame will be truncated in the analysis.
+        """
+        if hop is None:
+            hop = framesize
+        if fields is None:
+            fields = FeatureSeries.FIELDS
+        assert(framesize > 0)
+        assert(framesize % 2 == 0)
+        assert(blocksize > 0)
+        assert(hop > 0)
+        if channels is None:
+            channels = list(range(0, audio.channel_count))
+        for chan in channels:
+            assert(chan in MIXES or (0 <= chan and chan < audio.channel_count))
+
+        self.length_s = audio.sample_count / audio.sample_rate_hz
+        self.channels = list(channels)
+
+        count = FeatureSeries(audio.sample_count, framesize, audio.sample_rate_hz, hop).count
+        self.features = numpy.ndarray((len(channels), count, len(fields)))
+        self.first_order = []
+        for i in range(0, len(channels)):
+            frames = FeatureSeries(audio.sample_count, framesize, audio.sample_rate_hz, hop,
+                                   fields)
+            frames.features = self.features[i]
+            self.first_order.append(frames)
+
+        params = [{"framesize": framesize, "chan": chan, "real": real, "hop": hop,
+                   "window": window, "fields": list(fields)} for chan in channels]
+        missing = list(range(0, len(channels)))
+        if cache is not None:
+            missing = []
+            for i in range(0, len(channels)):
+                cached = cache.load(audio.path, params[i])
+                if cached is not None and cached.shape == self.features[i].shape:
+                    self.features[i] = cached
+                else:
+                    missing.append(i)
+
+        if len(missing) > 0:
+            plan = symbaudio.analysis.spectral.get_plan(
+                audio.sample_rate_hz, framesize, real, window)
+            extract = {i: symbaudio.analysis.registry.FeatureExtractor(fields, plan)
+                       for i in missing}
+            temporal_frames = symbaudio.analysis.audio.frame_view(audio.raw, framesize, hop)
+            for n in range(0, count, blocksize):
+                block = temporal_frames[n:n+blocksize]
+                for i in missing:
+                    frames = mix_channels(block, channels[i])
+                    self.features[i, n:n+len(block)] = extract[i](frames)
+            if cache is not None:
+                for i in missing:
+                    cache.store(audio.path, params[i], self.features[i])
+        self.second_order = [frames.aggregate() for frames in self.first_order]
@@ -0,0 +1,144 @@
+import numpy
+import symbaudio.analysis.spectral
+import symbaudio.utils.time
+
+# The intermediates which a feature may need. Each is computed at most once
+# per block of frames, and is shared by every feature which needs it.
+#   frame -- the temporal frames
+#   magnitude -- the magnitude spectrum of each frame (see SpectralPlan)
+#   power -- the squared magnitude spectrum of each frame
+#   shape -- the (centroid, spread) of each magnitude spectrum
+#   previous -- the half magnitude spectrum of each frame's predecessor
+NEEDS = ["frame", "magnitude", "power", "shape", "previous"]
+
+class Feature:
+    """ Describes a first-order statistic, and the intermediates it needs. """
+
+    def __init__(self, needs, compute, doc):
+        """ Declares a feature.
+
+        Arguments:
+        needs -- the intermediates used by the feature (see NEEDS)
+        compute -- maps (context, plan) to a vector with one entry per frame
+        doc -- a short description of the feature
+        """
+        for need in needs:
+            assert(need in NEEDS)
+        self.needs = frozenset(needs)
+        self.compute = compute
+        self.doc = doc
+
+def _rms(ctx, plan):
+    """ The root mean square amplitude of each frame. """
+    frames = ctx["frame"].astype(numpy.float64)
+    if frames.shape[-1] == 0:
+        return numpy.zeros(frames.shape[:-1])
+    return numpy.sqrt(numpy.mean(numpy.square(frames), axis=-1))
+
+def _rolloff(ctx, plan, fraction=0.85):
+    """ The frequency below which a fraction of the energy of each frame lies. """
+    power = plan.half(ctx["power"]) * plan.half_weights
+    if power.shape[-1] == 0:
+        return numpy.zeros(power.shape[:-1])
+    cumulative = numpy.cumsum(power, axis=-1)
+    threshold = fraction * cumulative[..., -1:]
+    index = numpy.sum(cumulative < threshold, axis=-1)
+    return plan.half_freqs[numpy.minimum(index, len(plan.half_freqs) - 1)]
+
+def _flatness(ctx, plan, eps=1e-12):
+    """ The ratio of the geometric to arithmetic mean power of each frame. """
+    power = plan.half(ctx["power"]) + eps
+    if power.shape[-1] == 0:
+        return numpy.zeros(power.shape[:-1])
+    return numpy.exp(numpy.mean(numpy.log(power), axis=-1)) / numpy.mean(power, axis=-1)
+
+def _flux(ctx, plan):
+    """ The distance between the spectrum of each frame and its predecessor. """
+    current = plan.half(ctx["magnitude"])
+    return numpy.sqrt(numpy.sum(numpy.square(current - ctx["previous"]), axis=-1))
+
+# The available features, by name.
+FEATURES = {
+    "centroid": Feature(["shape"], lambda ctx, plan: ctx["shape"][0],
+                        "the spectral centroid of each frame"),
+    "spread": Feature(["shape"], lambda ctx, plan: ctx["shape"][1],
+                      "the spectral spread of each frame"),
+    "energy": Feature(["power"], lambda ctx, plan: plan.total(ctx["power"]),
+                      "the total energy across each frame"),
+    "zeros": Feature(["frame"], lambda ctx, plan: symbaudio.analysis.spectral.zcr(ctx["frame"]),
+                     "the zero-crossing rate of each frame"),
+    "rms": Feature(["frame"], _rms, _rms.__doc__.strip()),
+    "rolloff": Feature(["power"], _rolloff, _rolloff.__doc__.strip()),
+    "flatness": Feature(["power"], _flatness, _flatness.__doc__.strip()),
+    "flux": Feature(["magnitude", "previous"], _flux, _flux.__doc__.strip()),
+}
+
+def register(name, needs, compute, doc=""):
+    """ Adds a feature to the registry.
+
+    Arguments:
+    name -- the name of the feature
+    needs -- the intermediates used by the feature (see NEEDS)
+    compute -- maps (context, plan) to a vector with one entry per frame
+    doc -- keyword argument to describe the feature (default: "")
+    """
+    assert(name not in FEATURES)
+    FEATURES[name] = Feature(needs, compute, doc)
+
+class FeatureExtractor:
+    """ Computes a set of features over consecutive blocks of frames.
+
+    The intermediates needed by the selected features are computed once per
+    block, and fanned out to each feature. The extractor carries state between
+    blocks (the final spectrum, for flux), so consecutive blocks of one series
+    should be passed to the same extractor, in order.
+    """
+
+    def __init__(self, fields, plan):
+        """ Prepares to compute features.
+
+        Arguments:
+        fields -- the names of the features to compute (see FEATURES)
+        plan -- the SpectralPlan for a frame
+        """
+        for field in fields:
+            assert(field in FEATURES)
+        self.fields = list(fields)
+        self._plan = plan
+        self._features = [FEATURES[field] for field in self.fields]
+        self._needs = frozenset().union(*[f.needs for f in self._features])
+        self._previous = None
+
+    @symbaudio.utils.time.PROFILER.timed("features.block")
+    def __call__(self, frames):
+        """ Returns a matrix with a row per frame, and a column per field.
+
+        Arguments:
+        frames -- a matrix of temporal frames, with one frame per row
+        """
+        needs = self._needs
+        profiler = symbaudio.utils.time.PROFILER
+        ctx = {}
+        if "frame" in needs:
+            ctx["frame"] = frames
+        if needs & {"magnitude", "power", "shape", "previous"}:
+            with profiler.scope("transform"):
+                ctx["magnitude"] = self._plan.transform(frames)
+        if "power" in needs:
+            with profiler.scope("power"):
+                ctx["power"] = numpy.square(ctx["magnitude"])
+        if "shape" in needs:
+            with profiler.scope("shape"):
+                ctx["shape"] = self._plan.shape(ctx["magnitude"])
+        if "previous" in needs:
+            current = self._plan.half(ctx["magnitude"])
+            first = current[:1] if self._previous is None else self._previous
+            ctx["previous"] = numpy.concatenate((first, current[:-1]))[:len(current)]
+            if len(current) > 0:
+                self._previous = current[-1:]
+
+        columns = []
+        for (field, feature) in zip(self.fields, self._features):
+            with profiler.scope(field):
+                columns.append(feature.compute(ctx, self._plan))
+        return numpy.column_stack(columns) if columns else numpy.zeros((len(frames), 0))
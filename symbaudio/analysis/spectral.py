@@ -1,4 +1,7 @@
+import collections
+import functools
 import numpy
+import scipy.signal
 
 def zcr(series):
     """ Estimates the ZCR of a signal.
@@ -10,44 +13,101 @@ def zcr(series):
     Attempts to filter zeros proved too costly, while less local approaches
     proved too complex to write without native loops.
     
+    If series is a matrix, the ZCR is computed for each row.
+
     Arguments:
     series -- the points to analyze
     """
-    if len(series) > 1:
-        return numpy.sum((series[:-1] * series[1:]) < 0)
+    series = numpy.asarray(series)
+    if series.shape[-1] > 1:
+        return numpy.sum((series[..., :-1] * series[..., 1:]) < 0, axis=-1)
     else:
-        return 0
+        return numpy.zeros(series.shape[:-1], dtype=numpy.int64)[()]
 
 def spectral_energy(spectrum):
     """ Computes the total energy (sum of squares) in a series.
+
+    If spectrum is a matrix, the energy is computed for each row.
     
     Arguments:
     spectrum -- the points to analyze
     """
-    return numpy.sum(numpy.square(spectrum))
+    return numpy.sum(numpy.square(spectrum), axis=-1)
 
 def spectral_shape(spectrum, freqs):
     """ Calculates the spread and centroid of a spectrum.
+
+    If spectrum is a matrix, each row is treated as an independent spectrum,
+    and the centroids and spreads are returned as vectors.
     
     Arguments:
     spectrum -- a length (n) sequence of frequency bins
     freqs -- a length (n) mapping from frequency bin to central frequency
     """
-    mu = 0
-    sigma = 0
     spectrum = numpy.abs(spectrum)
 
-    density = numpy.sum(spectrum)
-    if (density > 0):
-        mu = numpy.sum(spectrum * freqs) / density
-        sigma = numpy.sum(spectrum * numpy.square(freqs - mu)) / density
+    density = numpy.sum(spectrum, axis=-1)
+    nonzero = density > 0
+    density = numpy.where(nonzero, density, 1)
+
+    mu = numpy.sum(spectrum * freqs, axis=-1) / density
+    mu = numpy.where(nonzero, mu, 0)
+    sigma = numpy.sum(spectrum * numpy.square(freqs - mu[..., None]), axis=-1) / density
+    sigma = numpy.where(nonzero, sigma, 0)
+
+    return (mu[()], sigma[()])
+
+class _TableCache:
+    """ A least recently used store of read-only tables, bounded in bytes. """
+
+    def __init__(self, max_bytes):
+        """ Creates an empty cache.
+
+        Arguments:
+        max_bytes -- the total size of tables to retain
+        """
+        self.max_bytes = max_bytes
+        self._size = 0
+        self._tables = collections.OrderedDict()
 
-    return (mu, sigma)
+    def get(self, key, make):
+        """ Returns the tables for a key, calling make() on a miss.
+
+        The result of make() is a tuple of arrays, which are frozen before they
+        are retained.
+        """
+        if key in self._tables:
+            self._tables.move_to_end(key)
+            return self._tables[key]
+        tables = make()
+        for x in tables:
+            if isinstance(x, numpy.ndarray):
+                x.flags.writeable = False
+        self._tables[key] = tables
+        self._size += self._nbytes(tables)
+        while self._size > self.max_bytes and len(self._tables) > 1:
+            (_, evicted) = self._tables.popitem(last=False)
+            self._size -= self._nbytes(evicted)
+        return tables
+
+    def clear(self):
+        """ Removes every table. """
+        self._tables.clear()
+        self._size = 0
+
+    @staticmethod
+    def _nbytes(tables):
+        """ Returns the size of the arrays in a tuple of tables. """
+        return sum(x.nbytes for x in tables if isinstance(x, numpy.ndarray))
+
+# Frequency tables are shared between frames, files and aggregations.
+_TABLES = _TableCache(64 << 20)
 
 def make_freq_table(fs, N):
     """ Produces a mapping from DFT bins to central frequencies.
     
-    The mapping will take the form of a numpy vector.
+    The mapping will take the form of a numpy vector. Tables are memoized, so
+    the result is read-only.
     
     Arguments:
     fs -- the sampling rate
@@ -57,11 +117,182 @@ def make_freq_table(fs, N):
     Requires: N is even
     """
     assert(N % 2 == 0)
-    
+    return _TABLES.get(("full", fs, N), lambda: (_make_freq_table(fs, N),))[0]
+
+def _make_freq_table(fs, N):
+    """ Uncached implementation of make_freq_table. """
     if N == 0:
         return numpy.array([])
-    else:
-        delta_f = fs / float(N)
-        f = lambda i: delta_f * (min(i, N - 1 - i) + 0.5)
-        
-        return numpy.fromfunction(numpy.vectorize(f), [N], dtype=numpy.int32)
+    delta_f = fs / float(N)
+    i = numpy.arange(0, N)
+    return delta_f * (numpy.minimum(i, N - 1 - i) + 0.5)
+
+# Window functions, by name. Each is the periodic form, for spectral analysis.
+WINDOWS = {"rect": "boxcar", "hann": "hann", "hamming": "hamming", "blackman": "blackman"}
+
+def make_window(name, N):
+    """ Produces a window function of a given width.
+
+    Windows are memoized, so the result is read-only.
+
+    Arguments:
+    name -- the name of the window (see WINDOWS)
+    N -- the number of samples in the window
+    """
+    assert(name in WINDOWS)
+    make = lambda: (scipy.signal.get_window(WINDOWS[name], N, fftbins=True),)
+    return _TABLES.get(("window", name, N), make)[0]
+
+def make_half_freq_table(fs, N):
+    """ Produces a mapping from real DFT bins to central frequencies.
+
+    The DFT of a real signal is hermitian, so bin k of the full spectrum has
+    the same magnitude as bin N - k. The half spectrum (as in numpy.fft.rfft)
+    therefore stands in for the full spectrum, if each half bin k is counted
+    once at the frequency of full bin k (for k < N/2), and once at the frequency
+    of full bin N - k (for k > 0). In terms of make_freq_table, the former is
+    the returned table, and the latter is the returned table less one step.
+
+    The result is (freqs, step, weights), where weights is a 2 x (N/2 + 1)
+    matrix of the counts for full bin k and full bin N - k, respectively.
+    Tables are memoized, so the arrays are read-only.
+
+    Arguments:
+    fs -- the sampling rate
+    N -- the number of bins in the full DFT
+
+    Requires: N is even
+    """
+    assert(N % 2 == 0)
+    return _TABLES.get(("half", fs, N), lambda: _make_half_freq_table(fs, N))
+
+def _make_half_freq_table(fs, N):
+    """ Uncached implementation of make_half_freq_table. """
+    count = N // 2 + 1
+    if N == 0:
+        return (numpy.array([]), 0.0, numpy.zeros((2, 0)))
+    step = fs / float(N)
+    freqs = step * (numpy.arange(0, count) + 0.5)
+    weights = numpy.ones((2, count))
+    weights[0, -1] = 0
+    weights[1, 0] = 0
+    return (freqs, step, weights)
+
+def half_spectral_energy(spectrum, weights):
+    """ Computes the total energy of a full spectrum, from its half spectrum.
+
+    Arguments:
+    spectrum -- the half spectrum to analyze
+    weights -- the bin weights from make_half_freq_table
+    """
+    return numpy.sum(numpy.square(spectrum) * numpy.sum(weights, axis=0), axis=-1)
+
+def half_spectral_shape(spectrum, freqs, step, weights):
+    """ Calculates the spread and centroid of a full spectrum, from its half spectrum.
+
+    This is equivalent to spectral_shape over the full spectrum and its
+    frequency table (see make_half_freq_table). If spectrum is a matrix, each
+    row is treated as an independent spectrum.
+
+    Arguments:
+    spectrum -- the half spectrum to analyze
+    freqs -- the frequency table from make_half_freq_table
+    step -- the frequency step from make_half_freq_table
+    weights -- the bin weights from make_half_freq_table
+    """
+    spectrum = numpy.abs(spectrum)
+    (direct, mirror) = weights
+
+    density = numpy.sum(spectrum * (direct + mirror), axis=-1)
+    nonzero = density > 0
+    density = numpy.where(nonzero, density, 1)
+
+    mu = numpy.sum(spectrum * (direct * freqs + mirror * (freqs - step)), axis=-1) / density
+    mu = numpy.where(nonzero, mu, 0)
+    dist = freqs - mu[..., None]
+    moment = direct * numpy.square(dist) + mirror * numpy.square(dist - step)
+    sigma = numpy.sum(spectrum * moment, axis=-1) / density
+    sigma = numpy.where(nonzero, sigma, 0)
+
+    return (mu[()], sigma[()])
+
+class SpectralPlan:
+    """ Precomputed tables to analyze the spectra of real frames of a fixed width.
+
+    In real mode, spectra are computed with numpy.fft.rfft, and analyzed through
+    the half spectrum functions. Otherwise, the full spectrum is computed. The
+    results agree, up to rounding. Frames are multiplied by the window function
+    before their spectra are computed.
+    """
+
+    def __init__(self, fs, N, real=True, window="rect"):
+        """ Precomputes the tables for a frame width.
+
+        Arguments:
+        fs -- the sampling rate
+        N -- the number of samples per frame
+        real -- keyword argument to use the half spectrum (default: True)
+        window -- keyword argument to name a window function (default: "rect")
+
+        Requires: N is even
+        """
+        self.size = N
+        self.real = real
+        (_, step, weights) = make_half_freq_table(fs, N)
+        self.half_freqs = step * numpy.arange(0, weights.shape[1])
+        self.half_weights = numpy.sum(weights, axis=0)
+        self.window = None
+        if window != "rect":
+            self.window = make_window(window, N)
+        if real:
+            (self.freqs, self.step, self.weights) = make_half_freq_table(fs, N)
+        else:
+            self.freqs = make_freq_table(fs, N)
+
+    def transform(self, frames):
+        """ Computes the magnitude spectrum of each frame (along the last axis). """
+        if self.window is not None:
+            frames = frames * self.window
+        if self.real:
+            return numpy.absolute(numpy.fft.rfft(frames, axis=-1))
+        return numpy.absolute(numpy.fft.fft(frames, axis=-1))
+
+    def shape(self, spectrum):
+        """ Calculates the centroid and spread of a spectrum (see spectral_shape). """
+        if self.real:
+            return half_spectral_shape(spectrum, self.freqs, self.step, self.weights)
+        return spectral_shape(spectrum, self.freqs)
+
+    def energy(self, spectrum):
+        """ Computes the total energy of a spectrum (see spectral_energy). """
+        if self.real:
+            return half_spectral_energy(spectrum, self.weights)
+        return spectral_energy(spectrum)
+
+    def total(self, x):
+        """ Sums a per-bin quantity (e.g., power) over the full spectrum. """
+        if self.real:
+            return numpy.sum(x * self.half_weights, axis=-1)
+        return numpy.sum(x, axis=-1)
+
+    def half(self, spectrum):
+        """ Returns the bins of a spectrum at half_freqs (0 to fs / 2, inclusive).
+
+        For a real frame, these bins determine the full spectrum. Each bin
+        occurs half_weights times in the full spectrum.
+        """
+        if self.real:
+            return spectrum
+        return spectrum[..., :self.size // 2 + 1]
+
+@functools.lru_cache(maxsize=32)
+def get_plan(fs, N, real=True, window="rect"):
+    """ Returns a shared SpectralPlan, so that plans are reused across files.
+
+    Arguments:
+    fs -- the sampling rate
+    N -- the number of samples per frame
+    real -- keyword argument to use the half spectrum (default: True)
+    window -- keyword argument to name a window function (default: "rect")
+    """
+    return SpectralPlan(fs, N, real, window)
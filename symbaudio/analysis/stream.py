@@ -0,0 +1,170 @@
+import numpy
+import symbaudio.analysis.audio
+import symbaudio.analysis.feature
+import symbaudio.analysis.registry
+import symbaudio.analysis.spectral
+
+def read_chunks(audio, chunksize=65536):
+    """ Yields an AudioFile as consecutive chunks of samples.
+
+    Arguments:
+    audio -- the file to read
+    chunksize -- keyword argument to set the samples per chunk (default: 65536)
+    """
+    assert(chunksize > 0)
+    for i in range(0, audio.sample_count, chunksize):
+        yield audio.raw[i:i+chunksize]
+
+def read_pcm(f, dtype=numpy.int16, channels=1, chunksize=65536):
+    """ Yields raw, interleaved PCM from a binary stream as chunks of samples.
+
+    The stream may be unbounded (e.g., a pipe or a socket). Reading stops at the
+    end of the stream, and a trailing partial sample is discarded.
+
+    Arguments:
+    f -- a binary file object to read from
+    dtype -- keyword argument to set the sample type (default: int16)
+    channels -- keyword argument to set the number of channels (default: 1)
+    chunksize -- keyword argument to set the samples per chunk (default: 65536)
+    """
+    assert(channels > 0)
+    assert(chunksize > 0)
+    width = numpy.dtype(dtype).itemsize * channels
+    partial = b""
+    while True:
+        data = f.read(chunksize * width - len(partial))
+        if not data:
+            break
+        data = partial + data
+        whole = len(data) - len(data) % width
+        partial = data[whole:]
+        if whole > 0:
+            yield numpy.frombuffer(data[:whole], dtype=dtype).reshape(-1, channels)
+
+class StreamingSummary:
+    """ Produces first and second order statistics about an audio stream.
+
+    This is a streaming counterpart to AudioSummary. Samples are fed in chunks
+    of any size, and each complete frame is analyzed as soon as it is available.
+    Memory usage is bounded by the chunk size and the history length, rather
+    than by the length of the stream.
+
+    The means of the second-order statistics are exact running means over every
+    frame seen so far. The modulations require the full feature series, so they
+    are computed over the most recent history frames. If the stream has an even
+    number of frames, no more than the history, the aggregates match those of
+    AudioSummary.
+    """
+
+    def __init__(self, sample_rate_hz, framesize=1024, chan=0, history=4096, real=True,
+                 hop=None, window="rect", fields=None):
+        """ Prepares an empty summary.
+
+        Arguments:
+        sample_rate_hz -- the sample rate of the stream
+        framesize -- keyword argument to adjust the window width (default: 1024)
+        chan -- keyword argument to select analysis channel (default: 0)
+        history -- keyword argument to set the frames kept for modulation (default: 4096)
+        real -- keyword argument to analyze half spectra (default: True)
+        hop -- keyword argument to set the samples between frames (default: framesize)
+        window -- keyword argument to name a window function (default: "rect")
+        fields -- keyword argument to name the features (default: FeatureSeries.FIELDS)
+
+        Requires: hop is at most framesize.
+        """
+        if hop is None:
+            hop = framesize
+        if fields is None:
+            fields = symbaudio.analysis.feature.FeatureSeries.FIELDS
+        assert(framesize > 0)
+        assert(framesize % 2 == 0)
+        assert(history > 0)
+        assert(0 < hop and hop <= framesize)
+
+        self.sample_rate_hz = sample_rate_hz
+        self.downsample_hz = sample_rate_hz / hop
+        self.sample_count = 0
+        self.count = 0
+        self._framesize = framesize
+        self._hop = hop
+        self._chan = chan
+        plan = symbaudio.analysis.spectral.get_plan(sample_rate_hz, framesize, real, window)
+        self.fields = list(fields)
+        self._extract = symbaudio.analysis.registry.FeatureExtractor(fields, plan)
+        self._pending = numpy.zeros(0)
+        self._sums = numpy.zeros(len(self.fields))
+        self._history = numpy.zeros((history, len(self._sums)))
+
+    @property
+    def length_s(self):
+        """ The duration of the samples fed so far, in seconds. """
+        return self.sample_count / self.sample_rate_hz
+
+    def update(self, chunk):
+        """ Feeds a chunk of samples, and returns the features of any new frames.
+
+        The result is a matrix with a row per completed frame, and a column per
+        field. Samples which are needed by incomplete frames are held until the
+        next chunk.
+
+        Arguments:
+        chunk -- a vector of mono samples, or a matrix with a column per channel
+        """
+        chunk = numpy.asarray(chunk)
+        if chunk.ndim == 2:
+            chunk = chunk[:, self._chan]
+        self.sample_count += len(chunk)
+
+        samples = chunk
+        if len(self._pending) > 0:
+            samples = numpy.concatenate((self._pending, chunk))
+        frames = symbaudio.analysis.audio.frame_view(samples, self._framesize, self._hop)
+        self._pending = samples[len(frames)*self._hop:].copy()
+        features = self._extract(frames)
+        self._record(features)
+        return features
+
+    def _record(self, features):
+        """ Folds the features of new frames into the running aggregates. """
+        self._sums += numpy.sum(features, axis=0)
+        size = len(self._history)
+        slots = (self.count + numpy.arange(0, len(features)))[-size:] % size
+        self._history[slots] = features[-size:]
+        self.count += len(features)
+
+    def stream(self, chunks):
+        """ Consumes an iterator of chunks, and yields the features of each frame.
+
+        Arguments:
+        chunks -- an iterable of chunks (see update)
+        """
+        for chunk in chunks:
+            yield from self.update(chunk)
+
+    def first_order(self):
+        """ Returns the features of the most recent history frames, oldest first. """
+        size = len(self._history)
+        if self.count <= size:
+            return self._history[:self.count].copy()
+        return numpy.roll(self._history, -(self.count % size), axis=0)
+
+    def aggregate(self):
+        """ Calculates statistics over the frames seen so far.
+
+        The result is a mapping from field name to FeatureAggregation, with the
+        mean taken over all frames. If there is an odd number of frames in the
+        history, the final frame is dropped from the modulation.
+
+        Requires: at least two frames have been seen.
+        """
+        assert(self.count >= 2)
+        series = self.first_order()
+        series = series[:(len(series) // 2) * 2]
+
+        agg = {}
+        for i in range(0, len(self.fields)):
+            field = self.fields[i]
+            agg[field] = symbaudio.analysis.feature.FeatureAggregation(
+                series[:,i], self.downsample_hz)
+            agg[field].mean = self._sums[i] / self.count
+        return agg
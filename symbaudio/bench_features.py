@@ -0,0 +1,175 @@
+"""
+This script benchmarks the feature analysis pipeline (AudioSummary). Wave
+fixtures are synthesized for each combination of length, sample type and
+channel count. Each fixture is analyzed in a fresh process, and the script
+reports the throughput (seconds of audio analyzed per second), the peak
+resident set size of the process, and the time spent in each stage of the
+pipeline.
+
+Results may be saved as a baseline, and later runs may be compared against it.
+If any case is slower (or uses more memory) than the baseline by more than the
+threshold, the script lists the regressions and exits with a non-zero status.
+"""
+
+import argparse
+import itertools
+import numpy
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import symbaudio.analysis.audio
+import symbaudio.analysis.feature
+import symbaudio.utils.bench
+import symbaudio.utils.time
+
+# The stages of the pipeline, mapped to the profiler scopes timed within them
+# (see symbaudio.analysis.registry.FeatureExtractor). Framing is the remainder
+# of the analysis: slicing and mixing blocks of frames, and storing features.
+STAGES = {
+    "framing": [],
+    "fft": ["features.block/transform"],
+    "shape": ["features.block/shape", "features.block/centroid", "features.block/spread"],
+    "energy": ["features.block/power", "features.block/energy"],
+    "zcr": ["features.block/zeros"],
+    "aggregation": ["features.aggregate"],
+}
+
+DTYPES = {"int16": numpy.int16, "int32": numpy.int32, "float32": numpy.float32}
+
+def stage_times(audio):
+    """ Analyzes a file once with AudioSummary, and times each stage.
+
+    The analysis is profiled with symbaudio.utils.time.PROFILER, which is reset,
+    and the time of each stage is read from its scopes (see STAGES). The result
+    maps each stage to its total time, in ns.
+
+    Arguments:
+    audio -- the AudioFile to analyze
+    """
+    profiler = symbaudio.utils.time.PROFILER
+    enabled = profiler.enabled
+    profiler.reset()
+    profiler.enable()
+    timer = symbaudio.utils.time.PerfTimer()
+    try:
+        symbaudio.analysis.feature.AudioSummary(audio)
+        total = timer.get_elapsed_ns()
+    finally:
+        profiler.enable(enabled)
+    timings = profiler.summary()["timings"]
+    times = {}
+    for (stage, scopes) in STAGES.items():
+        times[stage] = sum(timings[scope]["total_ns"] for scope in scopes if scope in timings)
+    times["framing"] = total - sum(times.values())
+    return times
+
+def bench_file(fn, repeats):
+    """ Benchmarks AudioSummary against a file, and returns its statistics.
+
+    The statistics are those of utils.bench.measure, along with the throughput
+    (from the median time), and the time of each stage (as <stage>_ns).
+
+    Arguments:
+    fn -- the wave file to analyze
+    repeats -- the number of timed analyses
+    """
+    audio = symbaudio.analysis.audio.AudioFile(fn)
+    length_s = audio.sample_count / audio.sample_rate_hz
+    stats = symbaudio.utils.bench.measure(
+        lambda: symbaudio.analysis.feature.AudioSummary(audio), repeats, allocations=False)
+    stats["throughput"] = length_s / (stats["median_ns"] / 1e9)
+    for (stage, ns) in stage_times(audio).items():
+        stats[stage + "_ns"] = ns
+    return stats
+
+def run(tempdir, lengths, dtypes, channels, repeats, log=sys.stderr):
+    """ Runs every case, and returns the results, from case name to statistics.
+
+    Case names take the form <seconds>s/<dtype>/<channels>ch. The fixtures are
+    written to tempdir, and removed once analyzed.
+
+    Arguments:
+    tempdir -- a directory in which to write fixtures
+    lengths -- the lengths of the fixtures, in seconds
+    dtypes -- the names of the sample types (see DTYPES)
+    channels -- the channel counts
+    repeats -- the number of timed analyses per case
+    log -- keyword argument to set the progress stream (default: sys.stderr)
+    """
+    results = {}
+    for (seconds, dtype, chans) in itertools.product(lengths, dtypes, channels):
+        name = "%gs/%s/%ich" % (seconds, dtype, chans)
+        log.write("%s\n" % name)
+        fn = os.path.join(tempdir, "fixture.wav")
+        symbaudio.utils.bench.write_fixture(fn, seconds, channels=chans, dtype=DTYPES[dtype])
+        (stats, rss) = symbaudio.utils.bench.run_isolated(bench_file, fn, repeats)
+        stats["peak_rss"] = rss
+        results[name] = stats
+        os.remove(fn)
+    return results
+
+def report(results, out=sys.stdout):
+    """ Prints a table of results. """
+    out.write("%-22s %10s %10s %10s" % ("case", "median_ms", "audio_x", "rss_mib"))
+    out.write("".join([" %11s" % (stage + "_ms") for stage in STAGES]) + "\n")
+    for (name, stats) in results.items():
+        rss = stats["peak_rss"] / (1 << 20) if stats["peak_rss"] is not None else numpy.nan
+        out.write("%-22s %10.1f %10.1f %10.1f" % (
+            name, stats["median_ns"] / 1e6, stats["throughput"], rss))
+        out.write("".join([" %11.1f" % (stats[stage + "_ns"] / 1e6) for stage in STAGES]))
+        out.write("\n")
+
+def parse_list(convert):
+    """ Returns a parser for comma separated lists, converting each entry. """
+    return lambda spec: [convert(entry) for entry in spec.split(",")]
+
+def main():
+    """ Benchmarks the feature analysis pipeline.
+
+	Params:
+	--lengths -- a comma separated list of fixture lengths, in seconds (default: "10,60")
+	--dtypes -- a comma separated list of sample types (default: "int16,int32")
+	--channels -- a comma separated list of channel counts (default: "1,2")
+	--repeats -- the number of timed analyses per case (default: 3)
+	--save -- a file in which to save the results, as a baseline
+	--compare -- a baseline file to compare the results against
+	--threshold -- the tolerated slowdown or memory growth, as a fraction (default: 0.2)
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", type=parse_list(float), default=[10, 60])
+    parser.add_argument("--dtypes", type=parse_list(str), default=["int16", "int32"])
+    parser.add_argument("--channels", type=parse_list(int), default=[1, 2])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--save")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+    for dtype in args.dtypes:
+        if dtype not in DTYPES:
+            parser.error("unknown sample type: %s" % dtype)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        results = run(tempdir, args.lengths, args.dtypes, args.channels, args.repeats)
+
+    report(results)
+    if args.save is not None:
+        symbaudio.utils.bench.save_baseline(args.save, results)
+    if args.compare is not None:
+        baseline = symbaudio.utils.bench.load_baseline(args.compare)
+        regressions = []
+        for metric in ["median_ns", "peak_rss"]:
+            regressions += [(name, metric, old, new, ratio) for (name, old, new, ratio)
+                            in symbaudio.utils.bench.compare(results, baseline, args.threshold,
+                                                             metric)]
+        for (name, metric, old, new, ratio) in regressions:
+            print("REGRESSION %s %s: %g -> %g (%.2fx)" % (name, metric, old, new, ratio))
+        if len(regressions) > 0:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
+elif __name__ != "__mp_main__":
+    raise ImportError("bench_features is a script and should not be imported.")
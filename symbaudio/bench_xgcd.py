@@ -0,0 +1,210 @@
+"""
+This script benchmarks rational reconstruction, across coefficient domains,
+backends and frame widths. Frames are drawn from three sources: synthetic
+recurrences (periodic sequences, which are exactly reconstructible), uniform
+noise, and frames of a synthesized audio fixture. For each case, the median and
+95th percentile latency are reported, along with the peak bytes allocated, the
+widest coefficient produced (in bits, once normalized), and the number of
+frames which the multimodular backend could not lift. Since the sympy backend
+is quadratic (and coefficients over QQ and ZZ grow quickly), wide frames are
+only reconstructed over GF(p) with the numpy backend, unless the limits are
+raised.
+
+Results may be saved as a baseline, and later runs may be compared against it.
+If any case is slower than the baseline by more than the threshold, the script
+lists the regressions and exits with a non-zero status.
+"""
+
+import argparse
+import itertools
+import math
+import numpy
+import os
+import sympy
+import sympy.polys.polyoptions
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import symbaudio.analysis.audio
+import symbaudio.compression.berlekamp_massey
+import symbaudio.compression.xgcd
+import symbaudio.utils.bench
+import symbaudio.utils.poly
+
+SOURCES = ["recurrence", "noise", "audio"]
+
+# The (domain, backend) pairs to benchmark. The numpy backend requires a
+# finite field, and ZZ is always reconstructed by the subresultant algorithm.
+CONFIGS = [("QQ", "sympy"), ("QQ", "multimodular"), ("ZZ", "sympy"), ("GF(65537)", "sympy"),
+           ("GF(65537)", "numpy")]
+
+WIDTHS = [32, 64, 128, 256, 512, 1024, 2048, 4096]
+
+def make_frames(source, width, count, audio=None, seed=0):
+    """ Generates frames of int16 samples from a source.
+
+    Arguments:
+    source -- the name of the source (see SOURCES)
+    width -- the number of samples in each frame
+    count -- the number of frames
+    audio -- keyword argument to set the AudioFile for the "audio" source (default: None)
+    seed -- keyword argument to seed the frames (default: 0)
+    """
+    rng = numpy.random.default_rng(seed)
+    if source == "noise":
+        return list(rng.integers(-2 ** 15, 2 ** 15, (count, width)))
+    elif source == "recurrence":
+        period = max(1, width // 8)
+        periods = rng.integers(-2 ** 15, 2 ** 15, (count, period))
+        return list(numpy.tile(periods, -(-width // period))[:, :width])
+    assert(source == "audio" and audio is not None)
+    framecount = audio.sample_count // width
+    indices = rng.choice(framecount, count, replace=framecount < count)
+    return [numpy.asarray(audio.raw[i*width:(i+1)*width, 0]) for i in indices]
+
+def reconstruct(frame, dom, backend, algorithm):
+    """ Reconstructs a normalized rational from a frame, as in symbaudio.compression.measure.
+
+    The result is None if the rational could not be lifted (multimodular only).
+    """
+    k = len(frame) // 2
+    if algorithm == "bm":
+        return symbaudio.compression.berlekamp_massey.reconstruct_rational(
+            k, frame, dom, backend)
+    return symbaudio.compression.xgcd.reconstruct_rational(
+        k, frame, dom, backend, algorithm, normalized=True)
+
+def coeff_bits(num, den):
+    """ Returns the width of the widest coefficient of a rational, in bits. """
+    return max(symbaudio.utils.poly.from_poly(num).bit_length(),
+               symbaudio.utils.poly.from_poly(den).bit_length())
+
+def bench_case(frames, dom, backend, algorithm, repeats):
+    """ Benchmarks reconstruction over a list of frames. See utils.bench.measure.
+
+    Each timed call reconstructs the next frame, cycling through the list. The
+    widest coefficient is taken over the frames which could be lifted (or is -1
+    if there are none), and the others are counted as unlifted.
+    """
+    cycle = itertools.cycle(frames)
+    stats = symbaudio.utils.bench.measure(
+        lambda: reconstruct(next(cycle), dom, backend, algorithm), repeats)
+    results = [reconstruct(frame, dom, backend, algorithm) for frame in frames]
+    lifted = [result for result in results if result is not None]
+    stats["coeff_bits"] = max([coeff_bits(*result) for result in lifted] + [-1])
+    stats["unlifted"] = len(results) - len(lifted)
+    return stats
+
+def run(audio, widths, sources, algorithm, repeats, rational_limit, integer_limit,
+        sympy_limit, log=sys.stderr):
+    """ Runs every case, and returns the results, from case name to statistics.
+
+    Case names take the form source/domain/backend/width.
+
+    Arguments:
+    audio -- the AudioFile for the "audio" source
+    widths -- the frame widths
+    sources -- the frame sources (see SOURCES)
+    algorithm -- the reconstruction algorithm, or "bm"
+    repeats -- the number of timed calls per case
+    rational_limit -- the widest frame to reconstruct over QQ, with the sympy backend
+    integer_limit -- the widest frame to reconstruct over ZZ, or with the multimodular backend
+    sympy_limit -- the widest frame to reconstruct with the sympy backend, over GF(p)
+    log -- keyword argument to set the progress stream (default: sys.stderr)
+    """
+    results = {}
+    for (source, width, (domain, backend)) in itertools.product(sources, widths, CONFIGS):
+        if (domain, backend) == ("QQ", "sympy") and width > rational_limit:
+            continue
+        elif (domain == "ZZ" or backend == "multimodular") and width > integer_limit:
+            continue
+        elif backend == "multimodular" and algorithm == "bm":
+            continue
+        elif domain.startswith("GF") and backend == "sympy" and width > sympy_limit:
+            continue
+        elif domain == "ZZ" and algorithm == "bm":
+            continue
+        name = "%s/%s/%s/%i" % (source, domain, backend, width)
+        log.write("%s\n" % name)
+        dom = sympy.polys.polyoptions.Domain.preprocess(domain)
+        frames = make_frames(source, width, repeats, audio)
+        results[name] = bench_case(frames, dom, backend,
+                                   "subresultant" if domain == "ZZ" else algorithm, repeats)
+    return results
+
+def report(results, out=sys.stdout):
+    """ Prints a table of results. """
+    out.write("%-40s %12s %12s %12s %6s %8s\n" % (
+        "case", "median_ms", "p95_ms", "peak_kib", "bits", "unlifted"))
+    for (name, stats) in results.items():
+        out.write("%-40s %12.3f %12.3f %12.1f %6i %8i\n" % (
+            name, stats["median_ns"] / 1e6, stats["p95_ns"] / 1e6,
+            stats["peak_bytes"] / 1024, stats["coeff_bits"], stats["unlifted"]))
+
+def parse_widths(spec):
+    """ Parses a comma separated list of even frame widths. """
+    widths = [int(width) for width in spec.split(",")]
+    for width in widths:
+        if width <= 0 or width % 2 != 0:
+            raise ValueError("frame widths must be positive and even: %i" % width)
+    return widths
+
+def main():
+    """ Benchmarks rational reconstruction.
+
+	Params:
+	--widths -- a comma separated list of frame widths (default: 32 to 4096)
+	--sources -- a comma separated list of frame sources (default: all)
+	--algorithm -- the reconstruction algorithm over QQ and GF(p) ("euclid", "halfgcd",
+	               "auto" or "bm")
+	--repeats -- the number of timed reconstructions per case (default: 5)
+	--rational-limit -- the widest frame to reconstruct over QQ (default: 64)
+	--integer-limit -- the widest frame to reconstruct over ZZ, or multimodularly (default: 256)
+	--sympy-limit -- the widest frame to reconstruct with sympy, over GF(p) (default: 512)
+	--save -- a file in which to save the results, as a baseline
+	--compare -- a baseline file to compare the results against
+	--threshold -- the tolerated slowdown, as a fraction (default: 0.2)
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--widths", type=parse_widths, default=WIDTHS)
+    parser.add_argument("--sources", type=lambda spec: spec.split(","), default=SOURCES)
+    parser.add_argument("--algorithm", default="euclid",
+                        choices=["euclid", "halfgcd", "auto", "bm"])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--rational-limit", type=int, default=64)
+    parser.add_argument("--integer-limit", type=int, default=256)
+    parser.add_argument("--sympy-limit", type=int, default=512)
+    parser.add_argument("--save")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+    for source in args.sources:
+        if source not in SOURCES:
+            parser.error("unknown source: %s" % source)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fixture = os.path.join(tempdir, "fixture.wav")
+        seconds = math.ceil(max(args.widths) * args.repeats * 4 / 8000)
+        symbaudio.utils.bench.write_fixture(fixture, seconds, 8000, channels=2)
+        audio = symbaudio.analysis.audio.AudioFile(fixture)
+        results = run(audio, args.widths, args.sources, args.algorithm, args.repeats,
+                      args.rational_limit, args.integer_limit, args.sympy_limit)
+        del audio
+
+    report(results)
+    if args.save is not None:
+        symbaudio.utils.bench.save_baseline(args.save, results)
+    if args.compare is not None:
+        baseline = symbaudio.utils.bench.load_baseline(args.compare)
+        regressions = symbaudio.utils.bench.compare(results, baseline, args.threshold)
+        for (name, old, new, ratio) in regressions:
+            print("REGRESSION %s: %.3fms -> %.3fms (%.2fx)" % (name, old / 1e6, new / 1e6, ratio))
+        if len(regressions) > 0:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
+else:
+    raise ImportError("bench_xgcd is a script and should not be imported.")
@@ -0,0 +1,147 @@
+import numpy
+import sympy
+import sympy.abc
+import sympy.polys.densearith
+import sympy.polys.polyoptions
+
+import symbaudio.compression.modular
+
+def berlekamp_massey(sequence, dom, max_order=None):
+    """ Finds the shortest linear recurrence which generates a sequence.
+
+    The result is the linear complexity L, and the connection polynomial
+    C = 1 + c_1 x + ... + c_L x^L as a list of domain elements, constant term
+    first. That is, s_i + c_1 s_{i-1} + ... + c_L s_{i-L} = 0 for all i >= L.
+
+    Since the linear complexity never decreases, the search may be abandoned as
+    soon as L exceeds max_order. In this case, None is returned.
+
+    Arguments:
+    sequence -- the integer sequence to analyze
+    dom -- the field over which to solve (a sympy domain)
+    max_order -- keyword argument to bound the linear complexity (default: None)
+    """
+    s = [dom.convert(int(x)) for x in sequence]
+    c = [dom.one]
+    b = [dom.one]
+    (order, shift, last) = (0, 1, dom.one)
+    for i in range(0, len(s)):
+        d = s[i]
+        for j in range(1, order + 1):
+            d += c[j] * s[i - j]
+        if not d:
+            shift += 1
+            continue
+
+        coeff = dom.quo(d, last)
+        update = [dom.zero] * shift + [coeff * x for x in b]
+        if len(c) < len(update):
+            c = c + [dom.zero] * (len(update) - len(c))
+        prev = c
+        c = [x - y for (x, y) in zip(c, update)] + c[len(update):]
+        if 2 * order <= i:
+            (order, b, last, shift) = (i + 1 - order, prev, d, 1)
+            if max_order is not None and order > max_order:
+                return None
+        else:
+            shift += 1
+    return (order, (c + [dom.zero] * (order + 1))[:order + 1])
+
+def berlekamp_massey_modular(sequence, p, max_order=None):
+    """ Finds the shortest linear recurrence which generates a sequence mod p.
+
+    This is the GF(p) counterpart to berlekamp_massey. The discrepancies and
+    polynomial updates are computed with vectorized modular arithmetic, and the
+    connection polynomial is returned as a residue vector, constant term first.
+
+    Arguments:
+    sequence -- the integer sequence to analyze
+    p -- the order of the field (a prime, less than 2^31)
+    max_order -- keyword argument to bound the linear complexity (default: None)
+    """
+    assert(2 <= p and p < 2 ** 31)
+    s = numpy.mod(numpy.asarray(sequence, dtype=numpy.int64), p)
+    n = len(s)
+    c = numpy.zeros(n + 1, dtype=numpy.int64)
+    b = numpy.zeros(n + 1, dtype=numpy.int64)
+    c[0] = 1
+    b[0] = 1
+    (order, shift, last_inv) = (0, 1, 1)
+    for i in range(0, n):
+        window = s[i-order:i+1][::-1]
+        d = int(numpy.sum(numpy.mod(c[:order+1] * window, p))) % p
+        if d == 0:
+            shift += 1
+            continue
+
+        coeff = (d * last_inv) % p
+        prev = c.copy()
+        c[shift:] = numpy.mod(c[shift:] - coeff * b[:n+1-shift], p)
+        if 2 * order <= i:
+            (order, b, last_inv, shift) = (i + 1 - order, prev, pow(d, -1, p), 1)
+            if max_order is not None and order > max_order:
+                return None
+        else:
+            shift += 1
+    return (order, c[:order+1])
+
+def _numerator(sequence, connection, order, dom):
+    """ Computes the numerator (A * C) mod x^order, constant term first. """
+    s = [dom.convert(int(x)) for x in sequence[:order]]
+    product = sympy.polys.densearith.dup_mul(s[::-1], connection[::-1], dom)[::-1]
+    return (product + [dom.zero] * order)[:order]
+
+def _numerator_modular(sequence, connection, order, p):
+    """ Computes the numerator (A * C) mod (x^order, p), constant term first. """
+    s = symbaudio.compression.modular.from_coefficients(sequence[:order][::-1], p)
+    product = symbaudio.compression.modular.mul(s, connection[::-1], p)[::-1]
+    return numpy.concatenate((product, numpy.zeros(order, dtype=numpy.int64)))[:order]
+
+def reconstruct_rational(k, coefficients, dom="QQ", backend="sympy", early_exit=False):
+    """ Constructs a rational generating function through Berlekamp-Massey.
+
+    This is an alternative to symbaudio.compression.xgcd.reconstruct_rational,
+    which solves for the shortest recurrence relation directly. The numerator
+    and denominator are normalized so that the denominator has a constant term
+    of one (see symbaudio.compression.xgcd.normalize). If the sequence is an
+    order k recurrence relation, this is the same rational as the XGCD. As with
+    the XGCD, a zero sequence produces zero polynomials.
+
+    If early_exit is set, the search stops as soon as the recurrence is known
+    to exceed order k, and None is returned.
+
+    Arguments:
+    k -- the order of the recurrence relation
+    coefficients -- the coefficients from which to reconstruct
+    dom -- the field over which to reconstruct (default: "QQ")
+    backend -- "sympy" for any field, or "numpy" for finite fields (default: "sympy")
+    early_exit -- keyword argument to abandon recurrences above order k (default: False)
+    """
+    assert(len(coefficients) >= 2 * k)
+    dom = sympy.polys.polyoptions.Domain.preprocess(dom)
+    sequence = coefficients[:2*k]
+    max_order = k if early_exit else None
+
+    if backend == "numpy":
+        assert(isinstance(dom, sympy.polys.domains.FiniteField))
+        p = int(dom.characteristic())
+        result = berlekamp_massey_modular(sequence, p, max_order)
+    else:
+        assert(backend == "sympy")
+        result = berlekamp_massey(sequence, dom, max_order)
+    if result is None:
+        return None
+
+    (order, connection) = result
+    if order == 0:
+        zero = sympy.Poly([0], sympy.abc.x, domain=dom)
+        return (zero, zero)
+    elif backend == "numpy":
+        numerator = _numerator_modular(sequence, connection, order, p)
+        num = sympy.Poly([int(x) for x in numerator[::-1]], sympy.abc.x, domain=dom)
+        den = sympy.Poly([int(x) for x in connection[::-1]], sympy.abc.x, domain=dom)
+    else:
+        numerator = _numerator(sequence, connection, order, dom)
+        num = sympy.Poly.from_list(numerator[::-1], sympy.abc.x, domain=dom)
+        den = sympy.Poly.from_list(connection[::-1], sympy.abc.x, domain=dom)
+    return (num, den)
@@ -0,0 +1,409 @@
+import numpy
+import os
+import struct
+import wave
+
+import symbaudio.analysis.audio
+import symbaudio.compression.modular
+import symbaudio.utils.time
+
+MAGIC = b"SBAC"
+
+VERSION = 1
+
+# The encodings of a frame. Each record begins with its mode (an index into MODES).
+MODES = ["raw", "delta", "rational"]
+
+(_RAW, _DELTA, _RATIONAL) = range(0, len(MODES))
+
+# The container header: magic, version, channel count, sample dtype (as in
+# numpy.dtype.str), sample rate, frame width, prime, sample count (per channel)
+# and the offset of the frame index.
+_HEADER = struct.Struct("<4sBH4sIIIQQ")
+
+# The head of a rational record: mode, coefficient width (in bytes), and the
+# number of coefficients in the numerator and denominator.
+_RATIONAL_HEAD = struct.Struct("<BBHH")
+
+# The head of a delta record: mode, and the width of each delta (in bytes).
+_DELTA_HEAD = struct.Struct("<BB")
+
+def prime_for(dtype):
+    """ Returns the prime over which frames of a sample type are reconstructed.
+
+    The prime exceeds twice the magnitude of every 16-bit sample, so that such
+    samples are recovered from their residues. Wider samples are reconstructed
+    modulo the largest prime supported by symbaudio.compression.modular, and
+    frames of samples which are too wide fall back to other encodings.
+
+    Arguments:
+    dtype -- the sample type
+    """
+    return 65537 if numpy.dtype(dtype).itemsize <= 2 else 2 ** 31 - 1
+
+def _widths(lo, hi):
+    """ Returns the least width (1, 2, 4 or 8 bytes) of signed integers holding each range. """
+    widths = numpy.full(len(lo), 8)
+    for width in [4, 2, 1]:
+        bound = 1 << (8 * width - 1)
+        widths = numpy.where((lo >= -bound) & (hi < bound), width, widths)
+    return widths
+
+def _lift(residues, p):
+    """ Maps residues modulo p to their symmetric representatives. """
+    return numpy.where(residues > p // 2, residues - p, residues)
+
+def expand(num, den, width, p):
+    """ Expands the power series of num / den over GF(p), to width terms.
+
+    The polynomials are given as matrices of ascending coefficients (constant
+    term first), with a row per series, as from
+    symbaudio.compression.modular.reconstruct_rational_batch. The constant
+    term of each denominator must be non-zero.
+
+    Arguments:
+    num -- the numerators, with a row per series
+    den -- the denominators, with a row per series
+    width -- the number of terms to expand
+    p -- the order of the field
+    """
+    num = numpy.asarray(num, dtype=numpy.int64)
+    den = numpy.asarray(den, dtype=numpy.int64)
+    series = numpy.zeros((len(num), width), dtype=numpy.int64)
+    inv = symbaudio.compression.modular.inverse(den[:, 0], p)
+    order = den.shape[1] - 1
+    for i in range(0, width):
+        acc = num[:, i] if i < num.shape[1] else 0
+        m = min(i, order)
+        if m > 0:
+            acc = acc - numpy.mod(den[:, 1:m+1] * series[:, i-1::-1][:, :m], p).sum(axis=1)
+        series[:, i] = numpy.mod(numpy.mod(acc, p) * inv, p)
+    return series
+
+@symbaudio.utils.time.PROFILER.timed("codec.encode")
+def encode_frames(frames, dtype, max_order=32):
+    """ Encodes frames of a single channel, and returns their records.
+
+    Each frame is encoded in whichever of three modes is smallest:
+    "raw" -- the samples themselves
+    "delta" -- the first sample, followed by the differences between samples
+    "rational" -- the numerator and denominator of a rational function, whose
+                  power series over GF(p) is the frame (see prime_for)
+
+    The rational is reconstructed from the first 2 * max_order samples (see
+    symbaudio.compression.modular.reconstruct_rational_batch), and is only
+    kept if its expansion reproduces the entire frame. Therefore, a frame is
+    only encoded rationally if it satisfies a linear recurrence of order at
+    most max_order (modulo p). The deltas and coefficients are stored in the
+    least width (of 1, 2, 4 or 8 bytes) which holds the whole frame. The result
+    is (records, modes), where records is a list of bytes, and modes holds the
+    index into MODES of each record.
+
+    Arguments:
+    frames -- a matrix of integer samples, with a row per frame
+    dtype -- the sample type of the stream
+    max_order -- keyword argument to bound the order of rational frames (default: 32)
+    """
+    dtype = numpy.dtype(dtype)
+    assert(numpy.issubdtype(dtype, numpy.integer))
+    frames = numpy.asarray(frames, dtype=numpy.int64)
+    (count, width) = frames.shape
+    p = prime_for(dtype)
+
+    sizes = numpy.full((count, len(MODES)), numpy.iinfo(numpy.int64).max)
+    sizes[:, _RAW] = 1 + width * dtype.itemsize
+    deltas = numpy.diff(frames, axis=1)
+    delta_widths = _widths(deltas.min(axis=1, initial=0), deltas.max(axis=1, initial=0))
+    sizes[:, _DELTA] = _DELTA_HEAD.size + dtype.itemsize + (width - 1) * delta_widths
+
+    k = min(width // 2, max_order)
+    if k > 0:
+        (num, den, num_deg, den_deg) = symbaudio.compression.modular.reconstruct_rational_batch(
+            k, frames, p)
+        # A zero frame is the series of 0 / 1.
+        zero = ~frames.any(axis=1)
+        den[zero, 0] = 1
+        den_deg[zero] = 0
+        (num, den) = (_lift(num, p), _lift(den, p))
+        coeff_widths = _widths(numpy.minimum(num.min(axis=1), den.min(axis=1)),
+                               numpy.maximum(num.max(axis=1), den.max(axis=1)))
+        rational_sizes = _RATIONAL_HEAD.size + (num_deg + den_deg + 2) * coeff_widths
+        candidates = numpy.flatnonzero((den[:, 0] != 0) & (rational_sizes < sizes.min(axis=1)))
+        # Most frames diverge from their rational soon after the first 2k
+        # samples, so a short prefix is checked before the whole frame.
+        for terms in sorted(set([min(width, 4 * k), width])):
+            if len(candidates) == 0:
+                break
+            series = expand(numpy.mod(num[candidates], p), numpy.mod(den[candidates], p),
+                            terms, p)
+            exact = numpy.all(_lift(series, p) == frames[candidates, :terms], axis=1)
+            candidates = candidates[exact]
+        sizes[candidates, _RATIONAL] = rational_sizes[candidates]
+
+    modes = numpy.argmin(sizes, axis=1)
+    records = []
+    for (i, mode) in enumerate(modes.tolist()):
+        if mode == _RAW:
+            record = bytes([_RAW]) + frames[i].astype(dtype).tobytes()
+        elif mode == _DELTA:
+            cw = int(delta_widths[i])
+            record = (_DELTA_HEAD.pack(_DELTA, cw) + frames[i, :1].astype(dtype).tobytes() +
+                      deltas[i].astype("<i%i" % cw).tobytes())
+        else:
+            (cw, nl, dl) = (int(coeff_widths[i]), int(num_deg[i]) + 1, int(den_deg[i]) + 1)
+            record = (_RATIONAL_HEAD.pack(_RATIONAL, cw, nl, dl) +
+                      num[i, :nl].astype("<i%i" % cw).tobytes() +
+                      den[i, :dl].astype("<i%i" % cw).tobytes())
+        records.append(record)
+    return (records, modes)
+
+@symbaudio.utils.time.PROFILER.timed("codec.decode")
+def decode_records(records, width, dtype):
+    """ Decodes the records of frames of a single channel, as written by encode_frames.
+
+    The rational records are expanded together. The result is a matrix of
+    samples, with a row per frame.
+
+    Arguments:
+    records -- a list of records (bytes-like)
+    width -- the number of samples in each frame
+    dtype -- the sample type of the stream
+    """
+    dtype = numpy.dtype(dtype)
+    p = prime_for(dtype)
+    frames = numpy.zeros((len(records), width), dtype=dtype)
+    rational = []
+    for (i, record) in enumerate(records):
+        mode = record[0]
+        if mode == _RAW:
+            frames[i] = numpy.frombuffer(record, dtype=dtype, offset=1)
+        elif mode == _DELTA:
+            (_, cw) = _DELTA_HEAD.unpack_from(record)
+            first = numpy.frombuffer(record, dtype=dtype, count=1, offset=_DELTA_HEAD.size)
+            deltas = numpy.frombuffer(record, dtype="<i%i" % cw,
+                                      offset=_DELTA_HEAD.size + dtype.itemsize)
+            frames[i, 0] = first[0]
+            frames[i, 1:] = first[0] + numpy.cumsum(deltas, dtype=numpy.int64)
+        else:
+            assert(mode == _RATIONAL)
+            (_, cw, nl, dl) = _RATIONAL_HEAD.unpack_from(record)
+            coeffs = numpy.frombuffer(record, dtype="<i%i" % cw, offset=_RATIONAL_HEAD.size)
+            rational.append((i, coeffs[:nl], coeffs[nl:nl+dl]))
+
+    if len(rational) > 0:
+        num = numpy.zeros((len(rational), max(1, max(len(n) for (_, n, _) in rational))),
+                          dtype=numpy.int64)
+        den = numpy.zeros((len(rational), max(len(d) for (_, _, d) in rational)),
+                          dtype=numpy.int64)
+        for (j, (_, n, d)) in enumerate(rational):
+            num[j, :len(n)] = n
+            den[j, :len(d)] = d
+        series = expand(numpy.mod(num, p), numpy.mod(den, p), width, p)
+        frames[[i for (i, _, _) in rational]] = _lift(series, p)
+    return frames
+
+def _encode_block(path, framewidth, start, stop, max_order):
+    """ Encodes frames [start, stop) of every channel of a file.
+
+    The file is opened (and mem-mapped) independently, so that blocks may be
+    encoded from worker processes. A trailing partial frame is encoded on its
+    own. The result is (records, modes), with the records of each frame in
+    channel order.
+    """
+    audio = symbaudio.analysis.audio.AudioFile(path)
+    samples = audio.raw[start*framewidth:stop*framewidth]
+    full = len(samples) // framewidth
+    channels = []
+    for chan in range(0, audio.channel_count):
+        series = samples[:, chan]
+        (records, modes) = encode_frames(
+            series[:full*framewidth].reshape(full, framewidth), audio.raw.dtype, max_order)
+        if full * framewidth < len(series):
+            (partial, mode) = encode_frames(
+                series[full*framewidth:].reshape(1, -1), audio.raw.dtype, max_order)
+            (records, modes) = (records + partial, numpy.concatenate((modes, mode)))
+        channels.append((records, modes))
+    records = [record for frame in zip(*[records for (records, _) in channels])
+               for record in frame]
+    modes = numpy.concatenate([modes for (_, modes) in channels])
+    return (records, numpy.bincount(modes, minlength=len(MODES)))
+
+def _encode_task(task):
+    """ Unpacks the arguments of _encode_block, for Pool.imap. """
+    return _encode_block(*task)
+
+def encode_file(src, dst, framewidth=1024, max_order=32, pool=None, blocksize=256):
+    """ Encodes a wave file into a container, and returns statistics of the encoding.
+
+    The container is a header, followed by a record per frame and channel (in
+    frame order, then channel order), and an index of the offset of each
+    record (see CodecFile). Frames are encoded in blocks, which are written as
+    they complete. If a process pool is given, blocks are encoded in parallel.
+    The container is written to a temporary file, and moved into place once
+    complete.
+
+    The statistics are a dict of the sample count, input_bytes (the size of
+    the samples), output_bytes (the size of the container), ratio (input_bytes
+    over output_bytes), encode_ns, and the number of records in each mode.
+
+    Arguments:
+    src -- the wave file to encode (of integer samples)
+    dst -- the path of the container
+    framewidth -- keyword argument to set the number of samples per frame (default: 1024)
+    max_order -- keyword argument to bound the order of rational frames (default: 32)
+    pool -- keyword argument to encode blocks in a multiprocessing.Pool (default: None)
+    blocksize -- keyword argument to set the frames per block (default: 256)
+    """
+    assert(0 < framewidth and framewidth < 2 ** 16)
+    timer = symbaudio.utils.time.PerfTimer()
+    audio = symbaudio.analysis.audio.AudioFile(src)
+    dtype = audio.raw.dtype.newbyteorder("<")
+    assert(numpy.issubdtype(dtype, numpy.integer))
+    framecount = -(-audio.sample_count // framewidth)
+    tasks = [(src, framewidth, start, min(start + blocksize, framecount), max_order)
+             for start in range(0, framecount, blocksize)]
+
+    counts = numpy.zeros(len(MODES), dtype=numpy.int64)
+    offsets = []
+    tmp = dst + ".tmp"
+    with open(tmp, "wb") as f:
+        header = [MAGIC, VERSION, audio.channel_count, dtype.str.encode("ascii"),
+                  audio.sample_rate_hz, framewidth, prime_for(dtype), audio.sample_count]
+        f.write(_HEADER.pack(*header, 0))
+        blocks = map(_encode_task, tasks) if pool is None else pool.imap(_encode_task, tasks)
+        offset = _HEADER.size
+        for (records, modes) in blocks:
+            for record in records:
+                offsets.append(offset)
+                offset += len(record)
+            f.write(b"".join(records))
+            counts += modes
+        offsets.append(offset)
+        f.write(numpy.array(offsets, dtype="<u8").tobytes())
+        f.seek(0)
+        f.write(_HEADER.pack(*header, offset))
+    os.replace(tmp, dst)
+
+    input_bytes = audio.sample_count * audio.channel_count * dtype.itemsize
+    output_bytes = os.path.getsize(dst)
+    stats = {"samples": audio.sample_count * audio.channel_count, "input_bytes": input_bytes,
+             "output_bytes": output_bytes, "ratio": input_bytes / output_bytes,
+             "encode_ns": timer.get_elapsed_ns()}
+    stats.update(zip(MODES, counts.tolist()))
+    return stats
+
+class CodecFile:
+    """ A container written by encode_file, opened for random access.
+
+    The container exposes fields:
+    path -- the path the container was opened from
+    sample_rate_hz -- the sample rate of the encoded file
+    sample_count -- the number of samples in each channel
+    channel_count -- the number of channels
+    dtype -- the sample type
+    framewidth -- the number of samples in each frame
+    frame_count -- the number of frames (including a trailing partial frame)
+    """
+
+    def __init__(self, fn):
+        """ Opens a container, and loads its index.
+
+        Arguments:
+        fn -- the path to the container
+        """
+        self.path = fn
+        self._file = open(fn, "rb")
+        fields = _HEADER.unpack(self._file.read(_HEADER.size))
+        (magic, version, self.channel_count, dtype, self.sample_rate_hz, self.framewidth,
+         self._prime, self.sample_count, index_offset) = fields
+        if magic != MAGIC or version != VERSION:
+            self._file.close()
+            raise ValueError("not a codec container (version %i): %s" % (VERSION, fn))
+        self.dtype = numpy.dtype(dtype.rstrip(b"\0").decode("ascii"))
+        self.frame_count = -(-self.sample_count // self.framewidth)
+        self._file.seek(index_offset)
+        self._offsets = numpy.fromfile(self._file, dtype="<u8",
+                                       count=self.frame_count * self.channel_count + 1)
+
+    def __len__(self):
+        """ Returns the number of frames. """
+        return self.frame_count
+
+    def read_frames(self, start, stop):
+        """ Decodes frames [start, stop), and returns their samples.
+
+        The result is a matrix with a row per sample, and a column per channel.
+
+        Arguments:
+        start -- the first frame to decode
+        stop -- the frame after the last frame to decode
+        """
+        assert(0 <= start and start <= stop and stop <= self.frame_count)
+        channels = self.channel_count
+        offsets = self._offsets[start*channels:stop*channels+1].astype(numpy.int64)
+        self._file.seek(offsets[0])
+        data = memoryview(self._file.read(offsets[-1] - offsets[0]))
+        offsets -= offsets[0]
+        records = [data[offsets[i]:offsets[i+1]] for i in range(0, len(offsets) - 1)]
+
+        end = min(stop * self.framewidth, self.sample_count)
+        samples = numpy.zeros((end - start * self.framewidth, channels), dtype=self.dtype)
+        full = len(samples) // self.framewidth
+        for chan in range(0, channels):
+            frames = decode_records(records[chan:full*channels:channels], self.framewidth,
+                                    self.dtype)
+            samples[:full*self.framewidth, chan] = frames.reshape(-1)
+            if full < stop - start:
+                partial = decode_records(records[full*channels+chan:full*channels+chan+1],
+                                         len(samples) - full * self.framewidth, self.dtype)
+                samples[full*self.framewidth:, chan] = partial[0]
+        return samples
+
+    def close(self):
+        """ Closes the container. """
+        self._file.close()
+
+    def __enter__(self):
+        """ Returns the container. """
+        return self
+
+    def __exit__(self, *args):
+        """ Closes the container. """
+        self.close()
+
+def _decode_task(task):
+    """ Decodes frames [start, stop) of a container, for Pool.imap. """
+    (path, start, stop) = task
+    with CodecFile(path) as container:
+        return container.read_frames(start, stop)
+
+def decode_file(src, dst, pool=None, blocksize=256):
+    """ Decodes a container into a wave file, and returns statistics of the decoding.
+
+    Blocks of frames are decoded, and written as they complete. If a process
+    pool is given, blocks are decoded in parallel. The statistics are a dict
+    of the sample count, sample_bytes (the size of the decoded samples), and
+    decode_ns.
+
+    Arguments:
+    src -- the container to decode
+    dst -- the path of the wave file
+    pool -- keyword argument to decode blocks in a multiprocessing.Pool (default: None)
+    blocksize -- keyword argument to set the frames per block (default: 256)
+    """
+    timer = symbaudio.utils.time.PerfTimer()
+    with CodecFile(src) as container:
+        tasks = [(src, start, min(start + blocksize, container.frame_count))
+                 for start in range(0, container.frame_count, blocksize)]
+        (channels, rate, dtype) = (container.channel_count, container.sample_rate_hz,
+                                   container.dtype)
+        count = container.sample_count
+    with wave.open(dst, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(dtype.itemsize)
+        out.setframerate(rate)
+        blocks = map(_decode_task, tasks) if pool is None else pool.imap(_decode_task, tasks)
+        for samples in blocks:
+            out.writeframes(samples.tobytes())
+    return {"samples": count * channels, "sample_bytes": count * channels * dtype.itemsize,
+            "decode_ns": timer.get_elapsed_ns()}
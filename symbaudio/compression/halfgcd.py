@@ -0,0 +1,148 @@
+import numpy
+import sympy.polys.densearith
+
+import symbaudio.compression.modular
+
+# Below this degree, the half-GCD recursion falls back to the classical loop.
+EUCLID_CUTOFF = 32
+
+class SympyArith:
+    """ Dense polynomial arithmetic over a sympy domain.
+
+    Polynomials are lists of domain elements, leading coefficient first (the
+    dup representation used internally by sympy). Multiplication switches to
+    Karatsuba's algorithm for large polynomials.
+    """
+
+    def __init__(self, dom):
+        """ Selects the sympy domain for all arithmetic. """
+        self.dom = dom
+        self.zero = []
+        self.one = [dom.one]
+
+    def add(self, a, b):
+        """ Computes a + b. """
+        return sympy.polys.densearith.dup_add(a, b, self.dom)
+
+    def sub(self, a, b):
+        """ Computes a - b. """
+        return sympy.polys.densearith.dup_sub(a, b, self.dom)
+
+    def mul(self, a, b):
+        """ Computes a * b. """
+        return sympy.polys.densearith.dup_mul(a, b, self.dom)
+
+    def div(self, a, b):
+        """ Computes the quotient and remainder of a / b. """
+        return sympy.polys.densearith.dup_div(a, b, self.dom)
+
+class ModularArith:
+    """ Dense polynomial arithmetic over GF(p), see symbaudio.compression.modular. """
+
+    def __init__(self, p):
+        """ Selects the order of the field for all arithmetic. """
+        self.p = p
+        self.zero = numpy.zeros(0, dtype=numpy.int64)
+        self.one = numpy.ones(1, dtype=numpy.int64)
+
+    def add(self, a, b):
+        """ Computes a + b. """
+        return symbaudio.compression.modular.add(a, b, self.p)
+
+    def sub(self, a, b):
+        """ Computes a - b. """
+        return symbaudio.compression.modular.sub(a, b, self.p)
+
+    def mul(self, a, b):
+        """ Computes a * b. """
+        return symbaudio.compression.modular.mul(a, b, self.p)
+
+    def div(self, a, b):
+        """ Computes the quotient and remainder of a / b. """
+        return symbaudio.compression.modular.div(a, b, self.p)
+
+def _degree(a):
+    """ Returns the degree of a polynomial, with deg(0) = -1. """
+    return len(a) - 1
+
+def _shift(a, m):
+    """ Computes a div x^m. """
+    return a[:max(0, len(a) - m)]
+
+def _identity(arith):
+    """ Returns the 2x2 identity matrix. """
+    return ((arith.one, arith.zero), (arith.zero, arith.one))
+
+def _step(q, mat, arith):
+    """ Left-multiplies a matrix by the Euclidean step ((0, 1), (1, -q)). """
+    return (mat[1], (arith.sub(mat[0][0], arith.mul(q, mat[1][0])),
+                     arith.sub(mat[0][1], arith.mul(q, mat[1][1]))))
+
+def _matmul(lhs, rhs, arith):
+    """ Computes the product of two 2x2 polynomial matrices. """
+    return tuple(
+        tuple(arith.add(arith.mul(lhs[i][0], rhs[0][j]), arith.mul(lhs[i][1], rhs[1][j]))
+              for j in range(0, 2))
+        for i in range(0, 2))
+
+def _apply(mat, a, b, arith):
+    """ Computes the product of a 2x2 polynomial matrix with the vector (a, b). """
+    return (arith.add(arith.mul(mat[0][0], a), arith.mul(mat[0][1], b)),
+            arith.add(arith.mul(mat[1][0], a), arith.mul(mat[1][1], b)))
+
+def _euclid(a, b, m, arith):
+    """ Classical half-GCD: runs Euclidean steps until deg(b) < m. """
+    mat = _identity(arith)
+    while _degree(b) >= m:
+        (q, r) = arith.div(a, b)
+        mat = _step(q, mat, arith)
+        (a, b) = (b, r)
+    return mat
+
+def _hgcd(a, b, arith):
+    """
+    Computes the half-GCD matrix of a and b, where deg(a) > deg(b). That is,
+    a matrix M such that M * (a, b) = (r_j, r_{j+1}) are the consecutive
+    remainders of the Euclidean algorithm satisfying
+    deg(r_j) >= m > deg(r_{j+1}), with m = ceil(deg(a) / 2).
+    """
+    m = (_degree(a) + 1) // 2
+    if _degree(b) < m:
+        return _identity(arith)
+    if _degree(a) < EUCLID_CUTOFF:
+        return _euclid(a, b, m, arith)
+
+    # Reduces the upper halves of a and b.
+    mat = _hgcd(_shift(a, m), _shift(b, m), arith)
+    (a, b) = _apply(mat, a, b, arith)
+    if _degree(b) < m:
+        return mat
+
+    # Performs one Euclidean step to cross the midpoint.
+    (q, r) = arith.div(a, b)
+    mat = _step(q, mat, arith)
+    (a, b) = (b, r)
+    if _degree(b) < m:
+        return mat
+
+    # Reduces the remaining upper halves.
+    k = 2 * m - _degree(a)
+    rest = _hgcd(_shift(a, k), _shift(b, k), arith)
+    return _matmul(rest, mat, arith)
+
+def half_xgcd(a, b, arith):
+    """ Runs the XGCD algorithm until a remainder falls below half of deg(a).
+
+    This produces the same result as the classical loop in
+    symbaudio.compression.xgcd._reconstruction_impl, with a threshold of
+    ceil(deg(a) / 2) - 1. The remainder, and its corresponding V Bezout
+    polynomial are returned.
+
+    Arguments:
+    a -- the polynomial of maximal degree in {a, b}
+    b -- the polynomial of minimal degree in {a, b}
+    arith -- the polynomial arithmetic (SympyArith or ModularArith)
+    """
+    assert(_degree(a) > _degree(b))
+    mat = _hgcd(a, b, arith)
+    return (arith.add(arith.mul(mat[1][0], a), arith.mul(mat[1][1], b)), mat[1][1])
@@ -0,0 +1,244 @@
+import numpy
+import random
+import sympy
+
+import symbaudio.analysis.audio
+import symbaudio.compression.berlekamp_massey
+import symbaudio.compression.modular
+import symbaudio.compression.xgcd
+import symbaudio.utils.poly
+import symbaudio.utils.time
+
+# The coefficient domains, by name. Over the integers, the reconstruction is
+# fraction-free (see the "subresultant" algorithm of reconstruct_rational).
+DOMAINS = {"rational": "QQ", "integer": "ZZ", "finite": sympy.GF(65537)}
+
+# The number of frames reconstructed together, when analyzing every frame.
+BATCH_FRAMES = 4096
+
+def has_status(backend, budget=None, early_exit=False):
+    """ Returns True if the rows of analyze_frames are followed by a status.
+
+    Arguments:
+    backend -- the reconstruction backend
+    budget -- keyword argument to set a symbaudio.compression.xgcd.Budget (default: None)
+    early_exit -- keyword argument to abandon recurrences above order k, with bm (default: False)
+    """
+    return budget is not None or backend == "multimodular" or early_exit
+
+def analyze_frames(file, framewidth, domain, indices, backend="sympy", algorithm="euclid",
+                   budget=None, early_exit=False):
+    """ Runs compression tests on selected frames of a file.
+
+    The file is opened (and mem-mapped) independently, so that frames may be
+    analyzed from worker processes without transferring samples. Each frame is
+    timed individually. The results are returned as rows of
+    (frame, ns, max_coeff, zero_cnt, zero_orig, coeff_cnt), where the degree
+    of a zero polynomial is counted as -1 (see symbaudio.utils.poly.CompactPoly).
+
+    Every rational is normalized (see symbaudio.compression.xgcd.normalize)
+    before it is measured, so that algorithms and backends are comparable.
+    Over the integers, the normalized rational is over the rationals.
+
+    If a budget is given, each row is followed by the status of the budget.
+    The rows of abandoned frames have a max_coeff, zero_cnt and coeff_cnt of
+    -1 (see BUDGET_COLUMNS). Rows are followed by a status as well with the
+    multimodular backend, where frames which could not be lifted have the
+    status "unlifted", and with early_exit, where frames whose recurrences
+    exceed order k have the status "order" (see has_status).
+
+    Arguments:
+    file -- the file to analyze (assumed to be a .wav)
+    framewidth -- the number of points in each compression frame
+    domain -- the name of the coefficient domain (see DOMAINS)
+    indices -- the frames to analyze
+    backend -- the reconstruction backend (default: "sympy")
+    algorithm -- the reconstruction algorithm, or "bm" (default: "euclid")
+    budget -- keyword argument to set a symbaudio.compression.xgcd.Budget (default: None)
+    early_exit -- keyword argument to abandon recurrences above order k, with bm (default: False)
+    """
+    assert(budget is None or algorithm != "bm")
+    assert(budget is None or backend != "multimodular")
+    assert(not early_exit or algorithm == "bm")
+    status = has_status(backend, budget, early_exit)
+    audio = symbaudio.analysis.audio.AudioFile(file)
+
+    framecount = audio.sample_count // framewidth
+
+    timer = symbaudio.utils.time.PerfTimer()
+    k = framewidth // 2
+    dom = DOMAINS[domain]
+    rows = []
+    for i in indices:
+        window = audio.raw[i*framewidth:(i+1)*framewidth,0]
+
+        timer.reset()
+        if algorithm == "bm":
+            result = symbaudio.compression.berlekamp_massey.reconstruct_rational(
+                k, window, dom, backend, early_exit)
+        else:
+            result = symbaudio.compression.xgcd.reconstruct_rational(
+                k, window, dom, backend, algorithm, budget, normalized=True)
+        if result is None:
+            ts = timer.get_elapsed_ns()
+            zero_orig = framecount - numpy.count_nonzero(window)
+            if budget is not None:
+                reason = budget.status
+            else:
+                reason = "order" if algorithm == "bm" else "unlifted"
+            rows.append((i, ts, -1, -1, zero_orig, -1, reason))
+            continue
+        (num, den) = result
+
+        ts        = timer.get_elapsed_ns()
+        num       = symbaudio.utils.poly.from_poly(num)
+        den       = symbaudio.utils.poly.from_poly(den)
+        max_coeff = max(num.max_coeff(), den.max_coeff())
+        zero_cnt  = num.count_zeros() + den.count_zeros()
+        zero_orig = framecount - numpy.count_nonzero(window)
+        coeff_cnt = num.degree() + den.degree()
+        symbaudio.utils.time.PROFILER.observe("xgcd.max_coeff_bits", max_coeff.bit_length())
+        row = (i, ts, max_coeff, zero_cnt, zero_orig, coeff_cnt)
+        rows.append(row + ("ok",) if status else row)
+    return rows
+
+def analyze_frames_batch(file, framewidth, indices, blocksize=BATCH_FRAMES):
+    """ Runs compression tests on selected frames of a file, over the finite domain.
+
+    This is the batched counterpart to analyze_frames, with the numpy backend.
+    The frames are reconstructed (and normalized) in blocks, and the time of
+    each block is split evenly across its frames. The rows are as in
+    analyze_frames.
+
+    Arguments:
+    file -- the file to analyze (assumed to be a .wav)
+    framewidth -- the number of points in each compression frame
+    indices -- the frames to analyze
+    blocksize -- keyword argument to set the frames per block (default: BATCH_FRAMES)
+    """
+    audio = symbaudio.analysis.audio.AudioFile(file)
+
+    framecount = audio.sample_count // framewidth
+    frames = audio.raw[:framecount*framewidth, 0].reshape(framecount, framewidth)
+
+    timer = symbaudio.utils.time.PerfTimer()
+    k = framewidth // 2
+    p = DOMAINS["finite"].characteristic()
+    indices = numpy.asarray(indices, dtype=numpy.int64)
+    rows = []
+    for start in range(0, len(indices), blocksize):
+        block = indices[start:start+blocksize]
+        windows = frames[block]
+
+        timer.reset()
+        (num, den, num_deg, den_deg) = symbaudio.compression.modular.reconstruct_rational_batch(
+            k, windows, p)
+        (num, den) = symbaudio.compression.modular.normalize_batch(num, den, p)
+        ts = timer.get_elapsed_ns() // len(block)
+
+        # Zero polynomials have a single (zero) coefficient, as in utils.poly.
+        nonzero = numpy.count_nonzero(num, axis=1) + numpy.count_nonzero(den, axis=1)
+        zero_cnt = numpy.maximum(num_deg, 0) + numpy.maximum(den_deg, 0) + 2 - nonzero
+        max_coeff = numpy.maximum(num.max(axis=1), den.max(axis=1))
+        zero_orig = framecount - numpy.count_nonzero(windows, axis=1)
+        coeff_cnt = num_deg + den_deg
+        for value in max_coeff.tolist():
+            symbaudio.utils.time.PROFILER.observe("xgcd.max_coeff_bits", value.bit_length())
+        rows.extend(zip(block.tolist(), [int(ts)] * len(block), max_coeff.tolist(),
+                        zero_cnt.tolist(), zero_orig.tolist(), coeff_cnt.tolist()))
+    return rows
+
+# The (name, dtype) of each column of the rows of analyze_file. The maximum
+# coefficient is an unbounded int, since rational coefficients are unbounded (see
+# symbaudio.utils.results.int_column).
+COLUMNS = [("frame", numpy.int64), ("ns", numpy.int64), ("max_coeff", int),
+           ("zero_cnt", numpy.int64), ("zero_orig", numpy.int64), ("coeff_cnt", numpy.int64)]
+
+TEXT_FMT = "%i,%i,%i,%i,%i,%i"
+
+# The columns and text format of rows with a status (see has_status). The
+# status is "ok", names the exceeded limit (see
+# symbaudio.compression.xgcd.Budget), or is "unlifted" or "order".
+BUDGET_COLUMNS = COLUMNS + [("status", str)]
+
+BUDGET_TEXT_FMT = TEXT_FMT + ",%s"
+
+def analyze_file(file, framewidth, domain, samps, backend="sympy", algorithm="euclid",
+                 seed=None, pool=None, shards=1, budget=None, all_frames=False,
+                 early_exit=False):
+    """ Runs compression tests on file, and returns the results as rows.
+
+    The sampled frames are selected by a generator seeded with seed, so that a
+    fixed seed reproduces the same frames. If a process pool is given, the
+    frames are split into shards, which are analyzed in parallel. If every
+    frame is analyzed, samps and seed are ignored, and the frames are analyzed
+    in batches (see analyze_frames_batch).
+
+    Arguments:
+    file -- the file to analyze (assumed to be a .wav)
+    framewidth -- the number of points in each compression frame
+    domain -- the name of the coefficient domain (see DOMAINS)
+    samps -- the number of frames to sample from the file
+    backend -- the reconstruction backend (default: "sympy")
+    algorithm -- the reconstruction algorithm, or "bm" (default: "euclid")
+    seed -- keyword argument to seed the frame selection (default: None)
+    pool -- keyword argument to analyze frames in a multiprocessing.Pool (default: None)
+    shards -- keyword argument to set the number of shards for the pool (default: 1)
+    budget -- keyword argument to set a symbaudio.compression.xgcd.Budget (default: None)
+    all_frames -- keyword argument to analyze every frame, over the finite domain (default: False)
+    early_exit -- keyword argument to abandon recurrences above order k, with bm (default: False)
+
+    Requires: an even number of samples per frame.
+    """
+    assert(framewidth % 2 == 0)
+    assert(not all_frames or (domain == "finite" and backend == "numpy" and budget is None))
+    audio = symbaudio.analysis.audio.AudioFile(file)
+
+    framecount = audio.sample_count // framewidth
+    if all_frames:
+        indices = list(range(0, framecount))
+    else:
+        indices = random.Random(seed).sample(range(0, framecount), samps)
+
+    if all_frames:
+        (f, args, extra) = (analyze_frames_batch, (file, framewidth), ())
+    else:
+        (f, args) = (analyze_frames, (file, framewidth, domain))
+        extra = (backend, algorithm, budget, early_exit)
+    if pool is None:
+        rows = f(*args, indices, *extra)
+    else:
+        tasks = [args + (list(shard),) + extra
+                 for shard in numpy.array_split(indices, shards) if len(shard) > 0]
+        rows = [row for shard in pool.starmap(f, tasks) for row in shard]
+    return rows
+
+class Analyzer:
+    """ Wrapper class to analyze function. Passes fixed arguments to analyze_file. """
+
+    def __init__(self, framewidth, domain, samps, backend="sympy", algorithm="euclid",
+                 seed=0, pool=None, shards=1, budget=None, all_frames=False,
+                 early_exit=False):
+        """ Sets the parameters for analyze_function. See analyze_function.
+
+        The frames of each file are seeded by both seed and the relative path
+        of the file.
+        """
+        self._framewidth = framewidth
+        self._domain = domain
+        self._samps = samps
+        self._backend = backend
+        self._algorithm = algorithm
+        self._seed = seed
+        self._pool = pool
+        self._shards = shards
+        self._budget = budget
+        self._all_frames = all_frames
+        self._early_exit = early_exit
+
+    def __call__(self, path, rel):
+        """ Runs analyze_function against the file found at path. """
+        return analyze_file(path, self._framewidth, self._domain, self._samps,
+                            self._backend, self._algorithm, "%i:%s" % (self._seed, rel),
+                            self._pool, self._shards, self._budget, self._all_frames,
+                            self._early_exit)
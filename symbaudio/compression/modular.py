@@ -0,0 +1,293 @@
+import numpy
+
+import symbaudio.utils.time
+
+KARATSUBA_CUTOFF = 512
+
+def _trim(a):
+    """ Strips the leading zero coefficients from a polynomial. """
+    nonzero = numpy.flatnonzero(a)
+    if len(nonzero) == 0:
+        return a[:0]
+    return a[nonzero[0]:]
+
+def from_coefficients(coefficients, p):
+    """ Constructs a polynomial over GF(p) from a sequence of integers.
+
+    Polynomials are represented as vectors of residues in [0, p), ordered from
+    the leading coefficient to the constant term (as in Poly.all_coeffs). The
+    zero polynomial is represented by an empty vector.
+
+    Arguments:
+    coefficients -- the integer coefficients, leading coefficient first
+    p -- the order of the field (a prime, less than 2^31)
+    """
+    assert(2 <= p and p < 2 ** 31)
+    return _trim(numpy.mod(numpy.asarray(coefficients, dtype=numpy.int64), p))
+
+def degree(a):
+    """ Returns the degree of a polynomial, with deg(0) = -1. """
+    return len(a) - 1
+
+def add(a, b, p):
+    """ Computes a + b over GF(p). """
+    if len(a) < len(b):
+        (a, b) = (b, a)
+    c = a.copy()
+    c[len(a)-len(b):] += b
+    return _trim(numpy.mod(c, p, out=c))
+
+def sub(a, b, p):
+    """ Computes a - b over GF(p). """
+    return add(a, numpy.mod(-b, p), p)
+
+def _convolve(a, b, p):
+    """ Computes the product of two coefficient vectors, modulo p.
+
+    The vectors are split into 16-bit limbs when a direct convolution could
+    overflow 64-bit accumulators.
+    """
+    if (p - 1) ** 2 * min(len(a), len(b)) < 2 ** 63:
+        return numpy.mod(numpy.convolve(a, b), p)
+    (a1, a0) = numpy.divmod(a, 1 << 16)
+    (b1, b0) = numpy.divmod(b, 1 << 16)
+    hi = numpy.mod(numpy.convolve(a1, b1), p)
+    mid = numpy.mod(numpy.convolve(a1, b0) + numpy.convolve(a0, b1), p)
+    lo = numpy.mod(numpy.convolve(a0, b0), p)
+    hi = numpy.mod(hi * ((1 << 32) % p), p)
+    mid = numpy.mod(mid * ((1 << 16) % p), p)
+    return numpy.mod(hi + mid + lo, p)
+
+def _karatsuba(a, b, p):
+    """ Computes the product of two coefficient vectors, modulo p.
+
+    Karatsuba's algorithm is used for long, balanced vectors. A long vector is
+    split into pieces when multiplied by a much shorter vector.
+    """
+    if len(a) < len(b):
+        (a, b) = (b, a)
+    if len(b) < KARATSUBA_CUTOFF:
+        return _convolve(a, b, p)
+
+    c = numpy.zeros(len(a) + len(b) - 1, dtype=numpy.int64)
+    if 2 * len(b) <= len(a):
+        for i in range(0, len(a), len(b)):
+            part = _karatsuba(a[i:i+len(b)], b, p)
+            c[i:i+len(part)] += part
+        return numpy.mod(c, p, out=c)
+
+    m = len(a) // 2
+    (a0, a1) = (a[:m], a[m:])
+    (b0, b1) = (b[:m], b[m:])
+    asum = a1.copy()
+    asum[:m] += a0
+    bsum = numpy.zeros(max(m, len(b1)), dtype=numpy.int64)
+    bsum[:m] += b0
+    bsum[:len(b1)] += b1
+    z0 = _karatsuba(a0, b0, p)
+    z2 = _karatsuba(a1, b1, p)
+    z1 = _karatsuba(numpy.mod(asum, p), numpy.mod(bsum, p), p)
+    z1[:len(z0)] -= z0
+    z1[:len(z2)] -= z2
+    c[:len(z0)] += z0
+    c[m:m+len(z1)] += z1
+    c[2*m:2*m+len(z2)] += z2
+    return numpy.mod(c, p, out=c)
+
+def mul(a, b, p):
+    """ Computes a * b over GF(p). """
+    if len(a) == 0 or len(b) == 0:
+        return a[:0]
+    return _trim(_karatsuba(a, b, p))
+
+def div(a, b, p):
+    """ Computes the quotient and remainder of a / b over GF(p).
+
+    Each step of the long division eliminates a leading coefficient using a
+    single vectorized update of the running remainder.
+
+    Arguments:
+    a -- the dividend
+    b -- the divisor (must be non-zero)
+    p -- the order of the field
+    """
+    assert(len(b) > 0)
+    shift = len(a) - len(b)
+    if shift < 0:
+        return (a[:0], a)
+
+    inv = pow(int(b[0]), -1, p)
+    q = numpy.zeros(shift + 1, dtype=numpy.int64)
+    r = a.copy()
+    for i in range(0, shift + 1):
+        c = (int(r[i]) * inv) % p
+        if c != 0:
+            q[i] = c
+            window = r[i:i+len(b)]
+            numpy.mod(window - c * b, p, out=window)
+    return (_trim(q), _trim(r[shift+1:]))
+
+def xgcd_threshold(a, b, n, p, budget=None):
+    """ Runs the XGCD algorithm over GF(p) until a remainder has degree n.
+
+    This mirrors symbaudio.compression.xgcd._reconstruction_impl. The first
+    remainder of degree at most n is returned, along with its corresponding V
+    Bezout coefficient (that is, r = u * a + v * b for some u).
+
+    Arguments:
+    a -- the polynomial of maximal degree in {a, b}
+    b -- the polynomial of minimal degree in {a, b}
+    n -- the termination threshold
+    p -- the order of the field
+    budget -- keyword argument to set a Budget, abandoning with None (default: None)
+    """
+    profiler = symbaudio.utils.time.PROFILER
+    v_prev = numpy.zeros(0, dtype=numpy.int64)
+    v_curr = numpy.ones(1, dtype=numpy.int64)
+    iterations = 0
+    while degree(b) > n:
+        with profiler.scope("xgcd.div"):
+            (q, r) = div(a, b, p)
+        iterations += 1
+        (v_prev, v_curr) = (v_curr, sub(v_prev, mul(v_curr, q, p), p))
+        (a, b) = (b, r)
+        if budget is not None:
+            bits = int(max(b.max(initial=0), v_curr.max(initial=0))).bit_length()
+            if not budget.spend(bits):
+                profiler.count("xgcd.abandoned")
+                return None
+    profiler.count("xgcd.iterations", iterations)
+    profiler.observe("xgcd.iterations_per_call", iterations)
+    return (b, v_curr)
+
+def reconstruct_rational(k, coefficients, p, budget=None):
+    """ Constructs a degree k rational for the given coefficients over GF(p).
+
+    This is the finite field counterpart to
+    symbaudio.compression.xgcd.reconstruct_rational. The numerator and
+    denominator are returned as residue vectors (see from_coefficients).
+
+    Arguments:
+    k -- the order of the recurrence relation
+    coefficients -- the integer coefficients from which to reconstruct
+    p -- the order of the field (a prime, less than 2^31)
+    budget -- keyword argument to set a Budget, abandoning with None (default: None)
+    """
+    assert(len(coefficients) >= 2 * k)
+    n = 2 * k
+    a0 = from_coefficients([1] + [0] * n, p)
+    a1 = from_coefficients(numpy.asarray(coefficients[:n])[::-1], p)
+
+    if len(a1) == 0:
+        return (a1, a1)
+    else:
+        return xgcd_threshold(a0, a1, k - 1, p, budget)
+
+def inverse(x, p):
+    """ Computes the inverse of each (non-zero) residue in an array, modulo p. """
+    result = numpy.ones_like(x)
+    base = numpy.mod(x, p)
+    e = p - 2
+    while e > 0:
+        if e & 1:
+            result = numpy.mod(result * base, p)
+        base = numpy.mod(base * base, p)
+        e >>= 1
+    return result
+
+def _degrees(a):
+    """ Returns the degree of each row of ascending coefficients, with deg(0) = -1. """
+    nonzero = a != 0
+    last = a.shape[1] - 1 - numpy.argmax(nonzero[:, ::-1], axis=1)
+    return numpy.where(nonzero.any(axis=1), last, -1)
+
+def _shifted(a, shift):
+    """ Multiplies each row of ascending coefficients by x^shift (truncating). """
+    cols = numpy.arange(a.shape[1]) - shift[:, None]
+    gathered = numpy.take_along_axis(a, numpy.maximum(cols, 0), axis=1)
+    return numpy.where(cols >= 0, gathered, 0)
+
+def normalize_batch(num, den, p):
+    """ Scales each rational of a batch as in symbaudio.compression.xgcd.normalize.
+
+    Both rows are multiplied by the inverse of the lowest order, non-zero
+    coefficient of the denominator (rows with a zero denominator are left as
+    is). The coefficients are in ascending order, as in
+    reconstruct_rational_batch.
+
+    Arguments:
+    num -- a matrix of numerators, with one rational per row
+    den -- a matrix of denominators, with one rational per row
+    p -- the order of the field (a prime, less than 2^31)
+    """
+    lowest = den[numpy.arange(0, len(den)), numpy.argmax(den != 0, axis=1)]
+    scale = inverse(numpy.where(lowest == 0, 1, lowest), p)[:, None]
+    return (numpy.mod(num * scale, p), numpy.mod(den * scale, p))
+
+def reconstruct_rational_batch(k, frames, p):
+    """ Constructs a degree k rational for each row of frames, over GF(p).
+
+    This is the batched counterpart to reconstruct_rational. The XGCD of every
+    frame runs in lockstep, one leading term elimination (or swap) per step,
+    with masks for frames whose degrees drop at different rates, or which have
+    already terminated. A zero frame produces zero polynomials.
+
+    The result is (num, den, num_deg, den_deg). Unlike reconstruct_rational,
+    the coefficients are in ascending order (constant term first), with a row
+    per frame, padded with zeros (k columns for num, and k + 1 for den).
+
+    Arguments:
+    k -- the order of the recurrence relation
+    frames -- a matrix of integer coefficients, with one frame per row
+    p -- the order of the field (a prime, less than 2^31)
+    """
+    assert(2 <= p and p < 2 ** 31)
+    frames = numpy.asarray(frames, dtype=numpy.int64)
+    assert(frames.ndim == 2 and frames.shape[1] >= 2 * k)
+    count = len(frames)
+    n = 2 * k
+    rows = numpy.arange(0, count)
+
+    # The remainders (a, b) and their V Bezout coefficients, in ascending order.
+    a = numpy.zeros((count, n + 1), dtype=numpy.int64)
+    a[:, n] = 1
+    b = numpy.zeros((count, n + 1), dtype=numpy.int64)
+    b[:, :n] = numpy.mod(frames[:, :n], p)
+    v_a = numpy.zeros((count, k + 1), dtype=numpy.int64)
+    v_b = numpy.zeros((count, k + 1), dtype=numpy.int64)
+    v_b[:, 0] = 1
+    deg_a = numpy.full(count, n)
+    deg_b = _degrees(b)
+    zero = deg_b < 0
+    inv_b = inverse(b[rows, numpy.maximum(deg_b, 0)], p)
+
+    profiler = symbaudio.utils.time.PROFILER
+    steps = 0
+    while True:
+        # Completes a division, once the remainder falls below the divisor.
+        swap = (deg_b > k - 1) & (deg_a < deg_b)
+        if swap.any():
+            (a[swap], b[swap]) = (b[swap], a[swap])
+            (v_a[swap], v_b[swap]) = (v_b[swap], v_a[swap])
+            (deg_a[swap], deg_b[swap]) = (deg_b[swap], deg_a[swap])
+            inv_b[swap] = inverse(b[swap, numpy.maximum(deg_b[swap], 0)], p)
+
+        active = numpy.flatnonzero(deg_b > k - 1)
+        if len(active) == 0:
+            break
+        steps += 1
+
+        # Eliminates the leading term of a, with a multiple of b. Only the
+        # columns up to the highest active degree can change.
+        top = deg_a[active].max() + 1
+        shift = deg_a[active] - deg_b[active]
+        c = numpy.mod(a[active, deg_a[active]] * inv_b[active], p)[:, None]
+        a_active = numpy.mod(a[active, :top] - c * _shifted(b[active, :top], shift), p)
+        a[active, :top] = a_active
+        v_a[active] = numpy.mod(v_a[active] - c * _shifted(v_b[active], shift), p)
+        deg_a[active] = _degrees(a_active)
+
+    profiler.count("xgcd.batch_steps", steps)
+    b[zero] = 0
+    v_b[zero] = 0
+    return (b[:, :k], v_b, numpy.where(zero, -1, deg_b), _degrees(v_b))
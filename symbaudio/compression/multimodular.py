@@ -0,0 +1,182 @@
+import math
+import numpy
+import sympy
+import sympy.abc
+
+import symbaudio.compression.halfgcd
+import symbaudio.compression.modular
+import symbaudio.utils.time
+
+# The largest prime supported by symbaudio.compression.modular. Primes are
+# drawn in descending order from here.
+MAX_PRIME = 2 ** 31 - 1
+
+_PRIMES = [MAX_PRIME]
+
+def primes(count):
+    """ Returns the count largest primes supported by the modular arithmetic. """
+    while len(_PRIMES) < count:
+        _PRIMES.append(sympy.prevprime(_PRIMES[-1]))
+    return _PRIMES[:count]
+
+def crt_update(residues, modulus, image, p):
+    """ Extends residues modulo modulus with an image modulo the prime p.
+
+    The result is (residues, modulus * p), where each residue is congruent to
+    its original residue modulo modulus, and to its image modulo p (by the
+    Chinese remainder theorem). The residues are non-negative Python integers.
+
+    Arguments:
+    residues -- the residues, modulo modulus
+    modulus -- the product of the previous primes (1 if there are none)
+    image -- the residues modulo p
+    p -- a prime which does not divide modulus
+    """
+    inv = pow(modulus % p, -1, p)
+    combined = []
+    for (x, y) in zip(residues, image):
+        t = ((int(y) - x) * inv) % p
+        combined.append(x + modulus * t)
+    return (combined, modulus * p)
+
+def rational_reconstruction(u, m):
+    """ Finds the fraction a / b congruent to u modulo m, with small a and b.
+
+    Both |a| and b must be at most sqrt(m / 2), in which case the fraction is
+    unique. The result is (a, b), with b > 0 and gcd(a, b) = 1, or None if no
+    such fraction exists (i.e., m is not yet large enough).
+
+    Arguments:
+    u -- the residue to reconstruct
+    m -- the modulus
+    """
+    bound = math.isqrt(m // 2)
+    (r0, r1) = (m, u % m)
+    (t0, t1) = (0, 1)
+    while r1 > bound:
+        q = r0 // r1
+        (r0, r1) = (r1, r0 - q * r1)
+        (t0, t1) = (t1, t0 - q * t1)
+    if t1 == 0 or abs(t1) > bound or math.gcd(r1, t1) != 1:
+        return None
+    if t1 < 0:
+        (r1, t1) = (-r1, -t1)
+    return (r1, t1)
+
+def _normalized_image(k, coefficients, p, algorithm):
+    """ Reconstructs a rational over GF(p), normalized as in xgcd.normalize.
+
+    The denominator is scaled so that its lowest order, non-zero coefficient
+    is one. The result is (signature, num, den), where the signature is the
+    shape of the pair, which agrees across all primes which do not divide a
+    coefficient (or a denominator of a coefficient) of the pair over QQ.
+    """
+    if algorithm == "halfgcd":
+        n = 2 * k
+        a0 = symbaudio.compression.modular.from_coefficients([1] + [0] * n, p)
+        a1 = symbaudio.compression.modular.from_coefficients(
+            numpy.asarray(coefficients[:n])[::-1], p)
+        arith = symbaudio.compression.halfgcd.ModularArith(p)
+        (num, den) = symbaudio.compression.halfgcd.half_xgcd(a0, a1, arith)
+    else:
+        (num, den) = symbaudio.compression.modular.reconstruct_rational(k, coefficients, p)
+    low = numpy.flatnonzero(den)[-1]
+    inv = pow(int(den[low]), -1, p)
+    num = numpy.mod(num * inv, p)
+    den = numpy.mod(den * inv, p)
+    return ((len(num), len(den), len(den) - 1 - low), num, den)
+
+def _lift(residues, modulus):
+    """ Reconstructs a fraction for each residue, or returns None on failure. """
+    fractions = []
+    for u in residues:
+        fraction = rational_reconstruction(u, modulus)
+        if fraction is None:
+            return None
+        fractions.append(fraction)
+    return fractions
+
+def _agrees(fractions, image, p):
+    """ Checks that each fraction is congruent to its image modulo p. """
+    for ((a, b), y) in zip(fractions, image):
+        if b % p == 0 or (a * pow(b, -1, p) - int(y)) % p != 0:
+            return False
+    return True
+
+def reconstruct_rational(k, coefficients, algorithm="euclid", max_primes=4096, pool=None,
+                         batch=1):
+    """ Constructs a degree k rational over QQ, through images modulo primes.
+
+    The rational is reconstructed modulo several word-size primes (see
+    symbaudio.compression.modular), and the images are normalized as in
+    symbaudio.compression.xgcd.normalize. The images are combined with the
+    Chinese remainder theorem, and each coefficient is lifted to a fraction
+    by rational number reconstruction. Primes are added in rounds (each a
+    quarter of the primes so far, and at least batch), until a lifted rational
+    agrees with every image of the following round. Images whose shape
+    disagrees with the majority (from primes which divide a coefficient) are
+    discarded.
+
+    The result is the normalized pair given by
+    symbaudio.compression.xgcd.reconstruct_rational over QQ, as Polys, or None
+    if the rational could not be lifted within max_primes primes.
+
+    Arguments:
+    k -- the order of the recurrence relation
+    coefficients -- the integer coefficients from which to reconstruct
+    algorithm -- keyword argument to set the XGCD over GF(p), or "halfgcd" (default: "euclid")
+    max_primes -- keyword argument to bound the number of primes (default: 4096)
+    pool -- keyword argument to reconstruct images in a multiprocessing.Pool (default: None)
+    batch -- keyword argument to set the least primes per round (default: 1)
+    """
+    assert(len(coefficients) >= 2 * k)
+    assert(algorithm in ["euclid", "halfgcd"])
+    assert(batch > 0)
+    profiler = symbaudio.utils.time.PROFILER
+    coefficients = numpy.asarray(coefficients[:2*k], dtype=numpy.int64)
+    zero = sympy.Poly([0], sympy.abc.x, domain="QQ")
+    if not numpy.any(coefficients):
+        return (zero, zero)
+
+    # The combined images of each shape, as [count, residues, modulus].
+    combined = {}
+    candidate = None
+    used = 0
+    while used < max_primes:
+        count = min(max(batch, used // 4), max_primes - used)
+        chosen = primes(used + count)[used:]
+        tasks = [(k, coefficients, p, algorithm) for p in chosen]
+        if pool is None:
+            images = [_normalized_image(*task) for task in tasks]
+        else:
+            images = pool.starmap(_normalized_image, tasks)
+        used += count
+        profiler.count("multimodular.primes", count)
+
+        images = [(signature, numpy.concatenate((num, den)))
+                  for (signature, num, den) in images]
+        if candidate is not None:
+            (signature, fractions) = candidate
+            if all(shape == signature and _agrees(fractions, image, p)
+                   for (p, (shape, image)) in zip(chosen, images)):
+                return _as_polys(fractions, signature)
+
+        for (p, (signature, image)) in zip(chosen, images):
+            if signature not in combined:
+                combined[signature] = [0, [0] * len(image), 1]
+            entry = combined[signature]
+            (entry[1], entry[2]) = crt_update(entry[1], entry[2], image, p)
+            entry[0] += 1
+
+        # Lifts the images of the most common shape.
+        signature = max(combined, key=lambda s: (combined[s][0], s))
+        fractions = _lift(combined[signature][1], combined[signature][2])
+        candidate = None if fractions is None else (signature, fractions)
+    return None
+
+def _as_polys(fractions, signature):
+    """ Converts the lifted coefficients of a pair into Polys over QQ. """
+    coeffs = [sympy.QQ(a, b) for (a, b) in fractions]
+    num = sympy.Poly(coeffs[:signature[0]] or [0], sympy.abc.x, domain="QQ")
+    den = sympy.Poly(coeffs[signature[0]:], sympy.abc.x, domain="QQ")
+    return (num, den)
@@ -1,47 +1,298 @@
+import numpy
 import sympy
 import sympy.abc
+import sympy.polys.densearith
+import sympy.polys.polyoptions
 
-def _reconstruction_impl(p_n, p_n_sub_1, n, dom):
+import symbaudio.compression.halfgcd
+import symbaudio.compression.modular
+import symbaudio.compression.multimodular
+import symbaudio.utils.poly
+import symbaudio.utils.time
+
+BACKENDS = ["sympy", "numpy", "multimodular"]
+ALGORITHMS = ["euclid", "halfgcd", "subresultant", "auto"]
+
+# The order at which the "auto" algorithm switches from euclid to halfgcd.
+HALFGCD_CROSSOVER = 2048
+
+class Budget:
+    """ Bounds the work spent on a reconstruction.
+
+    A budget limits the width of the coefficients (in bits), the number of
+    XGCD iterations, and the wall time of a reconstruction. Any limit may be
+    None, in which case it is not enforced. Once a limit is exceeded, the
+    reconstruction is abandoned, and status names the limit ("bits",
+    "iterations" or "time"). Otherwise, status is "ok". A budget is reset by
+    each reconstruction, so that one budget may be reused across frames.
+    """
+
+    def __init__(self, max_bits=None, max_iterations=None, max_ns=None):
+        """ Sets the limits of the budget.
+
+        Arguments:
+        max_bits -- keyword argument to limit the coefficient width (default: None)
+        max_iterations -- keyword argument to limit the iterations (default: None)
+        max_ns -- keyword argument to limit the wall time, in ns (default: None)
+        """
+        self.max_bits = max_bits
+        self.max_iterations = max_iterations
+        self.max_ns = max_ns
+        self.start()
+
+    def start(self):
+        """ Resets the budget, at the start of a reconstruction. """
+        self.status = "ok"
+        self.iterations = 0
+        self._timer = symbaudio.utils.time.PerfTimer()
+
+    def spend(self, bits=0, iterations=1):
+        """ Records an iteration, and returns False once the budget is exceeded.
+
+        Arguments:
+        bits -- keyword argument to set the current coefficient width (default: 0)
+        iterations -- keyword argument to set the iterations spent (default: 1)
+        """
+        self.iterations += iterations
+        if self.max_iterations is not None and self.iterations > self.max_iterations:
+            self.status = "iterations"
+        elif self.max_ns is not None and self._timer.get_elapsed_ns() > self.max_ns:
+            self.status = "time"
+        elif self.max_bits is not None and bits > self.max_bits:
+            self.status = "bits"
+        return self.status == "ok"
+
+def _coeff_bits(*polys):
+    """ Returns the width of the widest coefficient of several polynomials. """
+    return max(symbaudio.utils.poly.from_poly(poly).bit_length() for poly in polys)
+
+def _reconstruction_impl(p_n, p_n_sub_1, n, dom, budget=None):
     """
     Performs the XGCD algorithm on two polynomials, until the degree of the
-    first polynomial is within a certain threshold. That polynomial, and its
+    remainder is within a certain threshold. That remainder, and its
     corresponding V Bezout polynomial are returned.
 
     Arguments
     p_n -- the polynomial of maximal degree in {p1, p2}
     p_n_sub_1 --  the polynomial of minimal degree in {p1, p2}
     n -- the termination threshold
+    budget -- keyword argument to set a Budget, abandoning with None (default: None)
     """
+    profiler = symbaudio.utils.time.PROFILER
     v_n_sub_1 = sympy.Poly([0], sympy.abc.x, domain=dom)
     v_n = sympy.Poly([1], sympy.abc.x, domain=dom)
-    
-    while (p_n.total_degree() > n):
-        (q, r) = sympy.polys.polytools.div(p_n, p_n_sub_1, domain=dom)
+
+    iterations = 0
+    while (p_n_sub_1.total_degree() > n):
+        with profiler.scope("xgcd.div"):
+            (q, r) = sympy.polys.polytools.div(p_n, p_n_sub_1, domain=dom)
+        iterations += 1
         (v_n_sub_1, v_n) = (v_n, v_n_sub_1 - v_n * q)
-        p_n_sub_1 = p_n
-        p_n = r
-    
-    return (p_n_sub_1, v_n_sub_1)
+        (p_n, p_n_sub_1) = (p_n_sub_1, r)
+        if budget is not None:
+            bits = _coeff_bits(r, v_n) if budget.max_bits is not None else 0
+            if not budget.spend(bits):
+                profiler.count("xgcd.abandoned")
+                return None
+
+    profiler.count("xgcd.iterations", iterations)
+    profiler.observe("xgcd.iterations_per_call", iterations)
+    return (p_n_sub_1, v_n)
+
+def _dup_degree(f):
+    """ Returns the degree of a dense polynomial, with deg(0) = -1. """
+    return len(f) - 1
+
+def _subresultant_impl(p_n, p_n_sub_1, n, dom, budget=None):
+    """
+    Performs a fraction-free XGCD over ZZ, until the degree of the remainder is
+    within a certain threshold. The remainders form the subresultant PRS: each
+    pseudo-remainder is divided by a known factor of its content, so that the
+    coefficients stay integral, and grow no faster than the subresultants. The
+    V Bezout polynomial is scaled alongside, so that the pair is a multiple of
+    the pair given by _reconstruction_impl over QQ (see normalize).
+
+    Arguments
+    p_n -- the polynomial of maximal degree in {p1, p2}
+    p_n_sub_1 --  the polynomial of minimal degree in {p1, p2}
+    n -- the termination threshold
+    budget -- keyword argument to set a Budget, abandoning with None (default: None)
+    """
+    profiler = symbaudio.utils.time.PROFILER
+    densearith = sympy.polys.densearith
+    (f, g) = (p_n.rep.to_list(), p_n_sub_1.rep.to_list())
+    (v_f, v_g) = ([], [dom.one])
+
+    (lc, c) = (None, None)
+    iterations = 0
+    while _dup_degree(g) > n:
+        d = _dup_degree(f) - _dup_degree(g)
+        if c is None:
+            beta = (-dom.one) ** (d + 1)
+        else:
+            beta = -lc * c ** d
+        with profiler.scope("xgcd.div"):
+            (q, h) = densearith.dup_pdiv(f, g, dom)
+        iterations += 1
+        lc = g[0]
+        v_h = densearith.dup_sub(densearith.dup_mul_ground(v_f, lc ** (d + 1), dom),
+                                 densearith.dup_mul(q, v_g, dom), dom)
+        h = densearith.dup_exquo_ground(h, beta, dom)
+        v_h = densearith.dup_exquo_ground(v_h, beta, dom)
+        if c is None:
+            c = -(lc ** d)
+        elif d > 1:
+            c = dom.exquo((-lc) ** d, c ** (d - 1))
+        else:
+            c = -lc
+        (f, g, v_f, v_g) = (g, h, v_g, v_h)
+        if budget is not None:
+            bits = 0
+            if budget.max_bits is not None:
+                bits = max(int(abs(x)).bit_length() for x in g + v_g)
+            if not budget.spend(bits):
+                profiler.count("xgcd.abandoned")
+                return None
+
+    profiler.count("xgcd.iterations", iterations)
+    profiler.observe("xgcd.iterations_per_call", iterations)
+    return (sympy.Poly.from_list(g, sympy.abc.x, domain=dom),
+            sympy.Poly.from_list(v_g, sympy.abc.x, domain=dom))
+
+def _sympy_halfgcd_impl(p_n, p_n_sub_1, dom):
+    """ Runs symbaudio.compression.halfgcd.half_xgcd against two polynomials. """
+    arith = symbaudio.compression.halfgcd.SympyArith(dom)
+    (r, v) = symbaudio.compression.halfgcd.half_xgcd(
+        p_n.rep.to_list(), p_n_sub_1.rep.to_list(), arith)
+    return (sympy.Poly.from_list(r, sympy.abc.x, domain=dom),
+            sympy.Poly.from_list(v, sympy.abc.x, domain=dom))
+
+def _modular_impl(k, coefficients, dom, algorithm, budget=None):
+    """ Runs reconstruct_rational through symbaudio.compression.modular.
 
-def reconstruct_rational(k, coefficients, dom="QQ"):
+    The residue vectors are converted back to polynomials over dom.
+    """
+    assert(isinstance(dom, sympy.polys.domains.FiniteField))
+    p = int(dom.characteristic())
+    if algorithm == "halfgcd":
+        n = 2 * k
+        a0 = symbaudio.compression.modular.from_coefficients([1] + [0] * n, p)
+        a1 = symbaudio.compression.modular.from_coefficients(
+            numpy.asarray(coefficients[:n])[::-1], p)
+        if len(a1) == 0:
+            (num, den) = (a1, a1)
+        else:
+            arith = symbaudio.compression.halfgcd.ModularArith(p)
+            (num, den) = symbaudio.compression.halfgcd.half_xgcd(a0, a1, arith)
+    else:
+        result = symbaudio.compression.modular.reconstruct_rational(k, coefficients, p, budget)
+        if result is None:
+            return None
+        (num, den) = result
+    num = sympy.Poly([int(c) for c in num] or [0], sympy.abc.x, domain=dom)
+    den = sympy.Poly([int(c) for c in den] or [0], sympy.abc.x, domain=dom)
+    return (num, den)
+
+def _sympy_impl(k, coefficients, dom, algorithm, budget=None):
+    """ Runs reconstruct_rational with sympy polynomials, over any domain. """
+    n = 2 * k
+    a0 = sympy.Poly(sympy.abc.x ** n, sympy.abc.x, domain=dom)
+    a1 = sympy.Poly(reversed(coefficients[:n]), sympy.abc.x, domain=dom)
+
+    zero = sympy.Poly([0], sympy.abc.x, domain=dom)
+    if a1 == zero:
+        return (zero, zero)
+    elif algorithm == "halfgcd":
+        return _sympy_halfgcd_impl(a0, a1, dom)
+    elif algorithm == "subresultant":
+        return _subresultant_impl(a0, a1, k - 1, dom, budget)
+    else:
+        return _reconstruction_impl(a0, a1, k - 1, dom, budget)
+
+def normalize(num, den):
+    """ Scales a rational generating function to a canonical form.
+
+    Both polynomials are divided by the lowest order, non-zero coefficient of
+    the denominator. When the denominator has a constant term, it becomes one,
+    and the denominator then describes the recurrence relation directly.
+
+    Arguments:
+    num -- the numerator of the generating function
+    den -- the denominator of the generating function
+    """
+    if den.is_zero:
+        return (num, den)
+    (_, c) = den.terms()[-1]
+    return (num.quo_ground(c), den.quo_ground(c))
+
+@symbaudio.utils.time.PROFILER.timed("xgcd.reconstruct")
+def reconstruct_rational(k, coefficients, dom="QQ", backend="sympy", algorithm="euclid",
+                         budget=None, normalized=False):
     """ Constructs a degree k rational for the given coefficients.
 
     Produces the numerator and denominator of a rational generating function,
     under the assumption that the provided sequence is an order k recurrence
     relation.
 
+    The "sympy" backend supports any Euclidean domain. The "numpy" backend
+    requires a finite field (such as sympy.GF(65537)), and performs the XGCD
+    with vectorized modular arithmetic. Both backends produce equal results.
+    The "multimodular" backend requires QQ, and reconstructs the rational
+    modulo several primes with the numpy backend, before lifting it back to
+    QQ (see symbaudio.compression.multimodular). Its result is always
+    normalized, and is None if it cannot be lifted.
+
+    The "euclid" algorithm is the classical, quadratic remainder sequence. The
+    "halfgcd" algorithm is subquadratic, but has a higher overhead. The "auto"
+    algorithm selects halfgcd once k reaches HALFGCD_CROSSOVER. All algorithms
+    produce equal results.
+
+    Over the integers ("ZZ"), the "subresultant" algorithm avoids fractions
+    altogether (and "auto" selects it). Its result is a multiple of the result
+    over QQ, which is recovered with normalized set. In general, a normalized
+    result is mapped to the field of fractions of dom, and scaled as in
+    normalize, so that every domain and algorithm gives the same canonical pair.
+
+    If a Budget is given, the reconstruction is abandoned once the budget is
+    exceeded, and None is returned (budget.status names the exceeded limit).
+    The euclid algorithm checks the budget after each iteration, whereas the
+    recursive halfgcd algorithm only checks the result (the time and width of
+    its coefficients).
+
 	Arguments
     k -- the order of the recurrence relation
     coefficients -- the coefficients from which to reconstruct
     dom -- the Euclidean domain over which to reconstruct (default: "QQ")
+    backend -- the polynomial arithmetic to use, from BACKENDS (default: "sympy")
+    algorithm -- the XGCD algorithm to use, from ALGORITHMS (default: "euclid")
+    budget -- keyword argument to set a Budget (default: None)
+    normalized -- keyword argument to normalize the result, over a field (default: False)
     """
     assert(len(coefficients) >= 2 * k)
-    n = 2 * k
-    a0 = sympy.Poly(sympy.abc.x ** n, sympy.abc.x, domain=dom)
-    a1 = sympy.Poly(reversed(coefficients[:n]), sympy.abc.x, domain=dom)
-
-    zero = sympy.Poly([0], sympy.abc.x, domain=dom)
-    if a1 == zero:
-        return (zero, zero)
+    assert(backend in BACKENDS)
+    assert(algorithm in ALGORITHMS)
+    dom = sympy.polys.polyoptions.Domain.preprocess(dom)
+    integral = isinstance(dom, sympy.polys.domains.IntegerRing)
+    if algorithm == "auto" and integral:
+        algorithm = "subresultant"
+    elif algorithm == "auto":
+        algorithm = "halfgcd" if k >= HALFGCD_CROSSOVER else "euclid"
+    assert(integral == (algorithm == "subresultant"))
+    if budget is not None:
+        budget.start()
+    if backend == "multimodular":
+        assert(isinstance(dom, sympy.polys.domains.RationalField) and budget is None)
+        result = symbaudio.compression.multimodular.reconstruct_rational(
+            k, coefficients, algorithm)
+    elif backend == "numpy":
+        result = _modular_impl(k, coefficients, dom, algorithm, budget)
     else:
-        return _reconstruction_impl(a0, a1, k - 1, dom)
+        result = _sympy_impl(k, coefficients, dom, algorithm, budget)
+    if result is not None and budget is not None and algorithm == "halfgcd":
+        bits = _coeff_bits(*result) if budget.max_bits is not None else 0
+        if not budget.spend(bits, 0):
+            return None
+    if result is not None and normalized:
+        (num, den) = result
+        return normalize(num.to_field(), den.to_field())
+    return result
@@ -0,0 +1,49 @@
+"""
+This script manages a feature cache produced by run_metrics.py. By default, the
+entire cache is cleared. If paths are given, only the entries for those audio
+files (or the .wav files beneath those directories) are removed.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import symbaudio.analysis.cache
+import symbaudio.utils.filesystem
+
+class Invalidator:
+    """ Wrapper class to FeatureCache.invalidate. Conforms to apply_to_files. """
+
+    def __init__(self, cache):
+        """ Sets the cache to invalidate. """
+        self._cache = cache
+
+    def __call__(self, path, rel):
+        """ Removes all cache entries for the file found at path. """
+        self._cache.invalidate(path)
+
+def main():
+    """ Clears or invalidates a feature cache.
+
+	Params:
+	arg1 -- the cache directory
+	arg2... -- (optional) audio files or directories to invalidate
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("cache")
+    parser.add_argument("paths", nargs="*")
+    args = parser.parse_args()
+
+    cache = symbaudio.analysis.cache.FeatureCache(args.cache)
+    if len(args.paths) == 0:
+        cache.invalidate()
+    for path in args.paths:
+        symbaudio.utils.filesystem.apply_to_files(path, ".wav", Invalidator(cache))
+    sys.stderr.write("%i bytes remain in the cache\n" % cache.size())
+
+if __name__ == "__main__":
+    main()
+else:
+    raise ImportError("invalidate_feature_cache is a script and should not be imported.")
@@ -4,92 +4,167 @@ is passed through the XGCD compression procedure, and the coefficient size is
 analyzed. A log to stderr will display the current file being analyzed.
 
 An additional parameter may be passed to define the coefficient domain used in
-compression.
+compression (rational, integer or finite), along with the polynomial backend
+used for reconstruction. Files may be analyzed in parallel, across a pool of
+worker processes. Results may be written as text (the default) or as a
+columnar result set (see symbaudio.utils.results). If a manifest is given,
+files which were already analyzed with the same parameters (and have not
+changed since) are skipped, so that an interrupted scan may be resumed. A
+reconstruction may be given a budget (of coefficient width, iterations or
+time), in which case frames which exceed the budget are abandoned, and a
+status column records the exceeded limit. A profile of the reconstruction may
+be written at the end of the run. Every rational is normalized before it is
+measured (see symbaudio.compression.xgcd.normalize), so that the algorithms
+and backends are comparable.
+
+By default, 300 frames are sampled from each file. Over the finite domain, with
+the numpy backend, every frame may be analyzed instead, in which case blocks of
+frames are reconstructed together (see
+symbaudio.compression.modular.reconstruct_rational_batch).
 """
 
+import argparse
+import multiprocessing
 import os
-import numpy
-import random
 import scipy.stats
-import sympy
 import sys
 import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import symbaudio.analysis.audio
+import symbaudio.compression.measure
 import symbaudio.compression.xgcd
 import symbaudio.utils.filesystem
-import symbaudio.utils.poly
+import symbaudio.utils.manifest
+import symbaudio.utils.results
 import symbaudio.utils.time
 
-def analyze_file(file, framewidth, use_finite, samps):
-    """ Runs compression tests on file, and logs results to stdout.
-
-    Arguments:
-    file -- the file to analyze (assumed to be a .wav)
-    framewidth -- the number of points in each compression frame
-    use_finite -- constructs coefficients over a finite field
-
-    Requires: an even number of samples per frame.
-    """
-    assert(framewidth % 2 == 0)
-    audio = symbaudio.analysis.audio.AudioFile(file)
-
-    framecount = audio.sample_count // framewidth
-
-    timer = symbaudio.utils.time.PerfTimer()
-    k = framewidth // 2
-    dom = "QQ"
-    if use_finite:
-        dom = sympy.GF(65537)
-    for i in random.sample(range(0, framecount), samps):
-        window = audio.raw[i*framewidth:(i+1)*framewidth,0]
-
-        timer.reset()
-        (num, dom) = symbaudio.compression.xgcd.reconstruct_rational(k, window)
-
-        ts        = timer.get_elapsed_ns()
-        max_coeff = max(symbaudio.utils.poly.max_coeff(num), symbaudio.utils.poly.max_coeff(dom))
-        zero_cnt  = symbaudio.utils.poly.count_zeros(num) + symbaudio.utils.poly.count_zeros(dom)
-        zero_orig = framecount - numpy.count_nonzero(window)
-        coeff_cnt = num.degree() + dom.degree()
-
-        try:
-            print("%i,%i,%i,%i,%i,%i" % (i, ts, max_coeff, zero_cnt, zero_orig, coeff_cnt))
-        except Exception:
-            sys.stderr.write("Unexpected value in frame %s\n" % str(i))
-
-class Analyzer:
-    """ Wrapper class to analyze function. Passes fixed arguments to analyze_file. """
-
-    def __init__(self, framewidth, use_finite, samps):
-        """ Sets the parameters for analyze_function. See analyze_function. """
-        self._framewidth = framewidth
-        self._use_finite = use_finite
-        self._samps = samps
-
-    def __call__(self, path, rel):
-        """ Runs analyze_function against the file found at path. """
-        if rel is not "":
-            print(rel)
-        analyze_file(path, self._framewidth, self._use_finite, self._samps)
-
 def main():
     """ Analyzes compression performance against a specific file.
 
 	Params:
 	arg1 -- path to file
 	arg2 -- size of each frame
-	arg3 -- compression domain ("rational" or "finite")
+	arg3 -- compression domain ("rational", "integer" or "finite")
+	--backend -- the reconstruction backend ("sympy", "numpy" or "multimodular")
+	--algorithm -- the reconstruction algorithm ("euclid", "halfgcd", "subresultant", "auto"
+	               or "bm"); the integer domain requires "subresultant" or "auto"
+	--workers -- the number of worker processes (0 for one per core)
+	--frame-workers -- the number of worker processes per file (0 for one per core)
+	--seed -- seeds the selection of frames (default: 0)
+	--manifest -- a file in which to record analyzed files, to skip on later runs
+	--format -- the output format ("text", "npz" or "parquet")
+	--output -- the output path (default: stdout, for text)
+	--max-bits -- abandons frames once a coefficient is wider, in bits
+	--max-iterations -- abandons frames after a number of XGCD iterations
+	--max-ms -- abandons frames after a wall time, in ms
+	--profile -- a file in which to write a JSON profile (also reported to stderr)
+	--all-frames -- analyzes every frame, rather than 300 (finite domain, numpy backend)
+	--early-exit -- abandons frames whose recurrences exceed order framewidth / 2 (bm only)
     """
-    file = sys.argv[1]
-    framewidth = int(sys.argv[2])
-    use_finite = (sys.argv[3] == "finite")
-    analyzer = Analyzer(framewidth, use_finite, 300)
-    symbaudio.utils.filesystem.apply_to_files(sys.argv[1], ".wav", analyzer)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("framewidth", type=int)
+    parser.add_argument("domain", choices=list(symbaudio.compression.measure.DOMAINS))
+    parser.add_argument("--backend", default="sympy",
+                        choices=symbaudio.compression.xgcd.BACKENDS)
+    parser.add_argument("--algorithm", default="euclid",
+                        choices=symbaudio.compression.xgcd.ALGORITHMS + ["bm"])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--frame-workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--manifest")
+    parser.add_argument("--format", default="text", choices=symbaudio.utils.results.FORMATS)
+    parser.add_argument("--output")
+    parser.add_argument("--max-bits", type=int)
+    parser.add_argument("--max-iterations", type=int)
+    parser.add_argument("--max-ms", type=float)
+    parser.add_argument("--profile")
+    parser.add_argument("--all-frames", action="store_true")
+    parser.add_argument("--early-exit", action="store_true")
+    args = parser.parse_args()
+    if args.workers != 1 and args.frame_workers != 1:
+        parser.error("--workers and --frame-workers are mutually exclusive")
+    if (args.domain == "integer") != (args.algorithm == "subresultant"):
+        if not (args.domain == "integer" and args.algorithm == "auto"):
+            parser.error("the integer domain requires the subresultant (or auto) algorithm")
+    if args.domain == "integer" and args.backend != "sympy":
+        parser.error("the integer domain requires the sympy backend")
+    if args.backend == "multimodular" and args.domain != "rational":
+        parser.error("the multimodular backend requires the rational domain")
+    if args.algorithm == "bm" and args.backend == "multimodular":
+        parser.error("the bm algorithm requires the sympy or numpy backend")
+    if args.early_exit and args.algorithm != "bm":
+        parser.error("--early-exit requires the bm algorithm")
+    if args.format != "text" and args.output is None:
+        parser.error("--output is required for binary formats")
+    if args.profile is not None and (args.workers != 1 or args.frame_workers != 1):
+        parser.error("--profile requires a single worker")
+    symbaudio.utils.time.PROFILER.enable(args.profile is not None)
+    # Rational coefficients may exceed the default limit on the digits of ints printed.
+    if hasattr(sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(0)
+    budget = None
+    limits = {"max_bits": args.max_bits, "max_iterations": args.max_iterations,
+              "max_ns": None if args.max_ms is None else int(args.max_ms * 1e6)}
+    if any(limit is not None for limit in limits.values()):
+        if args.algorithm == "bm":
+            parser.error("budgets are not supported by the bm algorithm")
+        if args.backend == "multimodular":
+            parser.error("budgets are not supported by the multimodular backend")
+        budget = symbaudio.compression.xgcd.Budget(**limits)
+    if args.all_frames and (args.domain != "finite" or args.backend != "numpy"):
+        parser.error("--all-frames requires the finite domain and the numpy backend")
+    if args.all_frames and (budget is not None or args.algorithm == "bm"):
+        parser.error("--all-frames does not support budgets or the bm algorithm")
+
+    manifest = None
+    if args.manifest is not None:
+        params = {"script": "measure_compression_params", "framewidth": args.framewidth,
+                  "domain": args.domain, "backend": args.backend,
+                  "algorithm": args.algorithm, "seed": args.seed,
+                  "samps": "all" if args.all_frames else 300, "normalized": True}
+        if budget is not None:
+            params["budget"] = limits
+        if args.early_exit:
+            params["early_exit"] = True
+        manifest = symbaudio.utils.manifest.Manifest(args.manifest, params)
+
+    columns = symbaudio.compression.measure.COLUMNS
+    text_fmt = symbaudio.compression.measure.TEXT_FMT
+    if symbaudio.compression.measure.has_status(args.backend, budget, args.early_exit):
+        columns = symbaudio.compression.measure.BUDGET_COLUMNS
+        text_fmt = symbaudio.compression.measure.BUDGET_TEXT_FMT
+    writer = symbaudio.utils.results.open_writer(
+        args.format, args.output, columns, text_fmt, layout="header")
+    with writer:
+        if args.frame_workers != 1:
+            shards = args.frame_workers or os.cpu_count()
+            with multiprocessing.Pool(shards) as pool:
+                analyzer = symbaudio.compression.measure.Analyzer(
+                    args.framewidth, args.domain, 300, args.backend, args.algorithm,
+                    args.seed, pool, shards, budget, args.all_frames, args.early_exit)
+                symbaudio.utils.filesystem.apply_to_files(
+                    args.path, ".wav", analyzer, manifest=manifest, collect=writer.write,
+                    flush=writer.flush)
+            return
+
+        analyzer = symbaudio.compression.measure.Analyzer(
+            args.framewidth, args.domain, 300, args.backend, args.algorithm, args.seed,
+            budget=budget, all_frames=args.all_frames, early_exit=args.early_exit)
+        if args.workers == 1:
+            symbaudio.utils.filesystem.apply_to_files(
+                args.path, ".wav", analyzer, manifest=manifest, collect=writer.write,
+                flush=writer.flush)
+        else:
+            symbaudio.utils.filesystem.apply_to_files_parallel(
+                args.path, ".wav", analyzer, args.workers or None, manifest=manifest,
+                collect=writer.write, flush=writer.flush)
+    if args.profile is not None:
+        symbaudio.utils.time.PROFILER.report(sys.stderr)
+        symbaudio.utils.time.PROFILER.dump(args.profile)
 
 if __name__ == "__main__":
     main()
-else:
+elif __name__ != "__mp_main__":
     raise ImportError("measure_compression_params is a script and should not be imported.")
@@ -0,0 +1,81 @@
+"""
+This script converts result dumps into an array store, and queries them. The
+legacy text dumps (of measure_compression_params.py and run_metrics.py) are
+parsed once, and saved as an array store, which is memory-mapped by later
+queries (see symbaudio.utils.results). Queries also accept the binary result
+sets written by either script, so that past and new runs may be combined.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import symbaudio.utils.legacy
+import symbaudio.utils.results
+
+def load(paths):
+    """ Loads and combines result sets, parsing text dumps as needed.
+
+    Arguments:
+    paths -- array stores, binary result sets, or legacy text dumps
+    """
+    results = []
+    for path in paths:
+        if os.path.isfile(path) and path.endswith(".txt"):
+            results.append(symbaudio.utils.legacy.parse_dump(path))
+        else:
+            results.append(symbaudio.utils.results.read_results(path))
+    if len(results) == 1:
+        return results[0]
+    return symbaudio.utils.results.concatenate(results)
+
+def convert(args):
+    """ Saves the inputs as an array store. """
+    results = load(args.inputs)
+    symbaudio.utils.results.save_store(args.store, results)
+    sys.stderr.write("%i rows from %i files\n" % (len(results), len(results.files)))
+
+def query(args):
+    """ Prints percentiles of a column, within groups of rows. """
+    results = load(args.inputs)
+    if args.column not in results.columns:
+        raise ValueError("unknown column: %s" % args.column)
+    if args.by != "file" and args.by not in results.columns:
+        raise ValueError("unknown column: %s" % args.by)
+    (keys, table) = symbaudio.utils.results.percentiles(results, args.column, args.q, args.by)
+    print(" ".join([args.by] + ["p%g" % q for q in args.q]))
+    for (key, row) in zip(keys, table):
+        print(" ".join([str(key)] + ["%f" % value for value in row]))
+
+def main():
+    """ Converts or queries result dumps.
+
+	Params:
+	convert arg1 arg2... -- the store to write, and the dumps to convert
+	query arg1 arg2... -- the column to query (unbounded int columns, such as max_coeff, are
+	                      queried by bit length), and the stores or dumps to query
+	--by -- group rows by "file" or by a column (default: "file")
+	--q -- a comma separated list of percentiles (default: "50,90,99")
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    converter = commands.add_parser("convert")
+    converter.add_argument("store")
+    converter.add_argument("inputs", nargs="+")
+    converter.set_defaults(run=convert)
+    querier = commands.add_parser("query")
+    querier.add_argument("column")
+    querier.add_argument("inputs", nargs="+")
+    querier.add_argument("--by", default="file")
+    querier.add_argument("--q", default=[50.0, 90.0, 99.0],
+                         type=lambda spec: [float(q) for q in spec.split(",")])
+    querier.set_defaults(run=query)
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
+else:
+    raise ImportError("query_results is a script and should not be imported.")
@@ -0,0 +1,162 @@
+"""
+This script compresses wave files with the rational codec (see
+symbaudio.compression.codec), and decompresses them. Each frame is encoded as
+the numerator and denominator of a rational function (when the frame satisfies
+a short linear recurrence), or else as raw or delta coded samples, whichever is
+smallest.
+
+The measure command recursively scans a directory. Every *.wav file found is
+encoded and decoded (in a temporary directory), the decoded samples are checked
+against the original, and the achieved compression ratio and throughput are
+reported. A log to stderr will display the current file being measured. Results
+may be written as text (the default) or as a columnar result set (see
+symbaudio.utils.results).
+"""
+
+import argparse
+import multiprocessing
+import numpy
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import symbaudio.analysis.audio
+import symbaudio.compression.codec
+import symbaudio.utils.filesystem
+import symbaudio.utils.results
+
+# The (name, dtype) of each column of the rows of measure_file. The ratio is
+# the size of the samples over the size of the container, and the throughput
+# is in bytes of samples per second.
+COLUMNS = [("samples", numpy.int64), ("input_bytes", numpy.int64),
+           ("output_bytes", numpy.int64), ("ratio", numpy.float64),
+           ("encode_bps", numpy.float64), ("decode_bps", numpy.float64)] + \
+          [(mode, numpy.int64) for mode in symbaudio.compression.codec.MODES]
+
+TEXT_FMT = "%i,%i,%i,%f,%f,%f" + ",%i" * len(symbaudio.compression.codec.MODES)
+
+def measure_file(file, framewidth, max_order, pool=None):
+    """ Encodes and decodes a file, and returns the statistics as a single row.
+
+    Raises ValueError if the decoded samples differ from the original.
+
+    Arguments:
+    file -- the file to measure (assumed to be a .wav of integer samples)
+    framewidth -- the number of samples in each frame
+    max_order -- the largest order of rational frames
+    pool -- keyword argument to encode and decode in a multiprocessing.Pool (default: None)
+    """
+    with tempfile.TemporaryDirectory() as tempdir:
+        container = os.path.join(tempdir, "encoded.sbac")
+        decoded = os.path.join(tempdir, "decoded.wav")
+        stats = symbaudio.compression.codec.encode_file(
+            file, container, framewidth, max_order, pool)
+        decode_ns = symbaudio.compression.codec.decode_file(container, decoded, pool)["decode_ns"]
+        original = symbaudio.analysis.audio.AudioFile(file)
+        if not numpy.array_equal(original.raw, symbaudio.analysis.audio.AudioFile(decoded).raw):
+            raise ValueError("decoded samples differ from the original: %s" % file)
+        del original
+
+    row = (stats["samples"], stats["input_bytes"], stats["output_bytes"], stats["ratio"],
+           stats["input_bytes"] / stats["encode_ns"] * 1e9,
+           stats["input_bytes"] / decode_ns * 1e9)
+    return [row + tuple(stats[mode] for mode in symbaudio.compression.codec.MODES)]
+
+class Measurer:
+    """ Wrapper class to measure function. Passes fixed arguments to measure_file. """
+
+    def __init__(self, framewidth, max_order, pool=None):
+        """ Sets the parameters for measure_file. See measure_file. """
+        self._framewidth = framewidth
+        self._max_order = max_order
+        self._pool = pool
+
+    def __call__(self, path, rel):
+        """ Runs measure_file against the file found at path. """
+        return measure_file(path, self._framewidth, self._max_order, self._pool)
+
+def report(stats, nbytes, ns):
+    """ Logs the statistics of an encoding or decoding to stderr, with its throughput. """
+    sys.stderr.write(" ".join("%s=%s" % (key, stats[key]) for key in sorted(stats)) + "\n")
+    sys.stderr.write("%.2f MB/s\n" % (nbytes / ns * 1e3))
+
+def encode(args, pool):
+    """ Encodes a wave file. """
+    stats = symbaudio.compression.codec.encode_file(
+        args.input, args.output, args.framewidth, args.max_order, pool)
+    report(stats, stats["input_bytes"], stats["encode_ns"])
+
+def decode(args, pool):
+    """ Decodes a container. """
+    stats = symbaudio.compression.codec.decode_file(args.input, args.output, pool)
+    report(stats, stats["sample_bytes"], stats["decode_ns"])
+
+def measure(args, pool):
+    """ Measures every file of a directory. """
+    writer = symbaudio.utils.results.open_writer(
+        args.format, args.output, COLUMNS, TEXT_FMT, layout="header")
+    with writer:
+        measurer = Measurer(args.framewidth, args.max_order, pool)
+        if args.workers == 1:
+            symbaudio.utils.filesystem.apply_to_files(
+                args.path, ".wav", measurer, collect=writer.write)
+        else:
+            symbaudio.utils.filesystem.apply_to_files_parallel(
+                args.path, ".wav", measurer, args.workers or None, collect=writer.write)
+
+def main():
+    """ Compresses, decompresses, or measures the compression of wave files.
+
+	Params:
+	encode arg1 arg2 -- the wave file to encode, and the container to write
+	decode arg1 arg2 -- the container to decode, and the wave file to write
+	measure arg1 -- the directory to measure
+	--framewidth -- the number of samples in each frame (default: 1024)
+	--max-order -- the largest order of rational frames (default: 32)
+	--frame-workers -- the number of worker processes per file (0 for one per core)
+	--workers -- the number of worker processes, for measure (0 for one per core)
+	--format -- the output format of measure ("text", "npz" or "parquet")
+	--output -- the output path of measure (default: stdout, for text)
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--framewidth", type=int, default=1024)
+    parser.add_argument("--max-order", type=int, default=32)
+    parser.add_argument("--frame-workers", type=int, default=1)
+    commands = parser.add_subparsers(dest="command", required=True)
+    encoder = commands.add_parser("encode")
+    encoder.add_argument("input")
+    encoder.add_argument("output")
+    encoder.set_defaults(run=encode)
+    decoder = commands.add_parser("decode")
+    decoder.add_argument("input")
+    decoder.add_argument("output")
+    decoder.set_defaults(run=decode)
+    measurer = commands.add_parser("measure")
+    measurer.add_argument("path")
+    measurer.add_argument("--workers", type=int, default=1)
+    measurer.add_argument("--format", default="text", choices=symbaudio.utils.results.FORMATS)
+    measurer.add_argument("--output")
+    measurer.set_defaults(run=measure)
+    args = parser.parse_args()
+    if args.framewidth <= 0 or args.framewidth >= 2 ** 16:
+        parser.error("--framewidth must be positive, and less than 65536")
+    if args.max_order < 0:
+        parser.error("--max-order must be non-negative")
+    if args.command == "measure":
+        if args.workers != 1 and args.frame_workers != 1:
+            parser.error("--workers and --frame-workers are mutually exclusive")
+        if args.format != "text" and args.output is None:
+            parser.error("--output is required for binary formats")
+
+    if args.frame_workers == 1:
+        args.run(args, None)
+    else:
+        with multiprocessing.Pool(args.frame_workers or os.cpu_count()) as pool:
+            args.run(args, pool)
+
+if __name__ == "__main__":
+    main()
+elif __name__ != "__mp_main__":
+    raise ImportError("run_codec is a script and should not be imported.")
@@ -1,48 +1,228 @@
 """
 This script recursively scans a directory. For ever *.wav file found, the file
 is passed through the feature analysis framework, and the results are logged to
-stdout. A log to stderr will display the current file being analyzed.
+stdout. A log to stderr will display the current file being analyzed. Results
+may instead be written as a columnar result set (see symbaudio.utils.results).
+
+Files may be analyzed in parallel, across a pool of worker processes. The
+first-order features of each file may be kept in a persistent cache, so that
+unchanged files are not re-analyzed on later runs. Several channels (and
+downmixes) may be analyzed in one pass, in which case a line is logged per
+channel, with the channel following the file name. The features may be
+selected by name, in which case a header line (starting with #) names each
+column. If a manifest is given, files which were already analyzed (and have
+not changed since) are skipped, so that only new results are appended to an
+existing log. A profile of each stage of the analysis may be written at the
+end of the run.
 """
 
+import argparse
+import numpy
 import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import symbaudio.analysis.audio
+import symbaudio.analysis.cache
 import symbaudio.analysis.feature
+import symbaudio.analysis.registry
+import symbaudio.analysis.spectral
 import symbaudio.utils.filesystem
+import symbaudio.utils.manifest
+import symbaudio.utils.results
+import symbaudio.utils.time
+
+def result_columns(fields, channels=None):
+    """ Returns the (name, dtype) of each column of the rows of analyze_file.
 
-_LOG_FMT = "%s %f %i %f %f %f %f %f %f %f %f"
+    Each field is given as its mean, followed by its modulation.
 
-def analyze_file(target, rel):
-    """ Aggregates metrics on an audio file, and writes to stdout.
+    Arguments:
+    fields -- the names of the features
+    channels -- keyword argument to add a channel column (default: None)
+    """
+    columns = []
+    if channels is not None:
+        columns.append(("channel", str))
+    columns += [("seconds", numpy.float64), ("rate", numpy.int64)]
+    for field in fields:
+        columns += [(field + "_mean", numpy.float64), (field + "_mod", numpy.float64)]
+    return columns
+
+def text_format(fields, channels=None):
+    """ Returns the text format of the rows of analyze_file. See result_columns. """
+    fmt = "%f %i" + " %f %f" * len(fields)
+    if channels is not None:
+        fmt = "%s " + fmt
+    return fmt
+
+def log_header(writer, fields, channels=None):
+    """ Writes a header line to a TextWriter, naming each column.
+
+    Arguments:
+    writer -- the TextWriter to write to
+    fields -- the names of the features
+    channels -- keyword argument to add a channel column (default: None)
+    """
+    columns = ["file"] + [name for (name, _) in result_columns(fields, channels)]
+    writer.comment(" ".join(columns))
+
+def _metrics(secs, rate, fields, second_order):
+    """ Returns the row for the second-order statistics of a channel. """
+    row = [secs, rate]
+    for field in fields:
+        row += [second_order[field].mean, second_order[field].modulation]
+    return tuple(row)
+
+def analyze_file(target, rel, cache=None, channels=None, hop=None, window="rect", fields=None):
+    """ Aggregates metrics on an audio file, and returns them as rows.
 
     Conforms to the apply_to_files signature. Assumes target is a wave file.
+    There is a single row, unless several channels are analyzed, in which case
+    there is a row per channel. See result_columns.
 
     Arguments:
     target -- the file to scan
     rel -- the relative path of the file, in reference to the root
+    cache -- keyword argument to set a FeatureCache (default: None)
+    channels -- keyword argument to analyze several channels, in one pass (default: None)
+    hop -- keyword argument to set the samples between frames (default: the frame size)
+    window -- keyword argument to name a window function (default: "rect")
+    fields -- keyword argument to name the features (default: FeatureSeries.FIELDS)
     """
+    if fields is None:
+        fields = symbaudio.analysis.feature.FeatureSeries.FIELDS
     audio = symbaudio.analysis.audio.AudioFile(target)
-    summary = symbaudio.analysis.feature.AudioSummary(audio)
-    secs = summary.length_s
     rate = audio.sample_rate_hz
-    c_avg = summary.second_order["centroid"].mean
-    c_mod = summary.second_order["centroid"].modulation
-    s_avg = summary.second_order["spread"].mean
-    s_mod = summary.second_order["spread"].modulation
-    p_avg = summary.second_order["energy"].mean
-    p_mod = summary.second_order["energy"].modulation
-    z_avg = summary.second_order["zeros"].mean
-    z_mod = summary.second_order["zeros"].modulation
-    print(_LOG_FMT % (rel, secs, rate, c_avg, c_mod, s_avg, s_mod, p_avg, p_mod, z_avg, z_mod))
+    if channels is None:
+        summary = symbaudio.analysis.feature.AudioSummary(audio, cache=cache, hop=hop,
+                                                         window=window, fields=fields)
+        return [_metrics(summary.length_s, rate, fields, summary.second_order)]
+
+    summary = symbaudio.analysis.feature.MultiChannelSummary(
+        audio, channels, cache=cache, hop=hop, window=window, fields=fields)
+    rows = []
+    for i in range(0, len(channels)):
+        row = _metrics(summary.length_s, rate, fields, summary.second_order[i])
+        rows.append((str(channels[i]),) + row)
+    return rows
+
+def parse_channels(spec):
+    """ Parses a comma separated list of channel indices and mixes.
+
+    Arguments:
+    spec -- the list to parse (e.g., "0,1,mid,side")
+    """
+    channels = []
+    for chan in spec.split(","):
+        if chan in symbaudio.analysis.feature.MIXES:
+            channels.append(chan)
+        else:
+            channels.append(int(chan))
+    return channels
+
+def parse_features(spec):
+    """ Parses a comma separated list of feature names.
+
+    Arguments:
+    spec -- the list to parse (e.g., "centroid,rms,flux")
+    """
+    fields = spec.split(",")
+    for field in fields:
+        if field not in symbaudio.analysis.registry.FEATURES:
+            raise ValueError("unknown feature: %s" % field)
+    return fields
+
+class Analyzer:
+    """ Wrapper class to analyze_file. Passes fixed arguments to analyze_file. """
+
+    def __init__(self, cache=None, channels=None, hop=None, window="rect", fields=None):
+        """ Sets the parameters for analyze_file. See analyze_file. """
+        self._cache = cache
+        self._channels = channels
+        self._hop = hop
+        self._window = window
+        self._fields = fields
+
+    def __call__(self, path, rel):
+        """ Runs analyze_file against the file found at path. """
+        return analyze_file(path, rel, self._cache, self._channels, self._hop, self._window,
+                            self._fields)
 
 def main():
-    """ Initiates a recursive scan, using sys.argv[1] as a root. """
-    symbaudio.utils.filesystem.apply_to_files(sys.argv[1], ".wav", analyze_file)
+    """ Initiates a recursive scan, using sys.argv[1] as a root.
+
+	Params:
+	arg1 -- path to file
+	--workers -- the number of worker processes (0 for one per core)
+	--cache -- a directory in which to cache first-order features
+	--cache-size -- the maximum size of the cache, in MiB (default: 1024)
+	--manifest -- a file in which to record analyzed files, to skip on later runs
+	--channels -- a comma separated list of channels and mixes (e.g., "0,1,mid,side")
+	--hop -- the number of samples between frames (default: the frame size)
+	--window -- the window function applied to each frame (default: "rect")
+	--features -- a comma separated list of features (e.g., "centroid,rms,flux")
+	--format -- the output format ("text", "npz" or "parquet")
+	--output -- the output path (default: stdout, for text)
+	--profile -- a file in which to write a JSON profile (also reported to stderr)
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--cache")
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--manifest")
+    parser.add_argument("--channels", type=parse_channels)
+    parser.add_argument("--hop", type=int)
+    parser.add_argument("--window", default="rect",
+                        choices=list(symbaudio.analysis.spectral.WINDOWS))
+    parser.add_argument("--features", type=parse_features)
+    parser.add_argument("--format", default="text", choices=symbaudio.utils.results.FORMATS)
+    parser.add_argument("--output")
+    parser.add_argument("--profile")
+    args = parser.parse_args()
+    if args.format != "text" and args.output is None:
+        parser.error("--output is required for binary formats")
+    if args.profile is not None and args.workers != 1:
+        parser.error("--profile requires a single worker")
+    symbaudio.utils.time.PROFILER.enable(args.profile is not None)
+
+    cache = None
+    if args.cache is not None:
+        cache = symbaudio.analysis.cache.FeatureCache(args.cache, args.cache_size << 20)
+    manifest = None
+    if args.manifest is not None:
+        params = {"script": "run_metrics", "framesize": 1024, "chan": 0}
+        if args.channels is not None:
+            params["chan"] = args.channels
+        if args.hop is not None or args.window != "rect":
+            params["hop"] = args.hop
+            params["window"] = args.window
+        if args.features is not None:
+            params["fields"] = args.features
+        manifest = symbaudio.utils.manifest.Manifest(args.manifest, params)
+    analyzer = Analyzer(cache, args.channels, args.hop, args.window, args.features)
+    fields = args.features or symbaudio.analysis.feature.FeatureSeries.FIELDS
+    with symbaudio.utils.results.open_writer(
+            args.format, args.output, result_columns(fields, args.channels),
+            text_format(fields, args.channels)) as writer:
+        fresh = manifest is None or len(manifest) == 0
+        if args.format == "text" and args.features is not None and fresh:
+            log_header(writer, args.features, args.channels)
+        if args.workers == 1:
+            symbaudio.utils.filesystem.apply_to_files(
+                args.path, ".wav", analyzer, manifest=manifest, collect=writer.write,
+                flush=writer.flush)
+        else:
+            symbaudio.utils.filesystem.apply_to_files_parallel(
+                args.path, ".wav", analyzer, args.workers or None, manifest=manifest,
+                collect=writer.write, flush=writer.flush)
+    if args.profile is not None:
+        symbaudio.utils.time.PROFILER.report(sys.stderr)
+        symbaudio.utils.time.PROFILER.dump(args.profile)
 
 if __name__ == "__main__":
     main()
-else:
+elif __name__ != "__mp_main__":
     raise ImportError("run_metrics is a script and should not be imported.")
@@ -0,0 +1,148 @@
+import json
+import multiprocessing
+import numpy
+import os
+import scipy.io.wavfile
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import symbaudio.utils.time
+
+def write_fixture(fn, seconds, sample_rate_hz=44100, channels=1, dtype=numpy.int16, seed=0):
+    """ Synthesizes a wave file, for use as a benchmark fixture.
+
+    Each channel is a mixture of a few tones (at seeded frequencies) and white
+    noise, scaled to half of the range of the sample type. The same arguments
+    always produce the same file.
+
+    Arguments:
+    fn -- the path to write the wave file to
+    seconds -- the length of the file, in seconds
+    sample_rate_hz -- keyword argument to set the sample rate (default: 44100)
+    channels -- keyword argument to set the number of channels (default: 1)
+    dtype -- keyword argument to set the sample type (default: numpy.int16)
+    seed -- keyword argument to seed the tones and noise (default: 0)
+    """
+    rng = numpy.random.default_rng(seed)
+    count = int(seconds * sample_rate_hz)
+    t = numpy.arange(0, count) / sample_rate_hz
+    signal = numpy.zeros((count, channels))
+    for chan in range(0, channels):
+        for freq in rng.uniform(50, sample_rate_hz / 4, 3):
+            signal[:, chan] += numpy.sin(2 * numpy.pi * freq * t)
+        signal[:, chan] += rng.normal(0, 0.25, count)
+    signal /= max(1e-12, numpy.max(numpy.abs(signal)))
+    if numpy.issubdtype(dtype, numpy.integer):
+        signal *= numpy.iinfo(dtype).max / 2
+    scipy.io.wavfile.write(fn, sample_rate_hz, signal.astype(dtype))
+
+def measure(f, repeats=5, warmup=1, allocations=True):
+    """ Times repeated calls to f, and returns a dict of summary statistics.
+
+    The statistics are the median and 95th percentile latency, in ns. If
+    allocations are measured, a final call to f is traced, and the peak bytes
+    allocated by the call are included. That call is not timed, since tracing
+    slows allocation.
+
+    Arguments:
+    f -- the function to call, without arguments
+    repeats -- keyword argument to set the number of timed calls (default: 5)
+    warmup -- keyword argument to set the number of untimed calls (default: 1)
+    allocations -- keyword argument to measure allocations (default: True)
+    """
+    assert(repeats > 0)
+    for _ in range(0, warmup):
+        f()
+    timer = symbaudio.utils.time.PerfTimer()
+    samples = []
+    for _ in range(0, repeats):
+        timer.reset()
+        f()
+        samples.append(timer.get_elapsed_ns())
+    stats = {"median_ns": float(numpy.median(samples)),
+             "p95_ns": float(numpy.percentile(samples, 95))}
+    if allocations:
+        tracemalloc.start()
+        try:
+            f()
+            stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return stats
+
+def peak_rss():
+    """ Returns the peak resident set size of this process, in bytes.
+
+    On Linux, the peak is read from /proc, since ru_maxrss also counts the
+    memory of the process before it was exec'd (i.e., its parent, for spawned
+    processes). Returns None if neither is available.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _call_and_report_rss(f, args):
+    """ Calls f in a worker process, and returns its result and peak RSS. """
+    result = f(*args)
+    return (result, peak_rss())
+
+def run_isolated(f, *args):
+    """ Calls f in a fresh process, and returns (result, peak RSS in bytes).
+
+    Since the peak resident set size of a process never decreases, each call
+    is made in a newly spawned process, so that the peak reflects only that
+    call (and the interpreter itself). The function must be picklable. See
+    peak_rss.
+
+    Arguments:
+    f -- the function to call
+    args -- the arguments to pass to f
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_call_and_report_rss, (f, args))
+
+def save_baseline(fn, results):
+    """ Saves benchmark results (a dict from case name to statistics) as JSON. """
+    tmp = fn + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    os.replace(tmp, fn)
+
+def load_baseline(fn):
+    """ Loads benchmark results saved by save_baseline. """
+    with open(fn) as f:
+        return json.load(f)
+
+def compare(results, baseline, threshold=0.2, metric="median_ns"):
+    """ Finds the cases which regressed against a baseline.
+
+    A case regresses when its metric exceeds the baseline by more than the
+    threshold (as a fraction of the baseline). Cases missing from either side
+    are ignored. The result is a list of (case, baseline, result, ratio).
+
+    Arguments:
+    results -- the current results, from case name to statistics
+    baseline -- the baseline results, from case name to statistics
+    threshold -- keyword argument to set the tolerated increase (default: 0.2)
+    metric -- keyword argument to name the compared statistic (default: "median_ns")
+    """
+    regressions = []
+    for case in sorted(results):
+        if case not in baseline or metric not in baseline[case]:
+            continue
+        (old, new) = (baseline[case][metric], results[case][metric])
+        ratio = new / old if old > 0 else float("inf") if new > 0 else 1.0
+        if ratio > 1 + threshold:
+            regressions.append((case, old, new, ratio))
+    return regressions
@@ -1,11 +1,15 @@
+import contextlib
+import io
+import multiprocessing
 import os
 import sys
 
-def _scan_dir(f, ext, path, rel, logs):
+def _scan_dir(ext, path, rel):
     """ Recursive implemntation of apply_to_files.
 
+    Yields the absolute and relative path of each matching file.
+
     Argument
-    f -- a function to apply to each matching file
     ext -- the extension to match
     path -- the directory/file to start the scan from
     rel -- the relative path of the file, in reference to the root
@@ -15,22 +19,110 @@ def _scan_dir(f, ext, path, rel, logs):
         target = os.path.join(path, rel)
     if os.path.isfile(target):
         if len(ext) == 0 or target[-len(ext):] == ext:
-            if logs: sys.stderr.write("%s\n" % rel)
-            f(target, rel)
+            yield (target, rel)
     elif os.path.isdir(target):
         for fn in os.listdir(target):
-            _scan_dir(f, ext, path, os.path.join(rel, fn), logs)
+            yield from _scan_dir(ext, path, os.path.join(rel, fn))
 
-def apply_to_files(path, ext, f, enable_logs=True):
+def _pending(files, manifest):
+    """ Filters out the files which a manifest records as current. """
+    for (target, rel) in files:
+        if manifest is None or not manifest.is_current(target, rel):
+            yield (target, rel)
+
+def apply_to_files(path, ext, f, enable_logs=True, manifest=None, collect=None, flush=None):
     """ Runs a recursive directory scan from a given directory.
 
     The extension of the file may be specified. A lambda will be applied to each
     file which matches.
 
+    If a manifest is given, files which it records as current are skipped. The
+    output of every other file is written to stdout in one piece once the file
+    is complete, and only then is the file recorded. Therefore an interrupted
+    scan may be resumed without duplicating or losing output.
+
+    If collect is given, it is called with the relative path and the return
+    value of f, for each file (and before the file is recorded). If flush is
+    also given, it is called before each file is recorded, so that collected
+    results which are buffered (e.g., by a results writer) are not lost.
+
     Arguments:
     path -- the directory/file to start the scan from
     ext -- the extension to match
     f -- a function to apply to each matching file
     enable_logs -- logs each file to stderr (default: True)
+    manifest -- keyword argument to set a symbaudio.utils.manifest.Manifest (default: None)
+    collect -- keyword argument to receive the result of each file (default: None)
+    flush -- keyword argument to persist collected results, before recording (default: None)
+    """
+    for (target, rel) in _pending(_scan_dir(ext, path, ""), manifest):
+        if enable_logs: sys.stderr.write("%s\n" % rel)
+        if manifest is None:
+            result = f(target, rel)
+        else:
+            (_, out, result) = _CapturedCall(f)((target, rel))
+            sys.stdout.write(out)
+            sys.stdout.flush()
+        if collect is not None:
+            collect(rel, result)
+        if manifest is not None:
+            if flush is not None:
+                flush()
+            manifest.record(target, rel)
+
+class _CapturedCall:
+    """ Wraps a file callback, capturing everything it writes to stdout. """
+
+    def __init__(self, f):
+        """ Sets the callback to wrap. """
+        self._f = f
+
+    def __call__(self, file):
+        """ Applies the callback to a (target, rel) pair, and returns its output and result. """
+        (target, rel) = file
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            result = self._f(target, rel)
+        return (file, out.getvalue(), result)
+
+def apply_to_files_parallel(path, ext, f, workers=None, enable_logs=True, ordered=False,
+                            manifest=None, collect=None, flush=None):
+    """ Runs a recursive directory scan, processing files across a process pool.
+
+    This is a parallel variant of apply_to_files. Each file is dispatched to a
+    worker process, and anything the callback prints is collected and written
+    to stdout in one piece once the file is complete. Therefore the output of
+    each file is never interleaved with the output of other files.
+
+    By default, results are written as soon as they complete. If ordered is set,
+    results are instead written in scan order. If a manifest, collect or flush
+    is given, it is used as in apply_to_files, from the parent process.
+    Therefore the results of f must be picklable.
+
+    Arguments:
+    path -- the directory/file to start the scan from
+    ext -- the extension to match
+    f -- a picklable function to apply to each matching file
+    workers -- the number of worker processes (default: one per core)
+    enable_logs -- logs each file to stderr once it completes (default: True)
+    ordered -- keyword argument to preserve scan order (default: False)
+    manifest -- keyword argument to set a symbaudio.utils.manifest.Manifest (default: None)
+    collect -- keyword argument to receive the result of each file (default: None)
+    flush -- keyword argument to persist collected results, before recording (default: None)
     """
-    _scan_dir(f, ext, path, "", enable_logs)
+    with multiprocessing.Pool(workers) as pool:
+        files = _pending(_scan_dir(ext, path, ""), manifest)
+        if ordered:
+            results = pool.imap(_CapturedCall(f), files)
+        else:
+            results = pool.imap_unordered(_CapturedCall(f), files)
+        for ((target, rel), out, result) in results:
+            if enable_logs: sys.stderr.write("%s\n" % rel)
+            sys.stdout.write(out)
+            sys.stdout.flush()
+            if collect is not None:
+                collect(rel, result)
+            if manifest is not None:
+                if flush is not None:
+                    flush()
+                manifest.record(target, rel)
@@ -0,0 +1,114 @@
+import numpy
+import os
+import re
+
+import symbaudio.utils.results
+
+# The columns of measure_compression_params text dumps, with the frame width
+# (inferred from the dump) appended. Dumps of budgeted runs (or of the
+# multimodular backend) have a trailing status column as well.
+COMPRESSION_COLUMNS = ["frame", "ns", "max_coeff", "zero_cnt", "zero_orig", "coeff_cnt"]
+
+# The columns of run_metrics text dumps, following the file name.
+METRICS_COLUMNS = ["seconds", "rate",
+                   "centroid_mean", "centroid_mod", "spread_mean", "spread_mod",
+                   "energy_mean", "energy_mod", "zeros_mean", "zeros_mod"]
+
+def _as_result_set(files, counts, columns):
+    """ Builds a ResultSet, given the row count of each file. """
+    file_ids = numpy.repeat(numpy.arange(0, len(files), dtype=numpy.int32), counts)
+    return symbaudio.utils.results.ResultSet(numpy.array(files, dtype=str), file_ids, columns)
+
+def parse_compression_dump(fn, framewidth=None):
+    """ Parses a text dump of measure_compression_params.
+
+    The dump interleaves file name lines with rows of comma separated integers.
+    Rows before the first file name are attributed to the file "". The frame
+    width of a dump is not recorded in the dump itself, so it is inferred from
+    names of the form rational_<framewidth>.txt, unless given. The maximum
+    coefficient is loaded exactly, since rational coefficients are unbounded
+    (see symbaudio.utils.results.int_column). If the rows have a trailing
+    status, it is loaded as a "status" column of strings.
+
+    Arguments:
+    fn -- the path to the dump
+    framewidth -- keyword argument to set the frame width (default: inferred from fn)
+    """
+    if framewidth is None:
+        match = re.search(r"_(\d+)\.txt$", os.path.basename(fn))
+        assert(match is not None)
+        framewidth = int(match.group(1))
+
+    files = []
+    counts = []
+    rows = []
+    with open(fn) as f:
+        for line in f:
+            line = line.strip()
+            if len(line) == 0 or line.startswith("#"):
+                continue
+            elif "," in line:
+                if len(files) == 0:
+                    files.append("")
+                    counts.append(0)
+                rows.append(line)
+                counts[-1] += 1
+            else:
+                files.append(line)
+                counts.append(0)
+
+    names = COMPRESSION_COLUMNS
+    if len(rows) > 0 and rows[0].count(",") == len(COMPRESSION_COLUMNS):
+        names = COMPRESSION_COLUMNS + ["status"]
+    if any(row.count(",") != len(names) - 1 for row in rows):
+        raise ValueError("rows of differing widths in %s" % fn)
+    values = numpy.array(",".join(rows).split(",") if rows else [], dtype=str)
+    values = values.reshape(-1, len(names))
+    columns = {}
+    for (i, name) in enumerate(names):
+        if name == "max_coeff":
+            (columns[name], columns[name + "_bits"]) = \
+                symbaudio.utils.results.int_column(values[:, i])
+        elif name == "status":
+            columns[name] = values[:, i]
+        else:
+            columns[name] = values[:, i].astype(numpy.int64)
+    columns["framewidth"] = numpy.full(len(values), framewidth, dtype=numpy.int64)
+    return _as_result_set(files, counts, columns)
+
+def parse_metrics_dump(fn):
+    """ Parses a text dump of run_metrics (with the default features).
+
+    Each line is a file name, followed by its metrics. Since file names may
+    contain spaces, the metrics are split from the end of the line. Comment
+    lines (starting with #) are skipped.
+
+    Arguments:
+    fn -- the path to the dump
+    """
+    files = []
+    rows = []
+    with open(fn) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if len(line.strip()) == 0 or line.startswith("#"):
+                continue
+            fields = line.rsplit(" ", len(METRICS_COLUMNS))
+            files.append(fields[0])
+            rows.append(fields[1:])
+    values = numpy.array(rows, dtype=numpy.float64).reshape(-1, len(METRICS_COLUMNS))
+    columns = {name: values[:, i] for (i, name) in enumerate(METRICS_COLUMNS)}
+    columns["rate"] = columns["rate"].astype(numpy.int64)
+    return _as_result_set(files, numpy.ones(len(files), dtype=numpy.int64), columns)
+
+def parse_dump(fn):
+    """ Parses a text dump of either script, detecting its kind by its rows.
+
+    Arguments:
+    fn -- the path to the dump
+    """
+    with open(fn) as f:
+        for line in f:
+            if "," in line:
+                return parse_compression_dump(fn)
+    return parse_metrics_dump(fn)
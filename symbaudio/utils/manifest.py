@@ -0,0 +1,72 @@
+import json
+import os
+
+class Manifest:
+    """ An append-only record of the files processed under a set of parameters.
+
+    Each line of the manifest is a JSON object describing one processed file:
+    its relative path, size, modification time, and the parameters it was
+    processed with. A file is current if it has a record with the same size,
+    modification time and parameters. Records are flushed to disk as soon as
+    they are written, so an interrupted run may be resumed.
+    """
+
+    def __init__(self, fn, params):
+        """ Opens (or creates) a manifest.
+
+        Arguments:
+        fn -- the path to the manifest file
+        params -- a JSON-serializable dictionary describing the processing
+        """
+        self._fn = fn
+        self._params = json.loads(json.dumps(params))
+        self._done = set()
+        if os.path.isfile(fn):
+            with open(fn, "rb+") as f:
+                data = f.read()
+                # A truncated final line, from an interrupted write, is removed so
+                # that later records start on a line of their own.
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    f.truncate(end)
+            for line in data[:end].decode().splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record["params"] == self._params:
+                    self._done.add((record["rel"], record["size"], record["mtime_ns"]))
+
+    def __len__(self):
+        """ Returns the number of files recorded under these parameters. """
+        return len(self._done)
+
+    def _key(self, target, rel):
+        """ Identifies the current version of a file. """
+        stat = os.stat(target)
+        return (rel, stat.st_size, stat.st_mtime_ns)
+
+    def is_current(self, target, rel):
+        """ Returns True if a file was processed, and has not changed since.
+
+        Arguments:
+        target -- the path to the file
+        rel -- the relative path of the file, in reference to the root
+        """
+        return self._key(target, rel) in self._done
+
+    def record(self, target, rel):
+        """ Records that a file has been processed.
+
+        Arguments:
+        target -- the path to the file
+        rel -- the relative path of the file, in reference to the root
+        """
+        key = self._key(target, rel)
+        line = json.dumps({"rel": key[0], "size": key[1], "mtime_ns": key[2],
+                           "params": self._params})
+        with open(self._fn, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._done.add(key)
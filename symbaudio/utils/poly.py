@@ -1,41 +1,155 @@
 import numpy
 import sympy
+import sympy.abc
 
-def max_coeff(poly):
-    """ Computes the maximum width of a polynomial's coefficients.
+# The powers of two below 2^64, to find the bit lengths of int64 coefficients.
+_POWERS = numpy.array([1 << i for i in range(0, 64)], dtype=numpy.uint64)
+
+def _as_array(values):
+    """ Packs integers into an int64 vector, or an object vector if any is too wide. """
+    try:
+        return numpy.array(values, dtype=numpy.int64)
+    except OverflowError:
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = [int(value) for value in values]
+        return array
+
+def _bit_lengths(array):
+    """ Computes the bit length of the magnitude of each integer in a vector. """
+    if array.dtype == object:
+        return numpy.array([abs(value).bit_length() for value in array], dtype=numpy.int64)
+    magnitudes = numpy.abs(array).astype(numpy.uint64)
+    return numpy.searchsorted(_POWERS, magnitudes, side="right").astype(numpy.int64)
+
+class CompactPoly:
+    """ A univariate polynomial, with its coefficients stored in NumPy arrays.
+
+    This is a compact alternative to sympy.Poly, for keeping many results of a
+    reconstruction, and measuring them without sympy. The coefficients are
+    ordered from the leading coefficient to the constant term (as in
+    Poly.all_coeffs, so that the zero polynomial has a single coefficient).
+    Over ZZ, only coeffs is set. Over QQ, the coefficients are the fractions
+    coeffs / denoms, in lowest terms, with positive denominators. Over GF(p),
+    the coefficients are residues in [0, p), and modulus is p. The coefficient
+    vectors are int64, unless a coefficient is too wide, in which case they
+    hold Python integers (with dtype object).
+    """
+
+    __slots__ = ("coeffs", "denoms", "modulus")
+
+    def __init__(self, coeffs, denoms=None, modulus=None):
+        """ Wraps coefficient vectors. See from_poly and from_residues.
+
+        Arguments:
+        coeffs -- the coefficients (or their numerators, over QQ)
+        denoms -- keyword argument to set the denominators, over QQ (default: None)
+        modulus -- keyword argument to set the order of the field, over GF(p) (default: None)
+        """
+        assert(len(coeffs) > 0)
+        assert(denoms is None or (modulus is None and len(denoms) == len(coeffs)))
+        self.coeffs = coeffs
+        self.denoms = denoms
+        self.modulus = modulus
+
+    def domain(self):
+        """ Returns the sympy domain of the coefficients. """
+        if self.modulus is not None:
+            return sympy.GF(self.modulus)
+        return sympy.QQ if self.denoms is not None else sympy.ZZ
+
+    def to_poly(self, x=sympy.abc.x):
+        """ Converts the polynomial to a sympy.Poly.
+
+        Arguments:
+        x -- keyword argument to set the generator (default: sympy.abc.x)
+        """
+        dom = self.domain()
+        if self.denoms is not None:
+            coeffs = [dom(int(a), int(b)) for (a, b) in zip(self.coeffs, self.denoms)]
+        else:
+            coeffs = [int(a) for a in self.coeffs]
+        return sympy.Poly(coeffs, x, domain=dom)
+
+    def degree(self):
+        """ Returns the degree of the polynomial, with deg(0) = -1. """
+        nonzero = numpy.flatnonzero(self.coeffs)
+        return len(self.coeffs) - 1 - nonzero[0] if len(nonzero) > 0 else -1
+
+    def max_coeff(self):
+        """ Computes the maximum width of the coefficients. See max_coeff. """
+        widest = numpy.max(numpy.abs(self.coeffs))
+        if self.denoms is not None:
+            widest = max(widest, numpy.max(self.denoms))
+        return int(widest)
+
+    def count_zeros(self):
+        """ Computes the number of zero coefficients. See count_zeros. """
+        return len(self.coeffs) - numpy.count_nonzero(self.coeffs)
+
+    def bit_lengths(self):
+        """ Computes the width of each coefficient in bits (of the numerator or
+        denominator, whichever is wider, over QQ).
+        """
+        bits = _bit_lengths(self.coeffs)
+        if self.denoms is not None:
+            bits = numpy.maximum(bits, _bit_lengths(self.denoms))
+        return bits
+
+    def bit_length(self):
+        """ Computes the width of the widest coefficient, in bits. """
+        return int(numpy.max(self.bit_lengths()))
+
+def from_poly(poly):
+    """ Converts a sympy.Poly over ZZ, QQ or GF(p) to a CompactPoly.
+
+    The coefficients are read from the dense representation of the Poly, so
+    that they are not converted to sympy numbers.
 
     Arguments:
-    poly -- the rational polynomial to analyze
+    poly -- the polynomial to convert
     """
     dom = poly.domain
+    coeffs = poly.rep.to_list() or [dom.zero]
     if isinstance(dom, sympy.polys.domains.IntegerRing):
-        # Finds maximal element.
-        return numpy.max(poly.all_coeffs())
+        return CompactPoly(_as_array([int(c) for c in coeffs]))
     elif isinstance(dom, sympy.polys.domains.FiniteField):
-        # Finds maximal element modulo the field order (handles negatives).
-        return numpy.max(numpy.mod(poly.all_coeffs(), dom.characteristic()))
-    elif isinstance(dom, sympy.polys.domains.RationalField):
-        # Considers both numerator and denominator (coeff=p/q).
-        max_coeff = 0
-        for coeff in poly.all_coeffs():
-            max_coeff = max(max_coeff, abs(coeff.p), coeff.q)
-        return max_coeff
+        p = dom.characteristic()
+        return CompactPoly(_as_array([int(c) % p for c in coeffs]), modulus=p)
+    assert(isinstance(dom, sympy.polys.domains.RationalField))
+    return CompactPoly(_as_array([int(c.numerator) for c in coeffs]),
+                       _as_array([int(c.denominator) for c in coeffs]))
+
+def from_residues(residues, p):
+    """ Wraps a polynomial over GF(p) from symbaudio.compression.modular.
+
+    Arguments:
+    residues -- the residues in [0, p), leading coefficient first (empty for zero)
+    p -- the order of the field
+    """
+    residues = numpy.asarray(residues, dtype=numpy.int64)
+    return CompactPoly(residues if len(residues) > 0 else numpy.zeros(1, dtype=numpy.int64),
+                       modulus=p)
+
+def max_coeff(poly):
+    """ Computes the maximum width of a polynomial's coefficients.
+
+    Over ZZ, this is the largest magnitude. Over GF(p), it is the largest
+    residue in [0, p). Over QQ, both the numerators and denominators of the
+    coefficients are considered.
+
+    Arguments:
+    poly -- the polynomial to analyze (a sympy.Poly, or a CompactPoly)
+    """
+    if not isinstance(poly, CompactPoly):
+        poly = from_poly(poly)
+    return poly.max_coeff()
 
 def count_zeros(poly):
     """ Computes the number of zero coefficients in a polynomial.
 
     Arguments:
-    poly -- the rational polynomial to analyze
+    poly -- the polynomial to analyze (a sympy.Poly, or a CompactPoly)
     """
-    dom = poly.domain
-    if isinstance(dom, sympy.polys.domains.IntegerRing) or isinstance(dom, sympy.polys.domains.FiniteField):
-        # Finds all zero elements.
-        return len(poly.all_coeffs()) - numpy.count_nonzero(poly.all_coeffs())
-    elif isinstance(dom, sympy.polys.domains.RationalField):
-        # Considers both numerator and denominator (coeff=p/q).
-        zeros = 0
-        for coeff in poly.all_coeffs():
-            if coeff.p == 0:
-                zeros = zeros + 1
-        return zeros
-
+    if not isinstance(poly, CompactPoly):
+        poly = from_poly(poly)
+    return poly.count_zeros()
@@ -0,0 +1,479 @@
+import numpy
+import os
+import sys
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# The available output formats. Parquet requires pyarrow.
+FORMATS = ["text", "npz", "parquet"]
+
+def int_column(values):
+    """ Converts unbounded integers to exact columns.
+
+    Columns declared with the dtype int (rather than a NumPy integer type) hold
+    unbounded integers, such as the coefficients of rationals. They are stored
+    exactly, as decimal strings, along with an int64 column of their bit
+    lengths (named <name>_bits), which may be queried numerically. The bit
+    length of a negative value (e.g., a sentinel) is negated. The result is
+    (decimal, bits).
+
+    Arguments:
+    values -- a sequence of integers
+    """
+    values = [int(value) for value in values]
+    decimal = numpy.array([str(value) for value in values], dtype=str)
+    bits = numpy.array([value.bit_length() if value >= 0 else -value.bit_length()
+                        for value in values], dtype=numpy.int64)
+    return (decimal, bits)
+
+def _stored_columns(columns):
+    """ Expands (name, dtype) pairs into the stored columns. See int_column. """
+    stored = []
+    for (name, dtype) in columns:
+        if dtype is int:
+            stored.extend([(name, str), (name + "_bits", numpy.int64)])
+        else:
+            stored.append((name, dtype))
+    return stored
+
+class TextWriter:
+    """ Writes results as formatted text, one line per row.
+
+    In the prefix layout, each row is preceded by the relative path of its file
+    (as in run_metrics). In the header layout, the relative path is written on
+    its own line, before the rows of the file (as in measure_compression_params).
+    """
+
+    def __init__(self, stream, fmt, layout="prefix", owned=False):
+        """ Prepares to write to a text stream.
+
+        Arguments:
+        stream -- the stream to write to (e.g., sys.stdout)
+        fmt -- the format string for a row
+        layout -- keyword argument to select "prefix" or "header" (default: "prefix")
+        owned -- keyword argument to close the stream with the writer (default: False)
+        """
+        assert(layout in ["prefix", "header"])
+        self._stream = stream
+        self._fmt = fmt
+        self._layout = layout
+        self._owned = owned
+
+    def write(self, rel, rows):
+        """ Writes the rows of a file.
+
+        A row which cannot be formatted is reported to stderr, and skipped.
+
+        Arguments:
+        rel -- the relative path of the file
+        rows -- a sequence of tuples, with one entry per column
+        """
+        lines = []
+        if self._layout == "header" and rel != "":
+            lines.append(rel)
+        for row in rows:
+            try:
+                line = self._fmt % tuple(row)
+            except Exception:
+                sys.stderr.write("Unexpected value in row %s\n" % str(row[0]))
+                continue
+            lines.append(rel + " " + line if self._layout == "prefix" else line)
+        if len(lines) > 0:
+            self._stream.write("\n".join(lines) + "\n")
+            self._stream.flush()
+
+    def flush(self):
+        """ Flushes the stream (rows are written as they are given). """
+        self._stream.flush()
+
+    def comment(self, line):
+        """ Writes a comment line (starting with #), such as a header. """
+        self._stream.write("# %s\n" % line)
+        self._stream.flush()
+
+    def close(self):
+        """ Flushes the stream, and closes it if it is owned. """
+        self._stream.flush()
+        if self._owned:
+            self._stream.close()
+
+    def __enter__(self):
+        """ Returns the writer, to be closed on exit. """
+        return self
+
+    def __exit__(self, *args):
+        """ Closes the writer. """
+        self.close()
+
+class _ColumnBuffer:
+    """ Accumulates rows as typed columns, with a file id per row.
+
+    The stored columns are exposed as columns (see int_column).
+    """
+
+    def __init__(self, columns):
+        """ Sets the (name, dtype) of each column. """
+        self._dtypes = [dtype for (_, dtype) in columns]
+        self.columns = _stored_columns(columns)
+        self.clear()
+
+    def clear(self):
+        """ Empties the buffer. """
+        self.files = []
+        self.blocks = []
+        self.count = 0
+
+    def append(self, rel, rows):
+        """ Buffers the rows of a file, converting each column to its dtype. """
+        block = []
+        for (i, dtype) in enumerate(self._dtypes):
+            values = [row[i] for row in rows]
+            if dtype is int:
+                block.extend(int_column(values))
+            else:
+                block.append(numpy.asarray(values, dtype=dtype))
+        self.blocks.append((len(self.files), block))
+        self.files.append(rel)
+        self.count += len(rows)
+
+    def arrays(self):
+        """ Returns (files, file_ids, {name: column}) for the buffered rows. """
+        file_ids = numpy.concatenate(
+            [numpy.full(len(block[0]), i, dtype=numpy.int32) for (i, block) in self.blocks]
+            + [numpy.zeros(0, dtype=numpy.int32)])
+        columns = {}
+        for (i, (name, dtype)) in enumerate(self.columns):
+            columns[name] = numpy.concatenate(
+                [block[i] for (_, block) in self.blocks] + [numpy.zeros(0, dtype=dtype)])
+        return (numpy.array(self.files, dtype=str), file_ids, columns)
+
+def _next_part(path, ext):
+    """ Returns the path of the next part of a directory of parts (part-<n><ext>). """
+    part = len([fn for fn in os.listdir(path) if fn.endswith(ext)])
+    return os.path.join(path, "part-%05i%s" % (part, ext))
+
+class NpzWriter:
+    """ Writes results as columnar NumPy archives, in a directory of parts.
+
+    Rows are buffered, and written in bulk once bufsize rows are buffered (and
+    on close). Each write produces a new part, so a result set may be extended
+    by later runs. Each part holds the relative paths of its files ("files"),
+    a file id per row ("file_id", indexing "files"), and a typed array per
+    column.
+    """
+
+    def __init__(self, path, columns, bufsize=65536):
+        """ Opens (or creates) a result set.
+
+        Arguments:
+        path -- the directory of the result set
+        columns -- a list of (name, dtype) pairs
+        bufsize -- keyword argument to set the rows per write (default: 65536)
+        """
+        self._path = path
+        self._buffer = _ColumnBuffer(columns)
+        self._bufsize = bufsize
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, rel, rows):
+        """ Buffers the rows of a file.
+
+        Arguments:
+        rel -- the relative path of the file
+        rows -- a sequence of tuples, with one entry per column
+        """
+        self._buffer.append(rel, rows)
+        if self._buffer.count >= self._bufsize:
+            self.flush()
+
+    def flush(self):
+        """ Writes the buffered rows as a new part. """
+        if len(self._buffer.files) == 0:
+            return
+        (files, file_ids, columns) = self._buffer.arrays()
+        fn = _next_part(self._path, ".npz")
+        tmp = "%s.%i.tmp" % (fn, os.getpid())
+        with open(tmp, "wb") as f:
+            numpy.savez(f, files=files, file_id=file_ids, **columns)
+        os.replace(tmp, fn)
+        self._buffer.clear()
+
+    def close(self):
+        """ Writes any buffered rows. """
+        self.flush()
+
+    def __enter__(self):
+        """ Returns the writer, to be closed on exit. """
+        return self
+
+    def __exit__(self, *args):
+        """ Closes the writer. """
+        self.close()
+
+class ParquetWriter:
+    """ Writes results as Apache Parquet files, in a directory of parts.
+
+    Rows are buffered, and written in bulk once bufsize rows are buffered (and
+    on close). As with NpzWriter, each write produces a new part (a complete
+    parquet file), so a result set may be extended by later runs. The relative
+    path of each row's file is stored as a dictionary encoded "file" column.
+    """
+
+    def __init__(self, path, columns, bufsize=65536):
+        """ Opens (or creates) a result set.
+
+        Arguments:
+        path -- the directory of the result set
+        columns -- a list of (name, dtype) pairs
+        bufsize -- keyword argument to set the rows per write (default: 65536)
+        """
+        if pyarrow is None:
+            raise ImportError("ParquetWriter requires pyarrow.")
+        if os.path.isfile(path):
+            raise ValueError("parquet results are a directory of parts: %s" % path)
+        self._path = path
+        self._buffer = _ColumnBuffer(columns)
+        self._bufsize = bufsize
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, rel, rows):
+        """ Buffers the rows of a file.
+
+        Arguments:
+        rel -- the relative path of the file
+        rows -- a sequence of tuples, with one entry per column
+        """
+        self._buffer.append(rel, rows)
+        if self._buffer.count >= self._bufsize:
+            self.flush()
+
+    def flush(self):
+        """ Writes the buffered rows as a new part. """
+        if len(self._buffer.files) == 0:
+            return
+        (files, file_ids, columns) = self._buffer.arrays()
+        fields = {"file": pyarrow.DictionaryArray.from_arrays(file_ids, files)}
+        for (name, _) in self._buffer.columns:
+            fields[name] = pyarrow.array(columns[name])
+        fn = _next_part(self._path, ".parquet")
+        tmp = "%s.%i.tmp" % (fn, os.getpid())
+        pyarrow.parquet.write_table(pyarrow.table(fields), tmp)
+        os.replace(tmp, fn)
+        self._buffer.clear()
+
+    def close(self):
+        """ Writes any buffered rows. """
+        self.flush()
+
+    def __enter__(self):
+        """ Returns the writer, to be closed on exit. """
+        return self
+
+    def __exit__(self, *args):
+        """ Closes the writer. """
+        self.close()
+
+def open_writer(fmt, path, columns, text_fmt=None, layout="prefix", bufsize=65536):
+    """ Opens a writer for a given output format.
+
+    Arguments:
+    fmt -- the output format (see FORMATS)
+    path -- the output path, or None for stdout (text only)
+    columns -- a list of (name, dtype) pairs
+    text_fmt -- keyword argument to set the format string of a text row (default: None)
+    layout -- keyword argument to set the layout of text output (default: "prefix")
+    bufsize -- keyword argument to set the rows per bulk write (default: 65536)
+    """
+    assert(fmt in FORMATS)
+    if fmt == "text":
+        assert(text_fmt is not None)
+        if path is None:
+            return TextWriter(sys.stdout, text_fmt, layout)
+        return TextWriter(open(path, "a"), text_fmt, layout, owned=True)
+    assert(path is not None)
+    if fmt == "npz":
+        return NpzWriter(path, columns, bufsize)
+    return ParquetWriter(path, columns, bufsize)
+
+class ResultSet:
+    """ A result set, loaded as arrays.
+
+    The result set exposes:
+    files -- the relative path of each file
+    file_ids -- the index into files of each row
+    columns -- a mapping from column name to array
+    offsets -- the first row of each file, if rows are grouped by file (or None)
+    """
+
+    def __init__(self, files, file_ids, columns, offsets=None):
+        """ Wraps loaded arrays. See read_results. """
+        self.files = files
+        self.file_ids = file_ids
+        self.columns = columns
+        self.offsets = offsets
+
+    def __len__(self):
+        """ Returns the number of rows. """
+        return len(self.file_ids)
+
+    def __getitem__(self, name):
+        """ Returns a column by name. """
+        return self.columns[name]
+
+    def for_file(self, rel):
+        """ Returns the columns, restricted to the rows of a file.
+
+        Arguments:
+        rel -- the relative path of the file
+        """
+        ids = numpy.flatnonzero(self.files == rel)
+        if self.offsets is not None:
+            rows = numpy.concatenate([numpy.arange(self.offsets[i], self.offsets[i+1])
+                                      for i in ids] + [numpy.zeros(0, dtype=numpy.int64)])
+            return {name: numpy.asarray(column[rows]) for (name, column) in self.columns.items()}
+        mask = numpy.isin(self.file_ids, ids)
+        return {name: column[mask] for (name, column) in self.columns.items()}
+
+def _read_npz(path):
+    """ Loads each part of an NpzWriter result set. """
+    files = []
+    file_ids = []
+    columns = {}
+    for fn in sorted(os.listdir(path)):
+        if not fn.endswith(".npz"):
+            continue
+        with numpy.load(os.path.join(path, fn)) as part:
+            file_ids.append(part["file_id"] + len(files))
+            files.extend(part["files"].tolist())
+            for name in part.files:
+                if name not in ["files", "file_id"]:
+                    columns.setdefault(name, []).append(part[name])
+    file_ids = numpy.concatenate(file_ids + [numpy.zeros(0, dtype=numpy.int32)])
+    columns = {name: numpy.concatenate(parts) for (name, parts) in columns.items()}
+    return ResultSet(numpy.array(files, dtype=str), file_ids, columns)
+
+def _read_parquet(path):
+    """ Loads each part of a ParquetWriter result set (or a single parquet file). """
+    if pyarrow is None:
+        raise ImportError("Reading parquet requires pyarrow.")
+    if os.path.isdir(path):
+        parts = [_read_parquet(os.path.join(path, fn))
+                 for fn in sorted(os.listdir(path)) if fn.endswith(".parquet")]
+        return concatenate(parts)
+    table = pyarrow.parquet.read_table(path)
+    names = table.column("file").to_numpy(zero_copy_only=False).astype(str)
+    (files, file_ids) = numpy.unique(names, return_inverse=True)
+    columns = {}
+    for name in table.column_names:
+        if name != "file":
+            column = table.column(name).to_numpy()
+            columns[name] = column.astype(str) if column.dtype == object else column
+    return ResultSet(files, file_ids.astype(numpy.int32), columns)
+
+def concatenate(results):
+    """ Combines several result sets into one.
+
+    Only the columns which are common to every result set are kept.
+
+    Arguments:
+    results -- a list of ResultSets
+    """
+    names = [name for name in results[0].columns
+             if all(name in other.columns for other in results)]
+    file_ids = []
+    count = 0
+    for other in results:
+        file_ids.append(numpy.asarray(other.file_ids, dtype=numpy.int32) + count)
+        count += len(other.files)
+    files = numpy.concatenate([other.files for other in results])
+    columns = {name: numpy.concatenate([other[name] for other in results]) for name in names}
+    return ResultSet(files, numpy.concatenate(file_ids), columns)
+
+def save_store(path, results):
+    """ Saves a result set as an array store, which may be memory-mapped.
+
+    The store is a directory holding the files ("files.npy"), the offset of
+    each file's rows ("offsets.npy"), and a .npy file per column (in
+    "columns"). The rows are grouped by file, preserving their order.
+
+    Arguments:
+    path -- the directory of the store
+    results -- the ResultSet to save
+    """
+    order = numpy.argsort(results.file_ids, kind="stable")
+    counts = numpy.bincount(results.file_ids, minlength=len(results.files))
+    offsets = numpy.concatenate(([0], numpy.cumsum(counts))).astype(numpy.int64)
+    os.makedirs(os.path.join(path, "columns"), exist_ok=True)
+    numpy.save(os.path.join(path, "files.npy"), numpy.asarray(results.files, dtype=str))
+    numpy.save(os.path.join(path, "offsets.npy"), offsets)
+    for (name, column) in results.columns.items():
+        numpy.save(os.path.join(path, "columns", name + ".npy"), numpy.asarray(column)[order])
+
+def load_store(path, mmap=True):
+    """ Loads an array store (see save_store).
+
+    Arguments:
+    path -- the directory of the store
+    mmap -- keyword argument to memory-map the columns (default: True)
+    """
+    mode = "r" if mmap else None
+    files = numpy.load(os.path.join(path, "files.npy"))
+    offsets = numpy.load(os.path.join(path, "offsets.npy"))
+    file_ids = numpy.repeat(numpy.arange(0, len(files), dtype=numpy.int32), numpy.diff(offsets))
+    columns = {}
+    for fn in sorted(os.listdir(os.path.join(path, "columns"))):
+        if fn.endswith(".npy"):
+            columns[fn[:-4]] = numpy.load(os.path.join(path, "columns", fn), mmap_mode=mode)
+    return ResultSet(files, file_ids, columns, offsets)
+
+def read_results(path):
+    """ Loads an entire result set as arrays.
+
+    Arguments:
+    path -- an array store, an NpzWriter or ParquetWriter directory, or a parquet file
+    """
+    if os.path.isfile(os.path.join(path, "offsets.npy")):
+        return load_store(path)
+    elif os.path.isdir(path) and any(fn.endswith(".parquet") for fn in os.listdir(path)):
+        return _read_parquet(path)
+    elif os.path.isdir(path):
+        return _read_npz(path)
+    return _read_parquet(path)
+
+def percentiles(results, column, q, by="file"):
+    """ Computes percentiles of a column, within groups of rows.
+
+    Rows may be grouped by file (rows of files with the same name are grouped
+    together), or by the value of another column. The result is (keys, table),
+    where table has a row per key, and a column per percentile. Unbounded int
+    columns (see int_column) are summarized by their bit lengths, while other
+    string columns are rejected with a ValueError.
+
+    Arguments:
+    results -- the ResultSet to query
+    column -- the name of the column to summarize
+    q -- a list of percentiles, between 0 and 100
+    by -- keyword argument to name the grouping ("file" or a column, default: "file")
+    """
+    if by == "file":
+        (keys, name_ids) = numpy.unique(results.files, return_inverse=True)
+        groups = name_ids.reshape(-1)[results.file_ids]
+    else:
+        (keys, groups) = numpy.unique(results[by], return_inverse=True)
+        groups = groups.reshape(-1)
+    values = numpy.asarray(results[column])
+    if values.dtype.kind in "OSU":
+        if column + "_bits" not in results.columns:
+            raise ValueError("cannot summarize the string column %s" % column)
+        values = numpy.asarray(results[column + "_bits"])
+    order = numpy.argsort(groups, kind="stable")
+    bounds = numpy.cumsum(numpy.bincount(groups, minlength=len(keys)))[:-1]
+    table = numpy.full((len(keys), len(q)), numpy.nan)
+    for (i, group) in enumerate(numpy.split(values[order], bounds)):
+        if len(group) > 0:
+            table[i] = numpy.percentile(group, q)
+    return (keys, table)
@@ -1,3 +1,5 @@
+import functools
+import json
 import time
 
 class PerfTimer:
@@ -18,3 +20,153 @@ class PerfTimer:
     def get_elapsed_ns(self):
         """ Returns the number of ns from the last reset (or __init__). """
         return (time.perf_counter_ns() - self._start)
+
+class _Scope:
+    """ Times a named scope of a Profiler, see Profiler.scope. """
+
+    def __init__(self, profiler, name):
+        """ Prepares to time a scope. """
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        """ Pushes the scope, and starts its timer. """
+        stack = self._profiler._stack
+        self._path = stack[-1] + "/" + self._name if stack else self._name
+        stack.append(self._path)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        """ Pops the scope, and records its time. """
+        elapsed = time.perf_counter_ns() - self._start
+        self._profiler._stack.pop()
+        self._profiler.record(self._path, elapsed)
+        return False
+
+class _NullScope:
+    """ A reusable scope which does nothing, for a disabled Profiler. """
+
+    def __enter__(self):
+        """ Does nothing. """
+        return self
+
+    def __exit__(self, *exc):
+        """ Does nothing. """
+        return False
+
+_NULL_SCOPE = _NullScope()
+
+class Profiler:
+    """ Collects named timings, counters and histograms.
+
+    A profiler is disabled by default, in which case scopes, counters and
+    histograms are discarded at the cost of a single check. Scopes nest, and
+    each timing is recorded under the path of its enclosing scopes (e.g.,
+    "xgcd.reconstruct/xgcd.div"). Profiles are kept per process.
+    """
+
+    def __init__(self):
+        """ Creates a new, disabled, profiler. """
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """ Discards all recorded timings, counters and histograms. """
+        self._timings = {}
+        self._counters = {}
+        self._histograms = {}
+        self._stack = []
+
+    def enable(self, enabled=True):
+        """ Enables (or disables) recording. """
+        self.enabled = enabled
+
+    def scope(self, name):
+        """ Returns a context manager which times its body, under a name. """
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self, name)
+
+    def timed(self, name):
+        """ Returns a decorator, which times each call to a function as a scope. """
+        def decorator(f):
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+                with _Scope(self, name):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, path, elapsed_ns):
+        """ Records a timing directly, as [count, total, min, max] in ns. """
+        timing = self._timings.get(path)
+        if timing is None:
+            self._timings[path] = [1, elapsed_ns, elapsed_ns, elapsed_ns]
+        else:
+            timing[0] += 1
+            timing[1] += elapsed_ns
+            timing[2] = min(timing[2], elapsed_ns)
+            timing[3] = max(timing[3], elapsed_ns)
+
+    def count(self, name, n=1):
+        """ Adds n to a named counter. """
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        """ Adds a non-negative value to a named histogram.
+
+        Values are bucketed by their bit length, so that bucket b holds values
+        in [2^(b-1), 2^b), and bucket 0 holds values below 1.
+        """
+        if not self.enabled:
+            return
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = {"count": 0, "sum": 0, "min": value,
+                                                  "max": value, "buckets": {}}
+        histogram["count"] += 1
+        histogram["sum"] += value
+        histogram["min"] = min(histogram["min"], value)
+        histogram["max"] = max(histogram["max"], value)
+        bucket = int(value).bit_length()
+        histogram["buckets"][bucket] = histogram["buckets"].get(bucket, 0) + 1
+
+    def summary(self):
+        """ Returns the profile as a dict of plain values (e.g., for JSON). """
+        timings = {}
+        for (path, (count, total, low, high)) in sorted(self._timings.items()):
+            timings[path] = {"count": count, "total_ns": total, "mean_ns": total / count,
+                             "min_ns": low, "max_ns": high}
+        histograms = {}
+        for (name, histogram) in sorted(self._histograms.items()):
+            histograms[name] = dict(histogram)
+            histograms[name]["buckets"] = {str(b): n for (b, n)
+                                           in sorted(histogram["buckets"].items())}
+        return {"timings": timings, "counters": dict(sorted(self._counters.items())),
+                "histograms": histograms}
+
+    def report(self, out):
+        """ Writes the profile as a text table to a stream. """
+        summary = self.summary()
+        out.write("%-48s %10s %12s %12s\n" % ("scope", "count", "total_ms", "mean_us"))
+        for (path, timing) in summary["timings"].items():
+            out.write("%-48s %10i %12.3f %12.3f\n" % (
+                path, timing["count"], timing["total_ns"] / 1e6, timing["mean_ns"] / 1e3))
+        for (name, value) in summary["counters"].items():
+            out.write("%-48s %10i\n" % (name, value))
+        for (name, histogram) in summary["histograms"].items():
+            out.write("%-48s %10i  mean=%g min=%g max=%g\n" % (
+                name, histogram["count"], histogram["sum"] / histogram["count"],
+                histogram["min"], histogram["max"]))
+
+    def dump(self, fn):
+        """ Writes the profile as JSON to a file. """
+        with open(fn, "w") as f:
+            json.dump(self.summary(), f, indent=1)
+
+# The profiler used to instrument symbaudio.
+PROFILER = Profiler()
@@ -1,4 +1,7 @@
 import numpy
+import os
+import scipy.io.wavfile
+import tempfile
 import unittest
 
 import harness
@@ -19,6 +22,7 @@ class TestAudioFile(unittest.TestCase):
         file = symbaudio.analysis.audio.AudioFile(fn)
 
         # Checks generated metadata corresponds to file metadata.
+        self.assertEqual(file.path, fn)
         self.assertEqual(file.sample_rate_hz, 44100)
         self.assertEqual(file.sample_count, 88200)
         self.assertEqual(file.channel_count, 2)
@@ -35,5 +39,51 @@ class TestAudioFile(unittest.TestCase):
             # Checks for silence within a tolerance of 8 discrete units.
             self.assertLessEqual(abs(file.raw[t, 1]), 8)
 
+    def test_load_mono(self):
+        """ A mono file is loaded as a matrix with a single channel. """
+        (fd, fn) = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            scipy.io.wavfile.write(fn, 8000, numpy.arange(100, dtype=numpy.int16))
+            file = symbaudio.analysis.audio.AudioFile(fn)
+            self.assertEqual(file.sample_count, 100)
+            self.assertEqual(file.channel_count, 1)
+            self.assertEqual(list(file.raw[:3, 0]), [0, 1, 2])
+            del file
+        finally:
+            os.remove(fn)
+
+class TestFrameView(unittest.TestCase):
+    """ Tests the zero-copy framing of a time-series. """
+
+    def test_shape(self):
+        """ A trailing, partial frame is truncated. """
+        frames = symbaudio.analysis.audio.frame_view(numpy.arange(10), 3)
+        self.assertEqual(frames.shape, (3, 3))
+        self.assertEqual(list(frames[1]), [3, 4, 5])
+
+    def test_strided_channel(self):
+        """ Frames of a single channel share memory with the source matrix. """
+        raw = numpy.arange(20).reshape((10, 2))
+        frames = symbaudio.analysis.audio.frame_view(raw[:, 1], 5)
+        self.assertEqual(list(frames[0]), [1, 3, 5, 7, 9])
+        self.assertEqual(list(frames[1]), [11, 13, 15, 17, 19])
+        self.assertTrue(numpy.shares_memory(frames, raw))
+
+    def test_hop(self):
+        """ Frames overlap when the hop is smaller than the width. """
+        frames = symbaudio.analysis.audio.frame_view(numpy.arange(10), 4, 3)
+        self.assertEqual(frames.tolist(), [[0, 1, 2, 3], [3, 4, 5, 6], [6, 7, 8, 9]])
+        frames = symbaudio.analysis.audio.frame_view(numpy.arange(3), 4, 1)
+        self.assertEqual(frames.shape, (0, 4))
+
+    def test_channels(self):
+        """ Frames of several channels keep a channel axis. """
+        raw = numpy.arange(20).reshape((10, 2))
+        frames = symbaudio.analysis.audio.frame_view(raw, 4, 2)
+        self.assertEqual(frames.shape, (4, 4, 2))
+        self.assertEqual(frames[1, :, 1].tolist(), [5, 7, 9, 11])
+        self.assertTrue(numpy.shares_memory(frames, raw))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,114 @@
+import numpy
+import os
+import shutil
+import tempfile
+import unittest
+
+import harness
+import symbaudio.analysis.audio
+import symbaudio.analysis.cache
+import symbaudio.analysis.feature
+
+class TestFeatureCache(unittest.TestCase):
+    """ Validates the behaviour of FeatureCache over a temp dir. """
+
+    def setUp(self):
+        """ Sets up a temp dir with two (fake) audio files. """
+        self.tempdir = tempfile.mkdtemp()
+        self.cache = symbaudio.analysis.cache.FeatureCache(os.path.join(self.tempdir, "cache"))
+        self.files = []
+        for i in range(0, 2):
+            fn = os.path.join(self.tempdir, "%i.wav" % i)
+            with open(fn, "w+") as f:
+                f.write("Test.")
+            self.files.append(fn)
+
+    def tearDown(self):
+        """ Cleans up temporary directory. """
+        shutil.rmtree(self.tempdir)
+
+    def test_round_trip(self):
+        """ Stored features are loaded for the same parameters only. """
+        features = numpy.arange(12.0).reshape((3, 4))
+        self.assertIsNone(self.cache.load(self.files[0], {"framesize": 2}))
+        self.cache.store(self.files[0], {"framesize": 2}, features)
+        loaded = self.cache.load(self.files[0], {"framesize": 2})
+        self.assertTrue(numpy.array_equal(loaded, features))
+        self.assertIsNone(self.cache.load(self.files[0], {"framesize": 4}))
+        self.assertIsNone(self.cache.load(self.files[1], {"framesize": 2}))
+
+    def test_modified_file(self):
+        """ Modifying an audio file invalidates its entries. """
+        self.cache.store(self.files[0], {}, numpy.zeros(4))
+        with open(self.files[0], "a") as f:
+            f.write("More.")
+        self.assertIsNone(self.cache.load(self.files[0], {}))
+
+    def test_invalidate(self):
+        """ Entries may be invalidated per file, or all together. """
+        self.cache.store(self.files[0], {"chan": 0}, numpy.zeros(4))
+        self.cache.store(self.files[0], {"chan": 1}, numpy.zeros(4))
+        self.cache.store(self.files[1], {"chan": 0}, numpy.zeros(4))
+        self.cache.invalidate(self.files[0])
+        self.assertIsNone(self.cache.load(self.files[0], {"chan": 0}))
+        self.assertIsNone(self.cache.load(self.files[0], {"chan": 1}))
+        self.assertIsNotNone(self.cache.load(self.files[1], {"chan": 0}))
+        self.cache.invalidate()
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_lru_eviction(self):
+        """ The least recently used entry is evicted first. """
+        features = numpy.zeros(64)
+        self.cache.store(self.files[0], {"n": 0}, features)
+        entry_size = self.cache.size()
+        self.cache.max_bytes = 2 * entry_size
+        self.cache.store(self.files[0], {"n": 1}, features)
+        os.utime(self.cache.entry(self.files[0], {"n": 1}), ns=(0, 0))
+        self.cache.store(self.files[0], {"n": 2}, features)
+        self.assertEqual(self.cache.size(), 2 * entry_size)
+        self.assertIsNotNone(self.cache.load(self.files[0], {"n": 0}))
+        self.assertIsNone(self.cache.load(self.files[0], {"n": 1}))
+        self.assertIsNotNone(self.cache.load(self.files[0], {"n": 2}))
+
+class TestCachedSummary(unittest.TestCase):
+    """ Ensures AudioSummary produces the same statistics through a cache. """
+
+    def setUp(self):
+        """ Sets up a temp dir for the cache. """
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Cleans up temporary directory. """
+        shutil.rmtree(self.tempdir)
+
+    def test_summary(self):
+        """ The second run is served from the cache. """
+        fn = "test/data/44100hz_2chan_440tone_stereo_88200samps.wav"
+        cache = symbaudio.analysis.cache.FeatureCache(self.tempdir)
+        audio = symbaudio.analysis.audio.AudioFile(fn)
+        expect = symbaudio.analysis.feature.AudioSummary(audio)
+        first = symbaudio.analysis.feature.AudioSummary(audio, cache=cache)
+        self.assertGreater(cache.size(), 0)
+        second = symbaudio.analysis.feature.AudioSummary(audio, cache=cache)
+        self.assertTrue(numpy.array_equal(second.first_order.features, expect.first_order.features))
+        for field in symbaudio.analysis.feature.FeatureSeries.FIELDS:
+            self.assertEqual(first.second_order[field].mean, expect.second_order[field].mean)
+            self.assertEqual(second.second_order[field].mean, expect.second_order[field].mean)
+            self.assertEqual(second.second_order[field].modulation,
+                             expect.second_order[field].modulation)
+
+    def test_multi_channel(self):
+        """ Channels cached by AudioSummary are shared with MultiChannelSummary. """
+        fn = "test/data/44100hz_2chan_440tone_stereo_88200samps.wav"
+        cache = symbaudio.analysis.cache.FeatureCache(self.tempdir)
+        audio = symbaudio.analysis.audio.AudioFile(fn)
+        symbaudio.analysis.feature.AudioSummary(audio, chan=1, cache=cache)
+        expect = symbaudio.analysis.feature.MultiChannelSummary(audio, [0, 1, "mid"])
+        first = symbaudio.analysis.feature.MultiChannelSummary(audio, [0, 1, "mid"], cache=cache)
+        self.assertEqual(len(cache._entries()), 3)
+        second = symbaudio.analysis.feature.MultiChannelSummary(audio, [0, 1, "mid"], cache=cache)
+        self.assertTrue(numpy.array_equal(first.features, expect.features))
+        self.assertTrue(numpy.array_equal(second.features, expect.features))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,15 +12,6 @@ def _calc_mod(x, fs):
     mu, _ = symbaudio.analysis.spectral.spectral_shape(numpy.fft.fft(x), freqs)
     return mu
 
-class FakeAudioFile:
-    """ A mock class for testing AudioFile clients. """
-    
-    def __init__(self, fs, raw):
-        """ Treats (fs, raw) as the return from scipy.io.wavfile. """
-        self.sample_rate_hz = fs
-        self.raw = raw
-        self.sample_count, self.channel_count = self.raw.shape
-
 class TestFeatureAggregation(unittest.TestCase):
     """ Tests basic feature aggregation, with mocked data. """
 
@@ -58,6 +49,22 @@ class TestFeatureSeries(unittest.TestCase):
         self.assertEqual(feat.count, 50)
         self.assertEqual(feat.features.shape, (50, 4))
 
+    def test_record_fields(self):
+        """ Black-box test to ensure records follow the selected fields. """
+        feat = symbaudio.analysis.feature.FeatureSeries(8, 2, 1024, fields=["rms", "flux"])
+        feat.record(1, 3, 4)
+        self.assertEqual(feat.features.shape, (4, 2))
+        self.assertEqual(list(feat.features[1]), [3, 4])
+        self.assertRaises(AssertionError, feat.record, 0, 1, 2, 3)
+
+    def test_ctor_hop(self):
+        """ White box test to ensure overlapping frames are counted. """
+        feat = symbaudio.analysis.feature.FeatureSeries(101, 4, 1024, hop=2)
+        self.assertEqual(feat.downsample_hz, 512)
+        self.assertEqual(feat.count, 49)
+        feat = symbaudio.analysis.feature.FeatureSeries(3, 4, 1024, hop=2)
+        self.assertEqual(feat.count, 0)
+
     def test_record(self):
         """ Black-box test to ensure records are set. """
         feat = symbaudio.analysis.feature.FeatureSeries(100, 2, 1024)
@@ -67,6 +74,13 @@ class TestFeatureSeries(unittest.TestCase):
         self.assertEqual(feat.features[4, 2], 3)
         self.assertEqual(feat.features[4, 3], 4)
 
+    def test_record_block(self):
+        """ Black-box test to ensure blocks of records are set. """
+        feat = symbaudio.analysis.feature.FeatureSeries(100, 2, 1024)
+        feat.record_block(4, numpy.array([[1, 2, 3, 4], [5, 6, 7, 8]]))
+        self.assertEqual(list(feat.features[4]), [1, 2, 3, 4])
+        self.assertEqual(list(feat.features[5]), [5, 6, 7, 8])
+
     def test_aggregation(self):
         """ Grey box test to see if the correct metrics are aggregated. """
         feat = symbaudio.analysis.feature.FeatureSeries(512 * 8, 512, 1024)
@@ -81,9 +95,9 @@ class TestFeatureSeries(unittest.TestCase):
         self.assertEqual(aggregation["spread"].mean, 1)
         self.assertEqual(aggregation["energy"].mean, 4.5)
         self.assertEqual(aggregation["zeros"].mean, 2.5)
-        self.assertEqual(aggregation["centroid"].modulation, _calc_mod(centroid, 2))
-        self.assertEqual(aggregation["spread"].modulation, _calc_mod(spread, 2))
-        self.assertEqual(aggregation["energy"].modulation, _calc_mod(energy, 2))
+        self.assertAlmostEqual(aggregation["centroid"].modulation, _calc_mod(centroid, 2))
+        self.assertAlmostEqual(aggregation["spread"].modulation, _calc_mod(spread, 2))
+        self.assertAlmostEqual(aggregation["energy"].modulation, _calc_mod(energy, 2))
         self.assertAlmostEqual(aggregation["zeros"].modulation, _calc_mod(zeros, 2))
 
     def test_odd_points(self):
@@ -95,14 +109,14 @@ class TestAudioSummary(unittest.TestCase):
 
     def test_global_summary(self):
         """ Checks global statistics, such as sample length. """
-        a = FakeAudioFile(1024, numpy.random.random((2048, 2)))
+        a = harness.FakeAudioFile(1024, numpy.random.random((2048, 2)))
         s = symbaudio.analysis.feature.AudioSummary(a)
         self.assertEqual(s.length_s, 2)
 
     def test_mean_statistics(self):
         """ Ensures windowed means are correct. """
         raw = numpy.ones((2048, 2))
-        a = FakeAudioFile(1024, raw)
+        a = harness.FakeAudioFile(1024, raw)
         s = symbaudio.analysis.feature.AudioSummary(a)
         self.assertEqual(s.second_order["centroid"].mean, 0.5)
         self.assertEqual(s.second_order["spread"].mean, 0)
@@ -112,12 +126,133 @@ class TestAudioSummary(unittest.TestCase):
     def test_modulation_statistics(self):
         """ Ensures windowed modulations are correct. """
         raw = numpy.ones((2048, 2))
-        a = FakeAudioFile(1024, raw)
+        a = harness.FakeAudioFile(1024, raw)
         s = symbaudio.analysis.feature.AudioSummary(a)
         self.assertEqual(s.second_order["centroid"].modulation, 0.25)
         self.assertEqual(s.second_order["spread"].modulation, 0)
         self.assertEqual(s.second_order["energy"].modulation, 0.25)
         self.assertEqual(s.second_order["zeros"].modulation, 0)
 
+    def test_block_sizes(self):
+        """ Ensures the block size does not change the per-frame statistics. """
+        raw = numpy.random.randint(-1000, 1000, (1024 * 9 + 17, 2)).astype(numpy.int16)
+        a = harness.FakeAudioFile(1024, raw)
+        expect = symbaudio.analysis.feature.AudioSummary(a, framesize=64, blocksize=1)
+        for blocksize in [2, 7, 1000]:
+            s = symbaudio.analysis.feature.AudioSummary(a, framesize=64, blocksize=blocksize)
+            for field in symbaudio.analysis.feature.FeatureSeries.FIELDS:
+                lhs = s.second_order[field]
+                rhs = expect.second_order[field]
+                self.assertEqual(lhs.mean, rhs.mean)
+                self.assertEqual(lhs.modulation, rhs.modulation)
+
+class TestHopAndWindow(unittest.TestCase):
+    """ Tests overlapping, windowed frames against explicit frames. """
+
+    def setUp(self):
+        """ Mocks a stereo file with a trailing partial frame. """
+        raw = numpy.random.randint(-1000, 1000, (64 * 9 + 17, 2)).astype(numpy.int16)
+        self.audio = harness.FakeAudioFile(1024, raw)
+
+    def test_overlap(self):
+        """ Each frame starts a hop after the last, and is windowed. """
+        s = symbaudio.analysis.feature.AudioSummary(
+            self.audio, framesize=64, chan=1, blocksize=5, hop=24, window="hann")
+        self.assertEqual(s.first_order.count, (len(self.audio.raw) - 64) // 24 + 1)
+        self.assertEqual(s.first_order.downsample_hz, 1024 / 24)
+        window = symbaudio.analysis.spectral.make_window("hann", 64)
+        plan = symbaudio.analysis.spectral.SpectralPlan(1024, 64)
+        for n in range(0, s.first_order.count):
+            frame = self.audio.raw[n*24:n*24+64, 1]
+            spectrum = plan.transform(frame * window)
+            (mu, sigma) = plan.shape(spectrum)
+            self.assertAlmostEqual(s.first_order.features[n, 0], mu)
+            self.assertAlmostEqual(s.first_order.features[n, 1] / sigma, 1)
+            self.assertAlmostEqual(s.first_order.features[n, 2] / plan.energy(spectrum), 1)
+            self.assertEqual(s.first_order.features[n, 3], symbaudio.analysis.spectral.zcr(frame))
+
+    def test_multi_channel(self):
+        """ Multi-channel summaries agree with single channel summaries. """
+        s = symbaudio.analysis.feature.MultiChannelSummary(
+            self.audio, framesize=64, blocksize=5, hop=40, window="hamming")
+        for chan in range(0, 2):
+            expect = symbaudio.analysis.feature.AudioSummary(
+                self.audio, framesize=64, chan=chan, hop=40, window="hamming")
+            numpy.testing.assert_array_equal(s.features[chan], expect.first_order.features)
+
+class TestMixChannels(unittest.TestCase):
+    """ Tests channel selection and downmixes. """
+
+    def test_mixes(self):
+        """ Ensures each mix is computed from the left and right channels. """
+        samples = numpy.array([[1, 3], [4, -2]], dtype=numpy.int16)
+        mix = symbaudio.analysis.feature.mix_channels
+        self.assertEqual(list(mix(samples, 1)), [3, -2])
+        self.assertEqual(list(mix(samples, "mono")), [2, 1])
+        self.assertEqual(list(mix(samples, "mid")), [2, 1])
+        self.assertEqual(list(mix(samples, "side")), [-1, 3])
+
+class TestMultiChannelSummary(unittest.TestCase):
+    """ Compares multi-channel summaries to single channel summaries. """
+
+    def setUp(self):
+        """ Mocks a stereo file with a trailing partial frame. """
+        raw = numpy.random.randint(-1000, 1000, (64 * 9 + 17, 2)).astype(numpy.int16)
+        self.audio = harness.FakeAudioFile(1024, raw)
+
+    def test_channels(self):
+        """ Ensures each raw channel matches its own AudioSummary. """
+        s = symbaudio.analysis.feature.MultiChannelSummary(
+            self.audio, framesize=64, blocksize=4)
+        self.assertEqual(s.channels, [0, 1])
+        self.assertEqual(s.features.shape, (2, 9, 4))
+        for chan in range(0, 2):
+            expect = symbaudio.analysis.feature.AudioSummary(self.audio, framesize=64, chan=chan)
+            numpy.testing.assert_array_equal(s.features[chan], expect.first_order.features)
+            for field in symbaudio.analysis.feature.FeatureSeries.FIELDS:
+                self.assertEqual(s.second_order[chan][field].mean,
+                                 expect.second_order[field].mean)
+                self.assertEqual(s.second_order[chan][field].modulation,
+                                 expect.second_order[field].modulation)
+
+    def test_mixes(self):
+        """ Ensures downmixes match a summary of the mixed signal. """
+        s = symbaudio.analysis.feature.MultiChannelSummary(
+            self.audio, ["side", 1, "mid"], framesize=64)
+        raw = self.audio.raw.astype(numpy.float64)
+        mid = (raw[:, 0] + raw[:, 1]) / 2
+        side = (raw[:, 0] - raw[:, 1]) / 2
+        expect = harness.FakeAudioFile(1024, numpy.column_stack((side, mid)))
+        for (i, chan) in [(0, 0), (2, 1)]:
+            summary = symbaudio.analysis.feature.AudioSummary(expect, framesize=64, chan=chan)
+            numpy.testing.assert_allclose(s.features[i], summary.first_order.features)
+
+class TestFrameFeatures(unittest.TestCase):
+    """ Compares batched frame statistics to the per-frame definitions. """
+
+    def check_per_frame(self, real):
+        """ Each row should match the statistics of the corresponding frame. """
+        frames = numpy.random.randint(-1000, 1000, (5, 32))
+        freqs = symbaudio.analysis.spectral.make_freq_table(100, 32)
+        plan = symbaudio.analysis.spectral.SpectralPlan(100, 32, real)
+        block = symbaudio.analysis.feature.frame_features(frames, plan)
+        self.assertEqual(block.shape, (5, 4))
+        for i in range(0, 5):
+            spectrum = numpy.absolute(numpy.fft.fft(frames[i]))
+            mu, sigma = symbaudio.analysis.spectral.spectral_shape(spectrum, freqs)
+            eng = symbaudio.analysis.spectral.spectral_energy(spectrum)
+            self.assertAlmostEqual(block[i, 0], mu)
+            self.assertAlmostEqual(block[i, 1] / sigma, 1)
+            self.assertAlmostEqual(block[i, 2] / eng, 1)
+            self.assertEqual(block[i, 3], symbaudio.analysis.spectral.zcr(frames[i]))
+
+    def test_matches_per_frame(self):
+        """ Compares the full spectrum path to the per-frame definitions. """
+        self.check_per_frame(False)
+
+    def test_matches_per_frame_real(self):
+        """ Compares the half spectrum path to the per-frame definitions. """
+        self.check_per_frame(True)
+
 if __name__ == '__main__':
     unittest.main()
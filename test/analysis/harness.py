@@ -10,3 +10,13 @@ sys.path.append(
         )
     )
 )
+
+class FakeAudioFile:
+    """ A mock class for testing AudioFile clients. """
+
+    def __init__(self, fs, raw):
+        """ Treats (fs, raw) as the return from scipy.io.wavfile. """
+        self.path = None
+        self.sample_rate_hz = fs
+        self.raw = raw
+        self.sample_count, self.channel_count = self.raw.shape
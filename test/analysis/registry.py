@@ -0,0 +1,114 @@
+import numpy
+import unittest
+
+import harness
+import symbaudio.analysis.feature
+import symbaudio.analysis.registry
+import symbaudio.analysis.spectral
+
+class TestFeatures(unittest.TestCase):
+    """ Tests the built-in features against their definitions. """
+
+    def setUp(self):
+        """ Generates random frames, and a plan for them. """
+        self.frames = numpy.random.default_rng(5).normal(size=(6, 32))
+        self.plan = symbaudio.analysis.spectral.SpectralPlan(64, 32)
+
+    def extract(self, fields, frames=None, plan=None):
+        """ Computes features over a single block. """
+        plan = self.plan if plan is None else plan
+        frames = self.frames if frames is None else frames
+        return symbaudio.analysis.registry.FeatureExtractor(fields, plan)(frames)
+
+    def test_rms(self):
+        """ The RMS is taken over the raw samples. """
+        result = self.extract(["rms"])
+        expect = numpy.sqrt(numpy.mean(self.frames ** 2, axis=1))
+        numpy.testing.assert_allclose(result[:, 0], expect)
+
+    def test_rolloff(self):
+        """ The roll-off of a pure tone is the frequency of the tone. """
+        frames = numpy.cos(2 * numpy.pi * 5 * numpy.arange(0, 32) / 32)[None, :]
+        self.assertEqual(self.extract(["rolloff"], frames)[0, 0], 10)
+
+    def test_flatness(self):
+        """ Noise is flatter than a tone, and a flat spectrum has flatness one. """
+        tone = numpy.cos(2 * numpy.pi * 5 * numpy.arange(0, 32) / 32)[None, :]
+        impulse = numpy.zeros((1, 32))
+        impulse[0, 0] = 1
+        self.assertLess(self.extract(["flatness"], tone)[0, 0], 1e-3)
+        self.assertAlmostEqual(self.extract(["flatness"], impulse)[0, 0], 1)
+
+    def test_flux_blocks(self):
+        """ Flux is carried across consecutive blocks of an extractor. """
+        whole = self.extract(["flux"])
+        extract = symbaudio.analysis.registry.FeatureExtractor(["flux"], self.plan)
+        blocks = numpy.concatenate([extract(self.frames[i:i+4]) for i in range(0, 6, 4)])
+        numpy.testing.assert_allclose(blocks, whole)
+        self.assertEqual(whole[0, 0], 0)
+        spectra = numpy.abs(numpy.fft.rfft(self.frames))
+        self.assertAlmostEqual(whole[3, 0], numpy.linalg.norm(spectra[3] - spectra[2]))
+
+    def test_full_spectrum(self):
+        """ Features agree between the half and full spectrum paths. """
+        fields = list(symbaudio.analysis.registry.FEATURES)
+        full = symbaudio.analysis.spectral.SpectralPlan(64, 32, real=False)
+        numpy.testing.assert_allclose(self.extract(fields, plan=full), self.extract(fields),
+                                      atol=1e-9)
+
+    def test_defaults(self):
+        """ The default fields are those of FeatureSeries. """
+        numpy.testing.assert_array_equal(
+            symbaudio.analysis.feature.frame_features(self.frames, self.plan),
+            self.extract(symbaudio.analysis.feature.FeatureSeries.FIELDS))
+
+class TestRegister(unittest.TestCase):
+    """ Tests custom features, and the sharing of intermediates. """
+
+    def tearDown(self):
+        """ Removes the custom features. """
+        for name in ["peak", "peak_bin"]:
+            symbaudio.analysis.registry.FEATURES.pop(name, None)
+
+    def test_register(self):
+        """ Custom features receive shared intermediates, computed once. """
+        calls = []
+        plan = symbaudio.analysis.spectral.SpectralPlan(64, 32)
+        transform = plan.transform
+        plan.transform = lambda frames: calls.append(1) or transform(frames)
+        symbaudio.analysis.registry.register(
+            "peak", ["magnitude"], lambda ctx, plan: numpy.max(ctx["magnitude"], axis=-1))
+        symbaudio.analysis.registry.register(
+            "peak_bin", ["power"], lambda ctx, plan: numpy.argmax(ctx["power"], axis=-1))
+        frames = numpy.cos(2 * numpy.pi * 3 * numpy.arange(0, 32) / 32)[None, :]
+        extract = symbaudio.analysis.registry.FeatureExtractor(
+            ["peak", "peak_bin", "centroid", "energy"], plan)
+        result = extract(frames)
+        self.assertEqual(len(calls), 1)
+        self.assertAlmostEqual(result[0, 0], 16)
+        self.assertEqual(result[0, 1], 3)
+
+    def test_undeclared(self):
+        """ Features may only use the intermediates they declare. """
+        symbaudio.analysis.registry.register("peak", ["frame"], lambda ctx, plan: ctx["power"])
+        plan = symbaudio.analysis.spectral.SpectralPlan(64, 32)
+        extract = symbaudio.analysis.registry.FeatureExtractor(["peak"], plan)
+        self.assertRaises(KeyError, extract, numpy.zeros((1, 32)))
+
+class TestSelectedFields(unittest.TestCase):
+    """ Tests summaries over a selection of features. """
+
+    def test_summary(self):
+        """ Each field is recorded and aggregated under its own name. """
+        raw = numpy.random.randint(-1000, 1000, (64 * 8, 2)).astype(numpy.int16)
+        audio = harness.FakeAudioFile(1024, raw)
+        fields = ["rms", "zeros"]
+        s = symbaudio.analysis.feature.AudioSummary(audio, framesize=64, fields=fields)
+        expect = symbaudio.analysis.feature.AudioSummary(audio, framesize=64)
+        self.assertEqual(s.first_order.fields, fields)
+        self.assertEqual(sorted(s.second_order), sorted(fields))
+        numpy.testing.assert_array_equal(s.first_order.features[:, 1],
+                                         expect.first_order.features[:, 3])
+
+if __name__ == '__main__':
+    unittest.main()
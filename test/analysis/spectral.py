@@ -71,6 +71,14 @@ class TestZCR(unittest.TestCase):
         result = symbaudio.analysis.spectral.zcr(arr)
         self.assertEqual(result, 10)
 
+    def test_matrix(self):
+        """
+        Computes the ZCR of each row in a matrix.
+        """
+        arr = numpy.array([[1, -1, 1, -1], [1, 2, 3, 4], [-1, -2, 3, 4]])
+        result = symbaudio.analysis.spectral.zcr(arr)
+        self.assertEqual(list(result), [3, 0, 1])
+
 class TestSpectralEnergy(unittest.TestCase):
     """
     Tests that spectral energy is computed properly.
@@ -105,6 +113,13 @@ class TestSpectralEnergy(unittest.TestCase):
         expect = x1 * x1 + x2 * x2 + x3 * x3 + x4 * x4 + x5 * x5
         self.assertEqual(result, expect)
 
+    def test_matrix(self):
+        """
+        Tests the energy is computed for each row of a matrix.
+        """
+        result = symbaudio.analysis.spectral.spectral_energy([[1, 2], [3, 0]])
+        self.assertEqual(list(result), [5, 9])
+
 class TestSpectralShape(unittest.TestCase):
     """
     Tests that spectral shape captures spread and centroid properly.
@@ -156,6 +171,16 @@ class TestSpectralShape(unittest.TestCase):
         self.assertEqual(mu, 5)
         self.assertEqual(sigma, 50)
 
+    def test_matrix(self):
+        """
+        Tests each row of a matrix is treated as an independent spectrum.
+        """
+        spectrum = numpy.array([[1, 1, 1, 1], [0, 0, 0, 0], [0, 0, 0, 1]])
+        freqs = numpy.array([0, 0, 1, 3])
+        (mu, sigma) = symbaudio.analysis.spectral.spectral_shape(spectrum, freqs)
+        self.assertEqual(list(mu), [1, 0, 3])
+        self.assertEqual(list(sigma), [1.5, 0, 0])
+
 class TestMakeFreqTable(unittest.TestCase):
     """
     Tests the make_freq_table function from the spectral analysis library.
@@ -188,5 +213,136 @@ class TestMakeFreqTable(unittest.TestCase):
     	for i in range(1, half_len):
     		self.assertEqual(result[i] - result[i - 1], 1)
 
+    def test_matches_definition(self):
+        """
+        Tests the table against its per-bin definition.
+        """
+        for (fs, N) in [(44100, 1024), (7, 30), (1, 2)]:
+            result = symbaudio.analysis.spectral.make_freq_table(fs, N)
+            delta_f = fs / float(N)
+            expt = [delta_f * (min(i, N - 1 - i) + 0.5) for i in range(0, N)]
+            self.assertEqual(list(result), expt)
+
+    def test_memoized(self):
+        """
+        Tests tables are shared, and read-only.
+        """
+        result = symbaudio.analysis.spectral.make_freq_table(44100, 512)
+        self.assertIs(result, symbaudio.analysis.spectral.make_freq_table(44100, 512))
+        self.assertFalse(result.flags.writeable)
+
+class TestMakeWindow(unittest.TestCase):
+    """
+    Tests the window functions.
+    """
+
+    def test_windows(self):
+        """
+        Tests the periodic windows peak at their centres, and are memoized.
+        """
+        for name in symbaudio.analysis.spectral.WINDOWS:
+            window = symbaudio.analysis.spectral.make_window(name, 16)
+            self.assertEqual(len(window), 16)
+            self.assertAlmostEqual(window[8], 1)
+            self.assertIs(window, symbaudio.analysis.spectral.make_window(name, 16))
+        self.assertAlmostEqual(symbaudio.analysis.spectral.make_window("hann", 16)[0], 0)
+
+    def test_rect_plan(self):
+        """
+        Tests a rectangular window leaves frames unchanged.
+        """
+        plan = symbaudio.analysis.spectral.SpectralPlan(10, 8, window="rect")
+        self.assertIsNone(plan.window)
+
+class TestTableCache(unittest.TestCase):
+    """
+    Tests the bounded memoization of tables.
+    """
+
+    def test_eviction(self):
+        """
+        Tests the least recently used tables are evicted first.
+        """
+        cache = symbaudio.analysis.spectral._TableCache(3 * 80)
+        make = lambda: (numpy.zeros(10),)
+        tables = [cache.get(i, make) for i in range(0, 3)]
+        self.assertIs(cache.get(0, make), tables[0])
+        cache.get(3, make)
+        self.assertIs(cache.get(0, make), tables[0])
+        self.assertIs(cache.get(2, make), tables[2])
+        self.assertIsNot(cache.get(1, make), tables[1])
+
+    def test_oversized(self):
+        """
+        Tests a table larger than the bound is still returned.
+        """
+        cache = symbaudio.analysis.spectral._TableCache(8)
+        table = cache.get(0, lambda: (numpy.zeros(10),))
+        self.assertEqual(len(table[0]), 10)
+        self.assertFalse(table[0].flags.writeable)
+
+class TestHalfSpectrum(unittest.TestCase):
+    """
+    Tests the half spectrum functions against their full spectrum definitions.
+    """
+
+    def test_table(self):
+        """
+        Tests each half bin is counted at its full bin, and at its mirror.
+        """
+        (freqs, step, weights) = symbaudio.analysis.spectral.make_half_freq_table(8, 8)
+        full = symbaudio.analysis.spectral.make_freq_table(8, 8)
+        self.assertEqual(step, 1)
+        self.assertEqual(list(freqs[:4]), list(full[:4]))
+        self.assertEqual(list(freqs[1:] - step), list(full[4:][::-1]))
+        self.assertEqual(weights.tolist(), [[1, 1, 1, 1, 0], [0, 1, 1, 1, 1]])
+
+    def test_size_zero(self):
+        """
+        Tests the zero case is an empty table.
+        """
+        (freqs, _, weights) = symbaudio.analysis.spectral.make_half_freq_table(0, 0)
+        self.assertEqual(len(freqs), 0)
+        self.assertEqual(weights.shape, (2, 0))
+
+    def test_matches_full(self):
+        """
+        Tests the shape and energy of random real signals.
+        """
+        rng = numpy.random.default_rng(7)
+        for n in [2, 4, 64, 1024]:
+            frames = rng.normal(size=(3, n))
+            full = symbaudio.analysis.spectral.make_freq_table(44100, n)
+            (freqs, step, weights) = symbaudio.analysis.spectral.make_half_freq_table(44100, n)
+            spectrum = numpy.abs(numpy.fft.fft(frames))
+            half = numpy.abs(numpy.fft.rfft(frames))
+            (mu, sigma) = symbaudio.analysis.spectral.spectral_shape(spectrum, full)
+            (hmu, hsigma) = symbaudio.analysis.spectral.half_spectral_shape(
+                half, freqs, step, weights)
+            numpy.testing.assert_allclose(hmu, mu)
+            numpy.testing.assert_allclose(hsigma, sigma, atol=1e-9)
+            numpy.testing.assert_allclose(
+                symbaudio.analysis.spectral.half_spectral_energy(half, weights),
+                symbaudio.analysis.spectral.spectral_energy(spectrum))
+
+    def test_zero_spectrum(self):
+        """
+        Tests a zero spectrum has zero centroid and spread.
+        """
+        (freqs, step, weights) = symbaudio.analysis.spectral.make_half_freq_table(10, 8)
+        (mu, sigma) = symbaudio.analysis.spectral.half_spectral_shape(
+            numpy.zeros(5), freqs, step, weights)
+        self.assertEqual(mu, 0)
+        self.assertEqual(sigma, 0)
+
+    def test_shared_plan(self):
+        """
+        Tests plans are shared, and read-only.
+        """
+        plan = symbaudio.analysis.spectral.get_plan(100, 16)
+        self.assertIs(plan, symbaudio.analysis.spectral.get_plan(100, 16))
+        self.assertIsNot(plan, symbaudio.analysis.spectral.get_plan(100, 16, False))
+        self.assertFalse(plan.freqs.flags.writeable)
+
 if __name__ == '__main__':
     unittest.main()
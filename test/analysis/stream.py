@@ -0,0 +1,86 @@
+import io
+import numpy
+import unittest
+
+import harness
+import symbaudio.analysis.feature
+import symbaudio.analysis.stream
+
+def _make_audio(frames, framesize=16, seed=3):
+    """ Produces a stereo FakeAudioFile, with a trailing partial frame. """
+    rng = numpy.random.default_rng(seed)
+    raw = rng.integers(-1000, 1000, size=(frames * framesize + 5, 2))
+    return harness.FakeAudioFile(8000, raw)
+
+class TestReaders(unittest.TestCase):
+    """ Tests the chunk readers. """
+
+    def test_read_chunks(self):
+        """ Ensures chunks cover the file, in order. """
+        audio = _make_audio(10)
+        chunks = list(symbaudio.analysis.stream.read_chunks(audio, 7))
+        self.assertTrue(all(len(c) == 7 for c in chunks[:-1]))
+        numpy.testing.assert_array_equal(numpy.concatenate(chunks), audio.raw)
+
+    def test_read_pcm(self):
+        """ Ensures interleaved PCM is split into samples and channels. """
+        raw = numpy.arange(0, 22, dtype=numpy.int16).reshape(-1, 2)
+        f = io.BytesIO(raw.tobytes() + b"\x01")
+        chunks = list(symbaudio.analysis.stream.read_pcm(f, channels=2, chunksize=4))
+        self.assertEqual([len(c) for c in chunks], [4, 4, 3])
+        numpy.testing.assert_array_equal(numpy.concatenate(chunks), raw)
+
+class TestStreamingSummary(unittest.TestCase):
+    """ Compares streaming summaries with AudioSummary. """
+
+    def test_matches_summary(self):
+        """ Ensures the frames and aggregates match a complete analysis. """
+        audio = _make_audio(40)
+        expt = symbaudio.analysis.feature.AudioSummary(audio, framesize=16, chan=1)
+        summary = symbaudio.analysis.stream.StreamingSummary(8000, 16, chan=1)
+        chunks = symbaudio.analysis.stream.read_chunks(audio, 37)
+        rows = numpy.array(list(summary.stream(chunks)))
+        numpy.testing.assert_allclose(rows, expt.first_order.features)
+        self.assertEqual(summary.count, 40)
+        self.assertEqual(summary.length_s, expt.length_s)
+        agg = summary.aggregate()
+        for field in symbaudio.analysis.feature.FeatureSeries.FIELDS:
+            self.assertAlmostEqual(agg[field].mean, expt.second_order[field].mean)
+            self.assertAlmostEqual(agg[field].modulation, expt.second_order[field].modulation)
+
+    def test_bounded_history(self):
+        """ Ensures modulation uses the latest frames, and means use all frames. """
+        audio = _make_audio(50)
+        full = symbaudio.analysis.feature.AudioSummary(audio, framesize=16)
+        summary = symbaudio.analysis.stream.StreamingSummary(8000, 16, history=12)
+        for chunk in symbaudio.analysis.stream.read_chunks(audio, 100):
+            summary.update(chunk)
+        features = full.first_order.features
+        numpy.testing.assert_allclose(summary.first_order(), features[-12:])
+        agg = summary.aggregate()
+        for i in range(0, len(symbaudio.analysis.feature.FeatureSeries.FIELDS)):
+            field = symbaudio.analysis.feature.FeatureSeries.FIELDS[i]
+            expt = symbaudio.analysis.feature.FeatureAggregation(features[-12:,i], 500)
+            self.assertAlmostEqual(agg[field].mean, numpy.mean(features[:,i]))
+            self.assertAlmostEqual(agg[field].modulation, expt.modulation)
+
+    def test_hop(self):
+        """ Ensures overlapping frames are carried between chunks. """
+        audio = _make_audio(20)
+        expt = symbaudio.analysis.feature.AudioSummary(audio, framesize=16, hop=6, window="hann")
+        summary = symbaudio.analysis.stream.StreamingSummary(8000, 16, hop=6, window="hann")
+        chunks = symbaudio.analysis.stream.read_chunks(audio, 11)
+        rows = numpy.array(list(summary.stream(chunks)))
+        numpy.testing.assert_allclose(rows, expt.first_order.features)
+        self.assertEqual(summary.downsample_hz, expt.first_order.downsample_hz)
+
+    def test_partial_chunks(self):
+        """ Ensures chunks smaller than a frame are buffered. """
+        summary = symbaudio.analysis.stream.StreamingSummary(8000, 16)
+        self.assertEqual(len(summary.update(numpy.arange(0, 10))), 0)
+        self.assertEqual(len(summary.update(numpy.arange(0, 10))), 1)
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.sample_count, 20)
+
+if __name__ == '__main__':
+    unittest.main()
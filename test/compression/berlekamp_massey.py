@@ -0,0 +1,87 @@
+import numpy
+import sympy
+import unittest
+
+import harness
+import symbaudio.compression.berlekamp_massey
+import symbaudio.compression.xgcd
+
+def _recurrence(rng, order, length):
+    """ Helper to produce a random integer recurrence of a given order. """
+    c = list(rng.randint(-3, 4, order))
+    s = list(rng.randint(-5, 6, order))
+    while len(s) < length:
+        s.append(sum(c[j] * s[-1-j] for j in range(0, order)))
+    return s[:length]
+
+class TestBerlekampMassey(unittest.TestCase):
+    """ Tests the recurrence solvers directly. """
+
+    def test_fib(self):
+        """ Finds a{i} = a{i-1} + a{i-2}. """
+        (order, c) = symbaudio.compression.berlekamp_massey.berlekamp_massey(
+            [1, 1, 2, 3, 5, 8], sympy.QQ)
+        self.assertEqual(order, 2)
+        self.assertEqual(c, [1, -1, -1])
+
+    def test_fib_modular(self):
+        """ Finds a{i} = a{i-1} + a{i-2} over GF(7). """
+        (order, c) = symbaudio.compression.berlekamp_massey.berlekamp_massey_modular(
+            [1, 1, 2, 3, 5, 8], 7)
+        self.assertEqual(order, 2)
+        self.assertEqual(list(c), [1, 6, 6])
+
+    def test_max_order(self):
+        """ The search is abandoned once the order is exceeded. """
+        seq = [1, 0, 0, 0, 0, 1]
+        for solver, dom in [(symbaudio.compression.berlekamp_massey.berlekamp_massey, sympy.QQ),
+                            (symbaudio.compression.berlekamp_massey.berlekamp_massey_modular, 7)]:
+            self.assertIsNone(solver(seq, dom, max_order=2))
+            (order, _) = solver(seq, dom)
+            self.assertEqual(order, 5)
+
+class TestReconstructRational(unittest.TestCase):
+    """ Compares Berlekamp-Massey against the XGCD reconstruction. """
+
+    def test_matches_xgcd(self):
+        """ Order k recurrences agree with the normalized XGCD result. """
+        rng = numpy.random.RandomState(0)
+        for dom in ["QQ", sympy.GF(65537)]:
+            for k in [1, 2, 5, 8]:
+                for order in range(1, k + 1):
+                    seq = _recurrence(rng, order, 2 * k)
+                    expect = symbaudio.compression.xgcd.normalize(
+                        *symbaudio.compression.xgcd.reconstruct_rational(k, seq, dom))
+                    result = symbaudio.compression.berlekamp_massey.reconstruct_rational(
+                        k, seq, dom)
+                    self.assertEqual(result, expect)
+
+    def test_numpy_backend(self):
+        """ The modular solver agrees with the generic solver. """
+        rng = numpy.random.RandomState(1)
+        dom = sympy.GF(65537)
+        for width in [2, 10, 64]:
+            seq = rng.randint(-32768, 32767, width)
+            expect = symbaudio.compression.berlekamp_massey.reconstruct_rational(
+                width // 2, seq, dom)
+            result = symbaudio.compression.berlekamp_massey.reconstruct_rational(
+                width // 2, seq, dom, backend="numpy")
+            self.assertEqual(result, expect)
+
+    def test_zero(self):
+        """ A zero sequence produces zero polynomials. """
+        (n, d) = symbaudio.compression.berlekamp_massey.reconstruct_rational(2, [0, 0, 0, 0])
+        self.assertTrue(n.is_zero)
+        self.assertTrue(d.is_zero)
+
+    def test_early_exit(self):
+        """ Early exit only applies to recurrences of order above k. """
+        self.assertIsNone(symbaudio.compression.berlekamp_massey.reconstruct_rational(
+            2, [1, 0, 0, 1], early_exit=True))
+        (n, d) = symbaudio.compression.berlekamp_massey.reconstruct_rational(
+            2, [1, 1, 2, 3], early_exit=True)
+        self.assertEqual(n.all_coeffs(), [1])
+        self.assertEqual(d.all_coeffs(), [-1, -1, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import multiprocessing
+import numpy
+import os
+import scipy.io.wavfile
+import shutil
+import tempfile
+import unittest
+
+import harness
+import symbaudio.analysis.audio
+import symbaudio.compression.codec
+
+class TestFrames(unittest.TestCase):
+    """ Tests the encoding of frames, and the expansion of power series. """
+
+    def modes(self, frames, dtype=numpy.int16, max_order=8):
+        """ Helper to round trip frames, and return the name of the mode of each. """
+        (records, modes) = symbaudio.compression.codec.encode_frames(frames, dtype, max_order)
+        decoded = symbaudio.compression.codec.decode_records(records, frames.shape[1], dtype)
+        self.assertTrue(numpy.array_equal(decoded, frames))
+        self.assertEqual(decoded.dtype, numpy.dtype(dtype))
+        return [symbaudio.compression.codec.MODES[mode] for mode in modes]
+
+    def test_expand(self):
+        """ The power series of 1 / (1 - x - x^2) is the Fibonacci sequence. """
+        series = symbaudio.compression.codec.expand([[1]], [[1, 65536, 65536]], 8, 65537)
+        self.assertEqual(list(series[0]), [1, 1, 2, 3, 5, 8, 13, 21])
+
+    def test_modes(self):
+        """ Each frame is stored in its smallest mode. """
+        rng = numpy.random.RandomState(0)
+        frames = numpy.zeros((5, 64), dtype=numpy.int16)
+        frames[1] = numpy.tile([-32768, 32767, 5, -7], 16)
+        frames[2] = rng.randint(-50, 50, 64)
+        frames[3] = rng.randint(-32768, 32768, 64)
+        frames[4] = numpy.arange(64) * 3 - 50
+        self.assertEqual(self.modes(frames), ["rational", "rational", "delta", "raw", "rational"])
+
+    def test_max_order(self):
+        """ A recurrence longer than max_order is not encoded rationally. """
+        period = numpy.random.RandomState(1).randint(-32768, 32768, 12).astype(numpy.int16)
+        frames = numpy.tile(period, (1, 16))
+        self.assertEqual(self.modes(frames, max_order=12), ["rational"])
+        self.assertEqual(self.modes(frames, max_order=11), ["raw"])
+
+    def test_wide_samples(self):
+        """ Wider samples are reconstructed modulo a larger prime, or fall back. """
+        frames = numpy.array([[2 ** 29, -(2 ** 29)] * 8, [2 ** 31 - 1, 0] * 8], dtype=numpy.int32)
+        self.assertEqual(self.modes(frames, numpy.int32), ["rational", "raw"])
+
+    def test_odd_width(self):
+        """ Frames of odd width (e.g., a trailing partial frame) are supported. """
+        frames = numpy.array([[1, 2, 3, 4, 5], [0, 0, 0, 0, 0], [9, -9, 9, -9, 9]])
+        self.modes(frames.astype(numpy.int16))
+        self.modes(frames[:, :1].astype(numpy.uint8))
+
+class TestContainer(unittest.TestCase):
+    """ Round trips wave files through containers. """
+
+    def setUp(self):
+        """ Sets up a temp dir for the containers. """
+        self.tempdir = tempfile.mkdtemp()
+        self.fn = "test/data/44100hz_2chan_440tone_stereo_88200samps.wav"
+
+    def tearDown(self):
+        """ Cleans up temporary directory. """
+        shutil.rmtree(self.tempdir)
+
+    def round_trip(self, fn, pool=None, **kwargs):
+        """ Helper to encode and decode a file, and compare the samples. """
+        container = os.path.join(self.tempdir, "encoded.sbac")
+        decoded = os.path.join(self.tempdir, "decoded.wav")
+        stats = symbaudio.compression.codec.encode_file(fn, container, pool=pool, **kwargs)
+        symbaudio.compression.codec.decode_file(container, decoded, pool=pool, blocksize=3)
+        (rate, expect) = scipy.io.wavfile.read(fn)
+        (decoded_rate, samples) = scipy.io.wavfile.read(decoded)
+        self.assertEqual(decoded_rate, rate)
+        self.assertTrue(numpy.array_equal(samples, expect))
+        self.assertEqual(stats["output_bytes"], os.path.getsize(container))
+        self.assertEqual(stats["ratio"], stats["input_bytes"] / stats["output_bytes"])
+        self.assertEqual(sum(stats[mode] for mode in symbaudio.compression.codec.MODES),
+                         -(-len(expect) // kwargs.get("framewidth", 1024)) * 2)
+        return (container, stats)
+
+    def test_round_trip(self):
+        """ A file is recovered exactly, across blocks and a partial frame. """
+        self.round_trip(self.fn, framewidth=1000, blocksize=7)
+
+    def test_compressible(self):
+        """ Silence and periodic signals are compressed rationally. """
+        fn = os.path.join(self.tempdir, "periodic.wav")
+        samples = numpy.zeros((10000, 2), dtype=numpy.int16)
+        samples[:, 0] = numpy.tile(numpy.random.RandomState(0).randint(-9999, 9999, 20), 500)
+        scipy.io.wavfile.write(fn, 8000, samples)
+        (_, stats) = self.round_trip(fn, framewidth=500)
+        self.assertEqual(stats["rational"], 40)
+        self.assertGreater(stats["ratio"], 10)
+
+    def test_pool(self):
+        """ Blocks encoded and decoded in parallel produce the same container. """
+        (container, _) = self.round_trip(self.fn, blocksize=5)
+        with open(container, "rb") as f:
+            expect = f.read()
+        with multiprocessing.Pool(2) as pool:
+            (container, _) = self.round_trip(self.fn, pool, blocksize=5)
+        with open(container, "rb") as f:
+            self.assertEqual(f.read(), expect)
+
+    def test_seek(self):
+        """ Frames are decoded from the middle and end of a container. """
+        (container, _) = self.round_trip(self.fn, framewidth=1000)
+        expect = symbaudio.analysis.audio.AudioFile(self.fn).raw
+        with symbaudio.compression.codec.CodecFile(container) as encoded:
+            self.assertEqual(len(encoded), 89)
+            self.assertEqual(encoded.channel_count, 2)
+            self.assertEqual(encoded.dtype, expect.dtype)
+            self.assertTrue(numpy.array_equal(encoded.read_frames(40, 42), expect[40000:42000]))
+            self.assertTrue(numpy.array_equal(encoded.read_frames(87, 89), expect[87000:]))
+            self.assertEqual(len(encoded.read_frames(5, 5)), 0)
+
+    def test_not_a_container(self):
+        """ Files without the magic number are rejected. """
+        with self.assertRaises(ValueError):
+            symbaudio.compression.codec.CodecFile(self.fn)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import numpy
+import sympy
+import unittest
+
+import harness
+import symbaudio.compression.halfgcd
+import symbaudio.compression.modular
+import symbaudio.compression.xgcd
+
+def _sequences(rng, width):
+    """ Helper to produce random, periodic, sparse and degenerate sequences. """
+    yield rng.randint(-32768, 32767, width)
+    yield numpy.array([1, 1] * (width // 2))
+    sparse = rng.randint(-3, 3, width)
+    sparse[::3] = 0
+    yield sparse
+    impulse = numpy.zeros(width, dtype=int)
+    impulse[width // 3] = 5
+    yield impulse
+
+class TestHalfXGCD(unittest.TestCase):
+    """ Compares the half-GCD against the classical remainder sequence. """
+
+    def setUp(self):
+        """ Lowers the cutoff so that small inputs exercise the recursion. """
+        self.cutoff = symbaudio.compression.halfgcd.EUCLID_CUTOFF
+        symbaudio.compression.halfgcd.EUCLID_CUTOFF = 4
+
+    def tearDown(self):
+        """ Restores the cutoff. """
+        symbaudio.compression.halfgcd.EUCLID_CUTOFF = self.cutoff
+
+    def test_modular(self):
+        """ Checks the ModularArith results against modular.xgcd_threshold. """
+        rng = numpy.random.RandomState(0)
+        p = 65537
+        arith = symbaudio.compression.halfgcd.ModularArith(p)
+        for width in [2, 6, 16, 50, 128]:
+            for seq in _sequences(rng, width):
+                a = symbaudio.compression.modular.from_coefficients([1] + [0] * width, p)
+                b = symbaudio.compression.modular.from_coefficients(seq[::-1], p)
+                expect = symbaudio.compression.modular.xgcd_threshold(a, b, width // 2 - 1, p)
+                result = symbaudio.compression.halfgcd.half_xgcd(a, b, arith)
+                self.assertEqual(list(result[0]), list(expect[0]))
+                self.assertEqual(list(result[1]), list(expect[1]))
+
+    def test_reconstruct_rational(self):
+        """ Checks all algorithms agree through reconstruct_rational. """
+        rng = numpy.random.RandomState(1)
+        for dom in ["QQ", sympy.GF(65537)]:
+            for width in [2, 8, 20]:
+                for seq in _sequences(rng, width):
+                    expect = symbaudio.compression.xgcd.reconstruct_rational(
+                        width // 2, seq, dom=dom)
+                    for algorithm in ["halfgcd", "auto"]:
+                        result = symbaudio.compression.xgcd.reconstruct_rational(
+                            width // 2, seq, dom=dom, algorithm=algorithm)
+                        self.assertEqual(result, expect)
+
+    def test_numpy_backend(self):
+        """ Checks the numpy backend supports the half-GCD. """
+        rng = numpy.random.RandomState(2)
+        dom = sympy.GF(65537)
+        for seq in _sequences(rng, 64):
+            expect = symbaudio.compression.xgcd.reconstruct_rational(
+                32, seq, dom=dom, backend="numpy")
+            result = symbaudio.compression.xgcd.reconstruct_rational(
+                32, seq, dom=dom, backend="numpy", algorithm="halfgcd")
+            self.assertEqual(result, expect)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import multiprocessing
+import numpy
+import os
+import scipy.io.wavfile
+import tempfile
+import unittest
+
+import harness
+import symbaudio.compression.measure
+
+FN = "test/data/44100hz_2chan_440tone_stereo_88200samps.wav"
+
+def _without_ns(rows):
+    """ Drops the (timing dependent) ns column of each row. """
+    return [row[:1] + row[2:] for row in rows]
+
+class TestAnalyzeFile(unittest.TestCase):
+    """ Validates the frame selection and sharding of analyze_file. """
+
+    def analyze(self, seed=0, pool=None, shards=1, **kwargs):
+        """ Helper to analyze the test file over the finite domain. """
+        return _without_ns(symbaudio.compression.measure.analyze_file(
+            FN, 16, "finite", 30, "numpy", seed=seed, pool=pool, shards=shards, **kwargs))
+
+    def test_reproducible(self):
+        """ A fixed seed selects the same frames on every run. """
+        rows = self.analyze(seed="0:a.wav")
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows, self.analyze(seed="0:a.wav"))
+        self.assertNotEqual([row[0] for row in rows],
+                            [row[0] for row in self.analyze(seed="0:b.wav")])
+
+    def test_shards(self):
+        """ Sharded runs produce the same rows as unsharded runs, in order. """
+        with multiprocessing.Pool(3) as pool:
+            self.assertEqual(self.analyze(pool=pool, shards=3), self.analyze())
+            self.assertEqual(self.analyze(pool=pool, shards=3, all_frames=True),
+                             self.analyze(all_frames=True))
+
+class TestNormalization(unittest.TestCase):
+    """ Validates that every algorithm and backend is measured on the same rationals. """
+
+    def analyze(self, domain, backend="sympy", algorithm="euclid", **kwargs):
+        """ Helper to analyze a fixed selection of frames, without ns or status. """
+        rows = symbaudio.compression.measure.analyze_file(
+            FN, 16, domain, 8, backend, algorithm, seed="normalized", **kwargs)
+        return [row[:5] for row in _without_ns(rows)]
+
+    def test_rational(self):
+        """ The XGCD, Berlekamp-Massey and multimodular rationals are measured alike. """
+        expect = self.analyze("rational")
+        self.assertEqual(self.analyze("rational", algorithm="halfgcd"), expect)
+        self.assertEqual(self.analyze("rational", algorithm="bm"), expect)
+        self.assertEqual(self.analyze("rational", "multimodular"), expect)
+        self.assertEqual(self.analyze("integer", algorithm="subresultant"), expect)
+
+    def test_finite(self):
+        """ Batched frames are measured as sampled frames are. """
+        expect = self.analyze("finite", "numpy")
+        self.assertEqual(self.analyze("finite", algorithm="bm"), expect)
+        frames = set(row[0] for row in expect)
+        rows = self.analyze("finite", "numpy", all_frames=True)
+        self.assertEqual(sorted(expect), [row for row in rows if row[0] in frames])
+
+    def test_early_exit(self):
+        """ Frames abandoned by Berlekamp-Massey are recorded with the status "order". """
+        with tempfile.TemporaryDirectory() as tempdir:
+            fn = os.path.join(tempdir, "impulse.wav")
+            samples = numpy.zeros((32, 1), dtype=numpy.int16)
+            samples[15] = 1
+            samples[16:] = 7
+            scipy.io.wavfile.write(fn, 8000, samples)
+            rows = symbaudio.compression.measure.analyze_file(
+                fn, 16, "rational", 2, algorithm="bm", seed=0, early_exit=True)
+        self.assertEqual(sorted((row[0], row[2], row[-1]) for row in rows),
+                         [(0, -1, "order"), (1, 7, "ok")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import numpy
+import unittest
+
+import harness
+import symbaudio.compression.modular
+
+class TestArithmetic(unittest.TestCase):
+    """ Tests the dense polynomial arithmetic over GF(p). """
+
+    def poly(self, coeffs, p=7):
+        """ Helper to construct a polynomial over GF(p). """
+        return symbaudio.compression.modular.from_coefficients(coeffs, p)
+
+    def test_from_coefficients(self):
+        """ Coefficients are reduced, and leading zeros are stripped. """
+        a = self.poly([0, 0, -1, 8, 3])
+        self.assertEqual(list(a), [6, 1, 3])
+        self.assertEqual(symbaudio.compression.modular.degree(a), 2)
+        self.assertEqual(symbaudio.compression.modular.degree(self.poly([0, 7])), -1)
+
+    def test_add_sub(self):
+        """ Addition and subtraction align the constant terms. """
+        a = self.poly([1, 2, 3])
+        b = self.poly([6, 5])
+        self.assertEqual(list(symbaudio.compression.modular.add(a, b, 7)), [1, 1, 1])
+        self.assertEqual(list(symbaudio.compression.modular.sub(b, a, 7)), [6, 4, 2])
+        self.assertEqual(len(symbaudio.compression.modular.sub(a, a, 7)), 0)
+
+    def test_mul(self):
+        """ (x + 1)(x - 1) = x^2 - 1 """
+        a = self.poly([1, 1])
+        b = self.poly([1, -1])
+        self.assertEqual(list(symbaudio.compression.modular.mul(a, b, 7)), [1, 0, 6])
+        self.assertEqual(len(symbaudio.compression.modular.mul(a, self.poly([]), 7)), 0)
+
+    def test_mul_large_prime(self):
+        """ Ensures products do not overflow for word-size primes. """
+        p = 2147483647
+        a = self.poly(numpy.full(100, p - 1), p)
+        b = self.poly(numpy.full(100, p - 2), p)
+        expect = numpy.convolve(numpy.array([p - 1] * 100, dtype=object),
+                                numpy.array([p - 2] * 100, dtype=object))
+        result = symbaudio.compression.modular.mul(a, b, p)
+        self.assertEqual(list(result), [int(c) % p for c in expect])
+
+    def test_karatsuba(self):
+        """ Compares Karatsuba products against direct convolution. """
+        cutoff = symbaudio.compression.modular.KARATSUBA_CUTOFF
+        symbaudio.compression.modular.KARATSUBA_CUTOFF = 4
+        try:
+            rng = numpy.random.RandomState(0)
+            for (la, lb) in [(4, 4), (37, 36), (100, 9), (9, 100), (64, 33)]:
+                a = self.poly(rng.randint(1, 65537, la), 65537)
+                b = self.poly(rng.randint(1, 65537, lb), 65537)
+                expect = numpy.convolve(a.astype(object), b.astype(object)) % 65537
+                result = symbaudio.compression.modular.mul(a, b, 65537)
+                self.assertEqual(list(result), list(expect))
+        finally:
+            symbaudio.compression.modular.KARATSUBA_CUTOFF = cutoff
+
+    def test_div(self):
+        """ Checks a * b + r is recovered by division. """
+        a = self.poly([3, 0, 2, 1, 5, 4])
+        b = self.poly([2, 6, 1])
+        (q, r) = symbaudio.compression.modular.div(a, b, 7)
+        self.assertLess(symbaudio.compression.modular.degree(r), 2)
+        recovered = symbaudio.compression.modular.add(
+            symbaudio.compression.modular.mul(q, b, 7), r, 7)
+        self.assertEqual(list(recovered), list(a))
+
+    def test_div_small_dividend(self):
+        """ A dividend of smaller degree is its own remainder. """
+        (q, r) = symbaudio.compression.modular.div(self.poly([1, 2]), self.poly([1, 2, 3]), 7)
+        self.assertEqual(len(q), 0)
+        self.assertEqual(list(r), [1, 2])
+
+class TestReconstructRational(unittest.TestCase):
+    """ Reconstructs known recurrence relations over finite fields. """
+
+    def test_finite_field(self):
+        """ Reconstructs a simple recurrence over the finite field GF(5). """
+        (n, d) = symbaudio.compression.modular.reconstruct_rational(1, [3, 1], 5)
+        self.assertEqual(list(n), [4])
+        self.assertEqual(list(d), [4, 3])
+
+    def test_fib(self):
+        """ Reconstructs a{0} = 1, a{1} = 1, a{i} = a{i-1} + a{i-2}. """
+        (n, d) = symbaudio.compression.modular.reconstruct_rational(3, [1, 1, 2, 3, 5, 8], 65537)
+        self.assertEqual(list(n), [65537 - 64])
+        self.assertEqual(list(d), [64, 64, 65537 - 64])
+
+    def test_zero(self):
+        """ A zero sequence reconstructs to zero polynomials. """
+        (n, d) = symbaudio.compression.modular.reconstruct_rational(2, [0, 0, 0, 0], 5)
+        self.assertEqual(len(n), 0)
+        self.assertEqual(len(d), 0)
+
+class TestReconstructRationalBatch(unittest.TestCase):
+    """ Compares batched reconstruction against reconstruct_rational. """
+
+    def check(self, k, frames, p):
+        """ Helper to compare every frame of a batch. """
+        (num, den, num_deg, den_deg) = symbaudio.compression.modular.reconstruct_rational_batch(
+            k, frames, p)
+        self.assertEqual(num.shape, (len(frames), k))
+        self.assertEqual(den.shape, (len(frames), k + 1))
+        for (i, frame) in enumerate(frames):
+            (n, d) = symbaudio.compression.modular.reconstruct_rational(k, frame, p)
+            self.assertEqual(list(num[i, :num_deg[i]+1][::-1]), list(n))
+            self.assertEqual(list(den[i, :den_deg[i]+1][::-1]), list(d))
+            self.assertFalse(numpy.any(num[i, num_deg[i]+1:]))
+            self.assertFalse(numpy.any(den[i, den_deg[i]+1:]))
+
+        # Normalized rationals are scaled so that the lowest denominator term is one.
+        (num_n, den_n) = symbaudio.compression.modular.normalize_batch(num, den, p)
+        for i in range(0, len(frames)):
+            lowest = den[i][den[i] != 0][:1]
+            self.assertEqual(list(den_n[i][den_n[i] != 0][:1]), [1] * len(lowest))
+            scale = int(lowest[0]) if len(lowest) > 0 else 1
+            self.assertEqual(list(num_n[i] * scale % p), list(num[i]))
+            self.assertEqual(list(den_n[i] * scale % p), list(den[i]))
+
+    def test_fib(self):
+        """ Reconstructs the Fibonacci recurrence alongside a zero frame. """
+        self.check(3, numpy.array([[1, 1, 2, 3, 5, 8], [0] * 6]), 65537)
+
+    def test_mixed_degrees(self):
+        """ Frames whose degrees drop at different rates are masked independently. """
+        rng = numpy.random.RandomState(0)
+        for k in [1, 2, 8, 17]:
+            frames = rng.randint(-2 ** 15, 2 ** 15, (12, 2 * k))
+            frames[1] = 0
+            frames[2, :k] = 0
+            frames[3] = 1
+            frames[4, ::2] = 0
+            frames[5] = numpy.tile([3, -1, 4, 1], k)[:2*k]
+            self.check(k, frames, 65537)
+            self.check(k, frames, 2147483647)
+
+if __name__ == '__main__':
+    unittest.main()
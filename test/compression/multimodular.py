@@ -0,0 +1,87 @@
+import multiprocessing
+import numpy
+import sympy
+import unittest
+
+import harness
+import symbaudio.compression.multimodular
+import symbaudio.compression.xgcd
+
+class TestLifting(unittest.TestCase):
+    """ Tests the Chinese remainder theorem and rational reconstruction. """
+
+    def test_primes(self):
+        """ The primes are distinct, descending and word-size. """
+        primes = symbaudio.compression.multimodular.primes(5)
+        self.assertEqual(primes[0], 2 ** 31 - 1)
+        self.assertEqual(primes, sorted(set(primes), reverse=True))
+        self.assertTrue(all(sympy.isprime(p) for p in primes))
+
+    def test_crt_update(self):
+        """ Combined residues agree with each image. """
+        (residues, modulus) = ([0, 0], 1)
+        for (image, p) in [([2, 6], 7), ([10, 0], 11), ([1, 12], 13)]:
+            (residues, modulus) = symbaudio.compression.multimodular.crt_update(
+                residues, modulus, image, p)
+        self.assertEqual(modulus, 7 * 11 * 13)
+        for (image, p) in [([2, 6], 7), ([10, 0], 11), ([1, 12], 13)]:
+            self.assertEqual([x % p for x in residues], image)
+
+    def test_rational_reconstruction(self):
+        """ Small fractions are recovered, and large ones are rejected. """
+        m = 1000003
+        for (a, b) in [(3, 7), (-5, 11), (0, 1), (700, 1)]:
+            u = a * pow(b, -1, m) % m
+            self.assertEqual(symbaudio.compression.multimodular.rational_reconstruction(u, m),
+                             (a, b))
+        u = 123457 * pow(65521, -1, m) % m
+        self.assertNotEqual(symbaudio.compression.multimodular.rational_reconstruction(u, m),
+                            (123457, 65521))
+
+class TestReconstructRational(unittest.TestCase):
+    """ Ensures the multimodular reconstruction agrees with the XGCD over QQ. """
+
+    def check(self, k, frame, **kwargs):
+        """ Compares the normalized results of both reconstructions. """
+        result = symbaudio.compression.multimodular.reconstruct_rational(k, frame, **kwargs)
+        expected = symbaudio.compression.xgcd.reconstruct_rational(k, frame, normalized=True)
+        self.assertEqual(result, expected)
+
+    def test_order_2_fib(self):
+        """ Reconstructs a{0} = 1, a{1} = 1, a{i} = a{i-1} + a{i-2}. """
+        (n, d) = symbaudio.compression.multimodular.reconstruct_rational(3, [1,1,2,3,5,8])
+        self.assertEqual(n.all_coeffs(), [1])
+        self.assertEqual(d.all_coeffs(), [-1,-1,1])
+
+    def test_random(self):
+        """ Noisy frames have large rational coefficients. """
+        rng = numpy.random.RandomState(0)
+        for width in [2, 8, 32]:
+            self.check(width // 2, list(rng.randint(-2 ** 15, 2 ** 15, width)))
+            self.check(width // 2, list(rng.randint(-2, 3, width)), algorithm="halfgcd")
+
+    def test_zero(self):
+        """ A zero sequence produces zero polynomials. """
+        self.check(2, [0, 0, 0, 0])
+
+    def test_pool(self):
+        """ Images may be reconstructed in parallel. """
+        frame = list(numpy.random.RandomState(1).randint(-2 ** 15, 2 ** 15, 16))
+        with multiprocessing.Pool(2) as pool:
+            self.check(8, frame, pool=pool, batch=2)
+
+    def test_max_primes(self):
+        """ None is returned if too few primes are allowed. """
+        frame = list(numpy.random.RandomState(2).randint(-2 ** 15, 2 ** 15, 32))
+        self.assertIsNone(
+            symbaudio.compression.multimodular.reconstruct_rational(16, frame, max_primes=4))
+
+    def test_backend(self):
+        """ The multimodular backend of reconstruct_rational is normalized. """
+        frame = list(numpy.random.RandomState(3).randint(-2 ** 15, 2 ** 15, 16))
+        result = symbaudio.compression.xgcd.reconstruct_rational(8, frame, backend="multimodular")
+        expected = symbaudio.compression.xgcd.reconstruct_rational(8, frame, normalized=True)
+        self.assertEqual(result, expected)
+
+if __name__ == '__main__':
+    unittest.main()
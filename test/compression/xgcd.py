@@ -1,4 +1,6 @@
+import numpy
 import sympy
+import sympy.abc
 import unittest
 
 import harness
@@ -31,5 +33,123 @@ class TestReconstructRational(unittest.TestCase):
         self.assertEqual(n.all_coeffs(), [-1])
         self.assertEqual(d.all_coeffs(), [-1,-2])
 
+    def test_numpy_backend(self):
+        """ Ensures the numpy backend agrees with the sympy backend. """
+        dom = sympy.GF(65537)
+        rng = numpy.random.RandomState(0)
+        for width in [2, 8, 32]:
+            coeffs = rng.randint(-32768, 32767, width)
+            expect = symbaudio.compression.xgcd.reconstruct_rational(width // 2, coeffs, dom=dom)
+            result = symbaudio.compression.xgcd.reconstruct_rational(
+                width // 2, coeffs, dom=dom, backend="numpy")
+            self.assertEqual(result, expect)
+
+    def test_numpy_backend_zero(self):
+        """ Ensures the numpy backend handles a zero sequence. """
+        (n, d) = symbaudio.compression.xgcd.reconstruct_rational(
+            2, [0, 0, 0, 0], dom=sympy.GF(5), backend="numpy")
+        self.assertTrue(n.is_zero)
+        self.assertTrue(d.is_zero)
+
+class TestSubresultant(unittest.TestCase):
+    """ Ensures the fraction-free XGCD agrees with the XGCD over QQ. """
+
+    def test_order_2_fib(self):
+        """ Reconstructs a{0} = 1, a{1} = 1, a{i} = a{i-1} + a{i-2}, over ZZ. """
+        (n, d) = symbaudio.compression.xgcd.reconstruct_rational(
+            3, [1,1,2,3,5,8], dom="ZZ", algorithm="subresultant", normalized=True)
+        self.assertEqual(n.all_coeffs(), [1])
+        self.assertEqual(d.all_coeffs(), [-1,-1,1])
+
+    def test_agrees_with_rational(self):
+        """ The normalized results are equal, and the coefficients are integral. """
+        rng = numpy.random.RandomState(0)
+        for width in [2, 8, 32, 48]:
+            for frame in [rng.randint(-2 ** 15, 2 ** 15, width), rng.randint(-2, 3, width)]:
+                frame = [int(x) for x in frame]
+                (n, d) = symbaudio.compression.xgcd.reconstruct_rational(
+                    width // 2, frame, dom="ZZ", algorithm="auto")
+                self.assertEqual(n.domain, sympy.ZZ)
+                expected = symbaudio.compression.xgcd.reconstruct_rational(
+                    width // 2, frame, normalized=True)
+                self.assertEqual(symbaudio.compression.xgcd.normalize(n.to_field(), d.to_field()),
+                                 expected)
+
+    def test_budget(self):
+        """ The fraction-free XGCD checks the budget after each iteration. """
+        frame = list(numpy.random.RandomState(0).randint(-2 ** 15, 2 ** 15, 32))
+        budget = symbaudio.compression.xgcd.Budget(max_bits=64)
+        result = symbaudio.compression.xgcd.reconstruct_rational(
+            16, frame, dom="ZZ", algorithm="subresultant", budget=budget)
+        self.assertIsNone(result)
+        self.assertEqual(budget.status, "bits")
+
+class TestBudget(unittest.TestCase):
+    """ Ensures budgets abandon reconstructions, and otherwise have no effect. """
+
+    def setUp(self):
+        """ Generates a noisy frame, whose rational coefficients grow quickly. """
+        self.frame = list(numpy.random.RandomState(0).randint(-2 ** 15, 2 ** 15, 32))
+
+    def test_within_budget(self):
+        """ A sufficient budget produces the same result. """
+        for (dom, backend) in [("QQ", "sympy"), (sympy.GF(65537), "numpy")]:
+            budget = symbaudio.compression.xgcd.Budget(max_iterations=16, max_bits=10 ** 6)
+            result = symbaudio.compression.xgcd.reconstruct_rational(
+                16, self.frame, dom, backend, budget=budget)
+            expected = symbaudio.compression.xgcd.reconstruct_rational(16, self.frame, dom, backend)
+            self.assertEqual(result, expected)
+            self.assertEqual(budget.status, "ok")
+            self.assertEqual(budget.iterations, 16)
+
+    def test_exceeded(self):
+        """ Each limit abandons the reconstruction, and is named by the status. """
+        Budget = symbaudio.compression.xgcd.Budget
+        for (budget, status) in [(Budget(max_bits=64), "bits"),
+                                 (Budget(max_iterations=4), "iterations"),
+                                 (Budget(max_ns=0), "time")]:
+            result = symbaudio.compression.xgcd.reconstruct_rational(16, self.frame, budget=budget)
+            self.assertIsNone(result)
+            self.assertEqual(budget.status, status)
+
+    def test_numpy_backend(self):
+        """ The numpy backend checks the budget after each iteration. """
+        budget = symbaudio.compression.xgcd.Budget(max_iterations=4)
+        result = symbaudio.compression.xgcd.reconstruct_rational(
+            16, self.frame, sympy.GF(65537), "numpy", budget=budget)
+        self.assertIsNone(result)
+        self.assertEqual((budget.status, budget.iterations), ("iterations", 5))
+
+    def test_halfgcd(self):
+        """ The halfgcd algorithm checks the width of its result. """
+        budget = symbaudio.compression.xgcd.Budget(max_bits=64)
+        result = symbaudio.compression.xgcd.reconstruct_rational(
+            16, self.frame, algorithm="halfgcd", budget=budget)
+        self.assertIsNone(result)
+        self.assertEqual(budget.status, "bits")
+
+class TestNormalize(unittest.TestCase):
+    """ Tests the canonical scaling of rational generating functions. """
+
+    def test_constant_term(self):
+        """ The constant term of the denominator becomes one. """
+        (n, d) = symbaudio.compression.xgcd.reconstruct_rational(2, [1, 1, 2, 3])
+        (n, d) = symbaudio.compression.xgcd.normalize(n, d)
+        self.assertEqual(n.all_coeffs(), [1])
+        self.assertEqual(d.all_coeffs(), [-1, -1, 1])
+
+    def test_no_constant_term(self):
+        """ The lowest order coefficient is used without a constant term. """
+        n = sympy.Poly([4], sympy.abc.x, domain="QQ")
+        d = sympy.Poly([2, 4, 0], sympy.abc.x, domain="QQ")
+        (n, d) = symbaudio.compression.xgcd.normalize(n, d)
+        self.assertEqual(n.all_coeffs(), [1])
+        self.assertEqual(d.all_coeffs(), [sympy.Rational(1, 2), 1, 0])
+
+    def test_zero(self):
+        """ A zero denominator is left as is. """
+        zero = sympy.Poly([0], sympy.abc.x, domain="QQ")
+        self.assertEqual(symbaudio.compression.xgcd.normalize(zero, zero), (zero, zero))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+import numpy
+import os
+import scipy.io.wavfile
+import shutil
+import tempfile
+import unittest
+
+import harness
+import symbaudio.utils.bench
+
+class TestFixtures(unittest.TestCase):
+    """ Validates the synthesized wave files. """
+
+    def setUp(self):
+        """ Sets up a temp dir for each test. """
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Cleans up temporary directory. """
+        shutil.rmtree(self.tempdir)
+
+    def test_write_fixture(self):
+        """ The fixture has the requested shape and type, and is reproducible. """
+        fns = [os.path.join(self.tempdir, "%i.wav" % i) for i in range(0, 2)]
+        for fn in fns:
+            symbaudio.utils.bench.write_fixture(fn, 0.5, 8000, channels=2, dtype=numpy.int32)
+        (rate, a) = scipy.io.wavfile.read(fns[0])
+        (_, b) = scipy.io.wavfile.read(fns[1])
+        self.assertEqual(rate, 8000)
+        self.assertEqual(a.shape, (4000, 2))
+        self.assertEqual(a.dtype, numpy.int32)
+        self.assertGreater(numpy.max(numpy.abs(a)), 2 ** 29)
+        numpy.testing.assert_array_equal(a, b)
+
+class TestMeasure(unittest.TestCase):
+    """ Validates timing, allocation tracking and baseline comparisons. """
+
+    def test_measure(self):
+        """ Every call is made, and the statistics are ordered. """
+        calls = []
+        stats = symbaudio.utils.bench.measure(lambda: calls.append(bytearray(1 << 20)),
+                                              repeats=4, warmup=2)
+        self.assertEqual(len(calls), 7)
+        self.assertLessEqual(stats["median_ns"], stats["p95_ns"])
+        self.assertGreaterEqual(stats["peak_bytes"], 1 << 20)
+
+    def test_measure_no_allocations(self):
+        """ Allocations are not traced on request. """
+        stats = symbaudio.utils.bench.measure(lambda: None, allocations=False)
+        self.assertNotIn("peak_bytes", stats)
+
+    def test_run_isolated(self):
+        """ The call is made in another process, which reports its peak RSS. """
+        (result, rss) = symbaudio.utils.bench.run_isolated(sorted, [3, 1, 2])
+        self.assertEqual(result, [1, 2, 3])
+        if symbaudio.utils.bench.peak_rss() is not None:
+            self.assertGreater(rss, 0)
+
+    def test_compare(self):
+        """ Only slowdowns beyond the threshold are regressions. """
+        baseline = {"a": {"median_ns": 100}, "b": {"median_ns": 100}, "c": {"median_ns": 100}}
+        results = {"a": {"median_ns": 110}, "b": {"median_ns": 150}, "d": {"median_ns": 1}}
+        regressions = symbaudio.utils.bench.compare(results, baseline, threshold=0.2)
+        self.assertEqual(regressions, [("b", 100, 150, 1.5)])
+
+    def test_baseline(self):
+        """ Results survive a round trip through a baseline file. """
+        tempdir = tempfile.mkdtemp()
+        try:
+            fn = os.path.join(tempdir, "baseline.json")
+            results = {"a": {"median_ns": 1.5, "peak_bytes": 10}}
+            symbaudio.utils.bench.save_baseline(fn, results)
+            self.assertEqual(symbaudio.utils.bench.load_baseline(fn), results)
+        finally:
+            shutil.rmtree(tempdir)
+
+if __name__ == '__main__':
+    unittest.main()
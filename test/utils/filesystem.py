@@ -1,3 +1,5 @@
+import contextlib
+import io
 import os
 import shutil
 import tempfile
@@ -5,6 +7,7 @@ import unittest
 
 import harness
 import symbaudio.utils.filesystem
+import symbaudio.utils.manifest
 
 class CallCounter:
     """ A callable object which counts the number of times it is called. """
@@ -17,6 +20,15 @@ class CallCounter:
         """ Intercepts each call with a counter increment. """
         self.count = self.count + 1
 
+def file_size(target, rel):
+    """ A picklable callback which returns the size of each file. """
+    return os.path.getsize(target)
+
+def print_lines(target, rel):
+    """ A picklable callback which prints several lines per file. """
+    for i in range(0, 3):
+        print("%s %i" % (rel, i))
+
 class TestApplyToFiles(unittest.TestCase):
     """ Validates the behaviour of apply_to_files over a temp dir. """
 
@@ -73,5 +85,102 @@ class TestApplyToFiles(unittest.TestCase):
         """ Ensures filtering by extension works. """
         self.run_scan(self.tempdir, self.root_fcount + self.nest_fcount, ext=".txt")
 
+    def run_parallel(self, path, ordered=False):
+        """ Scans a path in parallel, and returns the output lines. """
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            symbaudio.utils.filesystem.apply_to_files_parallel(
+                path, ".txt", print_lines, workers=2, enable_logs=False, ordered=ordered)
+        return out.getvalue().splitlines()
+
+    def test_parallel_scan(self):
+        """ Ensures each file is processed once, with contiguous output. """
+        lines = self.run_parallel(self.tempdir)
+        self.assertEqual(len(lines), 3 * (self.root_fcount + self.nest_fcount))
+        for i in range(0, len(lines), 3):
+            rel = lines[i].split(" ")[0]
+            self.assertEqual(lines[i:i+3], ["%s %i" % (rel, j) for j in range(0, 3)])
+        self.assertEqual(len(set(lines)), len(lines))
+
+    def test_parallel_ordered(self):
+        """ Ensures an ordered scan matches the order of a serial scan. """
+        serial = io.StringIO()
+        with contextlib.redirect_stdout(serial):
+            symbaudio.utils.filesystem.apply_to_files(
+                self.tempdir, ".txt", print_lines, enable_logs=False)
+        lines = self.run_parallel(self.tempdir, ordered=True)
+        self.assertEqual(lines, serial.getvalue().splitlines())
+
+    def test_collect(self):
+        """ Ensures the result of each file is collected, serially and in parallel. """
+        for parallel in [False, True]:
+            results = {}
+            collect = lambda rel, result: results.__setitem__(rel, result)
+            if parallel:
+                symbaudio.utils.filesystem.apply_to_files_parallel(
+                    self.tempdir, ".txt", file_size, workers=2, enable_logs=False,
+                    collect=collect)
+            else:
+                symbaudio.utils.filesystem.apply_to_files(
+                    self.tempdir, ".txt", file_size, enable_logs=False, collect=collect)
+            self.assertEqual(len(results), self.root_fcount + self.nest_fcount)
+            self.assertEqual(set(results.values()), {5})
+
+    def run_incremental(self, parallel):
+        """ Scans the temp dir twice against a manifest, and returns both outputs. """
+        fn = os.path.join(self.emptydir, "manifest.jsonl")
+        outputs = []
+        for i in range(0, 2):
+            manifest = symbaudio.utils.manifest.Manifest(fn, {"test": 1})
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                if parallel:
+                    symbaudio.utils.filesystem.apply_to_files_parallel(
+                        self.tempdir, ".txt", print_lines, workers=2, enable_logs=False,
+                        manifest=manifest)
+                else:
+                    symbaudio.utils.filesystem.apply_to_files(
+                        self.tempdir, ".txt", print_lines, enable_logs=False,
+                        manifest=manifest)
+            outputs.append(out.getvalue().splitlines())
+            if i == 0:
+                with open(os.path.join(self.subdir, "new.txt"), "w+") as f:
+                    f.write("Test.")
+        return outputs
+
+    def test_incremental_scan(self):
+        """ Ensures a manifest skips processed files on a later scan. """
+        (first, second) = self.run_incremental(False)
+        self.assertEqual(len(first), 3 * (self.root_fcount + self.nest_fcount))
+        self.assertEqual(second, ["%s %i" % (os.path.join("dir", "new.txt"), j)
+                                  for j in range(0, 3)])
+
+    def test_flush(self):
+        """ Ensures collected results are flushed before each file is recorded. """
+        for parallel in [False, True]:
+            fn = os.path.join(self.emptydir, "manifest%i.jsonl" % parallel)
+            manifest = symbaudio.utils.manifest.Manifest(fn, {"test": 1})
+            events = []
+            record = manifest.record
+            manifest.record = lambda target, rel: (events.append("record"), record(target, rel))
+            kwargs = {"enable_logs": False, "manifest": manifest,
+                      "collect": lambda rel, result: events.append("collect"),
+                      "flush": lambda: events.append("flush")}
+            if parallel:
+                symbaudio.utils.filesystem.apply_to_files_parallel(
+                    self.tempdir, ".txt", file_size, workers=2, **kwargs)
+            else:
+                symbaudio.utils.filesystem.apply_to_files(
+                    self.tempdir, ".txt", file_size, **kwargs)
+            self.assertEqual(events, ["collect", "flush", "record"] *
+                             (self.root_fcount + self.nest_fcount))
+
+    def test_incremental_parallel(self):
+        """ Ensures a manifest skips processed files on a later parallel scan. """
+        (first, second) = self.run_incremental(True)
+        self.assertEqual(len(first), 3 * (self.root_fcount + self.nest_fcount))
+        self.assertEqual(second, ["%s %i" % (os.path.join("dir", "new.txt"), j)
+                                  for j in range(0, 3)])
+
 if __name__ == '__main__':
     unittest.main()
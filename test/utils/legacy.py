@@ -0,0 +1,81 @@
+import numpy
+import os
+import shutil
+import tempfile
+import unittest
+
+import harness
+import symbaudio.utils.legacy
+import symbaudio.utils.results
+
+class TestLegacyDumps(unittest.TestCase):
+    """ Validates parsing of the legacy text dumps. """
+
+    def setUp(self):
+        """ Sets up a temp dir for each test. """
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Cleans up temporary directory. """
+        shutil.rmtree(self.tempdir)
+
+    def write(self, name, text):
+        """ Writes a dump to the temp dir, and returns its path. """
+        fn = os.path.join(self.tempdir, name)
+        with open(fn, "w+") as f:
+            f.write(text)
+        return fn
+
+    def test_compression(self):
+        """ Rows are attributed to the preceding file, with typed columns. """
+        fn = self.write("rational_64.txt",
+                        "a b.wav\n0,10,15,1,2,3\n1,20,%i,4,5,6\nc.wav\n0,30,99,7,8,9\n" % 10 ** 40)
+        results = symbaudio.utils.legacy.parse_dump(fn)
+        self.assertEqual(list(results.files), ["a b.wav", "c.wav"])
+        self.assertEqual(list(results.file_ids), [0, 0, 1])
+        self.assertEqual(results["ns"].dtype, numpy.int64)
+        self.assertEqual(list(results["max_coeff"]), ["15", str(10 ** 40), "99"])
+        self.assertEqual(list(results["max_coeff_bits"]), [4, 133, 7])
+        self.assertEqual(list(results["framewidth"]), [64, 64, 64])
+        self.assertEqual(list(results.for_file("c.wav")["coeff_cnt"]), [9])
+
+    def test_query_max_coeff(self):
+        """ The maximum coefficient is queried by its bit length. """
+        fn = self.write("rational_64.txt", "a.wav\n0,10,15,1,2,3\n1,20,%i,4,5,6\n" % 10 ** 40)
+        results = symbaudio.utils.legacy.parse_dump(fn)
+        (keys, table) = symbaudio.utils.results.percentiles(results, "max_coeff", [0, 100])
+        self.assertEqual(list(keys), ["a.wav"])
+        numpy.testing.assert_allclose(table, [[4, 133]])
+
+    def test_compression_status(self):
+        """ Rows of budgeted runs are loaded with their status. """
+        fn = os.path.join(self.tempdir, "rational_64.txt")
+        with symbaudio.utils.results.open_writer(
+                "text", fn, [], "%i,%i,%i,%i,%i,%i,%s", layout="header") as writer:
+            writer.write("a.wav", [(0, 10, 15, 1, 2, 3, "ok"), (1, 20, -1, -1, 5, -1, "bits")])
+        results = symbaudio.utils.legacy.parse_dump(fn)
+        self.assertEqual(list(results["status"]), ["ok", "bits"])
+        self.assertEqual(list(results["max_coeff_bits"]), [4, -1])
+        self.assertEqual(list(results["coeff_cnt"]), [3, -1])
+        (_, table) = symbaudio.utils.results.percentiles(results, "ns", [50], by="status")
+        numpy.testing.assert_allclose(table, [[20], [10]])
+
+    def test_compression_framewidth(self):
+        """ The frame width must be given, if it cannot be inferred. """
+        fn = self.write("dump.txt", "0,10,1,1,2,3\n")
+        results = symbaudio.utils.legacy.parse_compression_dump(fn, framewidth=32)
+        self.assertEqual(list(results.files), [""])
+        self.assertEqual(list(results["framewidth"]), [32])
+
+    def test_metrics(self):
+        """ File names may contain spaces, and comments are skipped. """
+        fn = self.write("audio_metrics.txt",
+                        "# header\na b.wav 1.5 8000 1 2 3 4 5 6 7 8\n"
+                        "c.wav 2 44100 0 0 0 0 0 0 0 0\n")
+        results = symbaudio.utils.legacy.parse_dump(fn)
+        self.assertEqual(list(results.files), ["a b.wav", "c.wav"])
+        self.assertEqual(list(results["rate"]), [8000, 44100])
+        self.assertEqual(list(results["zeros_mod"]), [8.0, 0.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import harness
+import symbaudio.utils.manifest
+
+class TestManifest(unittest.TestCase):
+    """ Validates the records kept by Manifest. """
+
+    def setUp(self):
+        """ Sets up a temp dir with a single file. """
+        self.tempdir = tempfile.mkdtemp()
+        self.fn = os.path.join(self.tempdir, "manifest.jsonl")
+        self.target = os.path.join(self.tempdir, "a.txt")
+        with open(self.target, "w+") as f:
+            f.write("Test.")
+
+    def tearDown(self):
+        """ Cleans up temporary directory. """
+        shutil.rmtree(self.tempdir)
+
+    def test_new_file(self):
+        """ Ensures an unrecorded file is not current. """
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 1})
+        self.assertFalse(manifest.is_current(self.target, "a.txt"))
+        self.assertEqual(len(manifest), 0)
+
+    def test_record_persists(self):
+        """ Ensures records are visible to later manifests. """
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 1})
+        manifest.record(self.target, "a.txt")
+        self.assertTrue(manifest.is_current(self.target, "a.txt"))
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 1})
+        self.assertTrue(manifest.is_current(self.target, "a.txt"))
+        self.assertEqual(len(manifest), 1)
+
+    def test_params_differ(self):
+        """ Ensures records are scoped by parameters. """
+        symbaudio.utils.manifest.Manifest(self.fn, {"x": 1}).record(self.target, "a.txt")
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 2})
+        self.assertFalse(manifest.is_current(self.target, "a.txt"))
+
+    def test_modified_file(self):
+        """ Ensures a modified file is no longer current. """
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 1})
+        manifest.record(self.target, "a.txt")
+        with open(self.target, "a") as f:
+            f.write("More.")
+        self.assertFalse(manifest.is_current(self.target, "a.txt"))
+
+    def test_truncated_record(self):
+        """ Ensures a partially written record is ignored, and not appended to. """
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 1})
+        manifest.record(self.target, "a.txt")
+        with open(self.fn, "a") as f:
+            f.write('{"rel": "b.t')
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 1})
+        self.assertTrue(manifest.is_current(self.target, "a.txt"))
+        self.assertEqual(len(manifest), 1)
+        manifest.record(self.target, "b.txt")
+        manifest = symbaudio.utils.manifest.Manifest(self.fn, {"x": 1})
+        self.assertTrue(manifest.is_current(self.target, "b.txt"))
+        self.assertEqual(len(manifest), 2)
+
+if __name__ == '__main__':
+    unittest.main()
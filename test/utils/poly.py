@@ -1,3 +1,4 @@
+import numpy
 import sympy
 import sympy.abc
 import unittest
@@ -27,6 +28,8 @@ class TestMaxCoeff(unittest.TestCase):
         self.assertEqual(symbaudio.utils.poly.max_coeff(p1), 7)
         self.assertEqual(symbaudio.utils.poly.max_coeff(p2), 0)
         self.assertEqual(symbaudio.utils.poly.max_coeff(p3), 10)
+        p4 = sympy.Poly([-12, 5], sympy.abc.x, domain="ZZ")
+        self.assertEqual(symbaudio.utils.poly.max_coeff(p4), 12)
 
     def test_finite_field(self):
         """ Ensures finite fields work in the finite field case. """
@@ -55,5 +58,49 @@ class TestCountZeros(unittest.TestCase):
         p = sympy.Poly([0, 0, 1, 1, 0, 1, 0, 0, 1, 0, 0], sympy.abc.x, domain=sympy.GF(11))
         self.assertEqual(symbaudio.utils.poly.count_zeros(p), 5)
 
+class TestCompactPoly(unittest.TestCase):
+    """ Tests conversions and statistics of CompactPoly. """
+
+    def test_round_trip(self):
+        """ Polys are recovered from their compact form, in each domain. """
+        x = sympy.abc.x
+        polys = [sympy.Poly([sympy.Rational(-3, 4), 0, 2, sympy.Rational(1, 7)], x, domain="QQ"),
+                 sympy.Poly([2 ** 80, -5, 0], x, domain="ZZ"),
+                 sympy.Poly([10, 0, 3], x, domain=sympy.GF(11)),
+                 sympy.Poly([0], x, domain="QQ")]
+        for poly in polys:
+            compact = symbaudio.utils.poly.from_poly(poly)
+            self.assertEqual(compact.to_poly(), poly)
+            self.assertEqual(compact.domain(), poly.domain)
+        self.assertEqual(symbaudio.utils.poly.from_poly(polys[1]).coeffs.dtype, object)
+        self.assertEqual(symbaudio.utils.poly.from_poly(polys[2]).coeffs.dtype, numpy.int64)
+
+    def test_statistics(self):
+        """ Checks the degree, widths and zeros of a rational polynomial. """
+        poly = sympy.Poly([0, sympy.Rational(-300, 7), 0, sympy.Rational(5, 1024)], sympy.abc.x,
+                          domain="QQ")
+        compact = symbaudio.utils.poly.from_poly(poly)
+        self.assertEqual(compact.degree(), 2)
+        self.assertEqual(compact.max_coeff(), 1024)
+        self.assertEqual(compact.count_zeros(), 1)
+        self.assertEqual(list(compact.bit_lengths()), [9, 1, 11])
+        self.assertEqual(compact.bit_length(), 11)
+
+    def test_bit_lengths(self):
+        """ Bit lengths are exact near powers of two, for int64 and wide coefficients. """
+        values = [0, 1, 2, 3, 2 ** 53 + 1, -(2 ** 62), 2 ** 63 - 1]
+        compact = symbaudio.utils.poly.CompactPoly(numpy.array(values, dtype=numpy.int64))
+        self.assertEqual(list(compact.bit_lengths()), [abs(v).bit_length() for v in values])
+        wide = symbaudio.utils.poly.from_poly(sympy.Poly([-(2 ** 64), 1], sympy.abc.x, domain="ZZ"))
+        self.assertEqual(list(wide.bit_lengths()), [65, 1])
+
+    def test_residues(self):
+        """ Wraps residues from symbaudio.compression.modular. """
+        compact = symbaudio.utils.poly.from_residues([3, 0, 5], 7)
+        self.assertEqual(compact.to_poly(), sympy.Poly([3, 0, 5], sympy.abc.x, domain=sympy.GF(7)))
+        zero = symbaudio.utils.poly.from_residues([], 7)
+        self.assertEqual(zero.degree(), -1)
+        self.assertEqual(zero.count_zeros(), 1)
+
 if __name__ == '__main__':
     unittest.main()
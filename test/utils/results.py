@@ -0,0 +1,162 @@
+import io
+import numpy
+import os
+import shutil
+import tempfile
+import unittest
+
+import harness
+import symbaudio.utils.results
+
+COLUMNS = [("frame", numpy.int64), ("ns", numpy.int64), ("label", str)]
+
+ROWS = {"a.wav": [(1, 10, "x"), (2, 20, "y")],
+        "b.wav": [(3, 30, "z")],
+        "c.wav": [(4, 40, "x"), (5, 50, "y"), (6, 60, "z")]}
+
+class TestTextWriter(unittest.TestCase):
+    """ Validates the text layouts of TextWriter. """
+
+    def test_prefix(self):
+        """ Each row is preceded by its file. """
+        out = io.StringIO()
+        with symbaudio.utils.results.TextWriter(out, "%i %i %s") as writer:
+            writer.write("a.wav", ROWS["a.wav"])
+        self.assertEqual(out.getvalue(), "a.wav 1 10 x\na.wav 2 20 y\n")
+
+    def test_header(self):
+        """ Each file is written on its own line, before its rows. """
+        out = io.StringIO()
+        with symbaudio.utils.results.TextWriter(out, "%i,%i", layout="header") as writer:
+            writer.comment("frame ns")
+            writer.write("b.wav", [(3, 30)])
+            writer.write("", [(4, 40)])
+        self.assertEqual(out.getvalue(), "# frame ns\nb.wav\n3,30\n4,40\n")
+
+    def test_bad_row(self):
+        """ Rows which cannot be formatted are skipped. """
+        out = io.StringIO()
+        writer = symbaudio.utils.results.TextWriter(out, "%i", layout="header")
+        writer.write("a.wav", [(1,), ("x",), (3,)])
+        self.assertEqual(out.getvalue(), "a.wav\n1\n3\n")
+
+class TestColumnarWriters(unittest.TestCase):
+    """ Validates round trips through the columnar writers. """
+
+    def setUp(self):
+        """ Sets up a temp dir for each test. """
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Cleans up temporary directory. """
+        shutil.rmtree(self.tempdir)
+
+    def check_round_trip(self, results):
+        """ Ensures every row is loaded, with the correct file and types. """
+        self.assertEqual(len(results), 6)
+        self.assertEqual(sorted(results.files), ["a.wav", "b.wav", "c.wav"])
+        self.assertEqual(results["frame"].dtype, numpy.int64)
+        self.assertEqual(sorted(results["frame"]), [1, 2, 3, 4, 5, 6])
+        for (rel, rows) in ROWS.items():
+            selected = results.for_file(rel)
+            self.assertEqual(list(selected["ns"]), [row[1] for row in rows])
+            self.assertEqual(list(selected["label"]), [row[2] for row in rows])
+
+    def test_npz(self):
+        """ Rows are written in parts, which may be extended by later runs. """
+        path = os.path.join(self.tempdir, "results")
+        with symbaudio.utils.results.NpzWriter(path, COLUMNS, bufsize=2) as writer:
+            writer.write("a.wav", ROWS["a.wav"])
+            writer.write("b.wav", ROWS["b.wav"])
+        self.assertEqual(len(os.listdir(path)), 2)
+        with symbaudio.utils.results.open_writer("npz", path, COLUMNS) as writer:
+            writer.write("c.wav", ROWS["c.wav"])
+        self.check_round_trip(symbaudio.utils.results.read_results(path))
+
+    @unittest.skipIf(symbaudio.utils.results.pyarrow is None, "requires pyarrow")
+    def test_parquet(self):
+        """ Rows are written in parts, which may be extended by later runs. """
+        path = os.path.join(self.tempdir, "results")
+        with symbaudio.utils.results.ParquetWriter(path, COLUMNS, bufsize=2) as writer:
+            writer.write("a.wav", ROWS["a.wav"])
+            writer.write("b.wav", ROWS["b.wav"])
+        self.assertEqual(len(os.listdir(path)), 2)
+        with symbaudio.utils.results.open_writer("parquet", path, COLUMNS) as writer:
+            writer.write("c.wav", ROWS["c.wav"])
+        self.check_round_trip(symbaudio.utils.results.read_results(path))
+        with self.assertRaises(ValueError):
+            symbaudio.utils.results.ParquetWriter(os.path.join(path, "part-00000.parquet"), COLUMNS)
+
+    def test_store(self):
+        """ Rows are grouped by file, and the columns are memory-mapped. """
+        path = os.path.join(self.tempdir, "results")
+        with symbaudio.utils.results.NpzWriter(path, COLUMNS) as writer:
+            writer.write("c.wav", ROWS["c.wav"][:1])
+            writer.write("a.wav", ROWS["a.wav"])
+            writer.write("b.wav", ROWS["b.wav"])
+            writer.write("c.wav", ROWS["c.wav"][1:])
+        store = os.path.join(self.tempdir, "store")
+        symbaudio.utils.results.save_store(store, symbaudio.utils.results.read_results(path))
+        results = symbaudio.utils.results.read_results(store)
+        self.assertIsInstance(results["ns"], numpy.memmap)
+        self.assertEqual(list(results.files), ["c.wav", "a.wav", "b.wav", "c.wav"])
+        self.assertEqual(list(results.offsets), [0, 1, 3, 4, 6])
+        for (rel, rows) in ROWS.items():
+            selected = results.for_file(rel)
+            self.assertEqual(list(selected["ns"]), [row[1] for row in rows])
+            self.assertEqual(list(selected["label"]), [row[2] for row in rows])
+
+    def test_unbounded(self):
+        """ Unbounded ints are written exactly by every format. """
+        columns = [("frame", numpy.int64), ("max_coeff", int)]
+        rows = [(0, 10 ** 400), (1, -1), (2, 3)]
+        for fmt in symbaudio.utils.results.FORMATS:
+            if fmt == "parquet" and symbaudio.utils.results.pyarrow is None:
+                continue
+            path = os.path.join(self.tempdir, fmt)
+            with symbaudio.utils.results.open_writer(fmt, path, columns, "%i,%i") as writer:
+                writer.write("a.wav", rows)
+            if fmt == "text":
+                with open(path) as f:
+                    self.assertEqual(f.read().split("\n")[0], "a.wav 0,%i" % 10 ** 400)
+                continue
+            results = symbaudio.utils.results.read_results(path)
+            self.assertEqual([int(value) for value in results["max_coeff"]], [10 ** 400, -1, 3])
+            self.assertEqual(list(results["max_coeff_bits"]), [1329, -1, 2])
+
+class TestQueries(unittest.TestCase):
+    """ Validates combining and querying result sets. """
+
+    def make_results(self, rels):
+        """ Loads the rows of the given files. """
+        path = tempfile.mkdtemp()
+        try:
+            with symbaudio.utils.results.NpzWriter(path, COLUMNS) as writer:
+                for rel in rels:
+                    writer.write(rel, ROWS[rel])
+            return symbaudio.utils.results.read_results(path)
+        finally:
+            shutil.rmtree(path)
+
+    def test_concatenate(self):
+        """ The file ids of later result sets are offset. """
+        results = symbaudio.utils.results.concatenate(
+            [self.make_results(["a.wav"]), self.make_results(["b.wav", "c.wav"])])
+        self.assertEqual(len(results), 6)
+        self.assertEqual(list(results.for_file("c.wav")["frame"]), [4, 5, 6])
+
+    def test_percentiles(self):
+        """ Rows are grouped by file name, or by column. """
+        results = symbaudio.utils.results.concatenate(
+            [self.make_results(["a.wav", "b.wav"]), self.make_results(["a.wav"])])
+        (keys, table) = symbaudio.utils.results.percentiles(results, "ns", [0, 50, 100])
+        self.assertEqual(list(keys), ["a.wav", "b.wav"])
+        numpy.testing.assert_allclose(table, [[10, 15, 20], [30, 30, 30]])
+        (keys, table) = symbaudio.utils.results.percentiles(results, "frame", [50], by="label")
+        self.assertEqual(list(keys), ["x", "y", "z"])
+        numpy.testing.assert_allclose(table, [[1], [2], [3]])
+        with self.assertRaises(ValueError):
+            symbaudio.utils.results.percentiles(results, "label", [50])
+
+if __name__ == '__main__':
+    unittest.main()
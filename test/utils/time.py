@@ -1,3 +1,6 @@
+import json
+import os
+import tempfile
 import time
 import unittest
 
@@ -22,5 +25,71 @@ class TestPerfTimer(unittest.TestCase):
         t2 = timer._start
         self.assertGreater(t2, t1)
 
+class TestProfiler(unittest.TestCase):
+    """ Validates the scopes, counters and histograms of Profiler. """
+
+    def test_disabled(self):
+        """ Nothing is recorded by default. """
+        profiler = symbaudio.utils.time.Profiler()
+        with profiler.scope("a"):
+            profiler.count("n")
+            profiler.observe("h", 3)
+        self.assertEqual(profiler.summary(), {"timings": {}, "counters": {}, "histograms": {}})
+
+    def test_scopes(self):
+        """ Nested scopes and decorated functions are recorded by path. """
+        profiler = symbaudio.utils.time.Profiler()
+        profiler.enable()
+
+        @profiler.timed("f")
+        def f(x):
+            """ Doubles x. """
+            with profiler.scope("g"):
+                return 2 * x
+
+        with profiler.scope("a"):
+            self.assertEqual(f(1), 2)
+            self.assertEqual(f(2), 4)
+        self.assertEqual(f(3), 6)
+        self.assertEqual(f.__doc__.strip(), "Doubles x.")
+        timings = profiler.summary()["timings"]
+        self.assertEqual(sorted(timings), ["a", "a/f", "a/f/g", "f", "f/g"])
+        self.assertEqual(timings["a/f"]["count"], 2)
+        self.assertGreaterEqual(timings["a"]["total_ns"], timings["a/f"]["total_ns"])
+
+    def test_counters(self):
+        """ Counters accumulate, and histograms bucket by bit length. """
+        profiler = symbaudio.utils.time.Profiler()
+        profiler.enable()
+        profiler.count("n")
+        profiler.count("n", 4)
+        for value in [0, 1, 2, 3, 8]:
+            profiler.observe("h", value)
+        summary = profiler.summary()
+        self.assertEqual(summary["counters"], {"n": 5})
+        histogram = summary["histograms"]["h"]
+        self.assertEqual((histogram["count"], histogram["sum"]), (5, 14))
+        self.assertEqual((histogram["min"], histogram["max"]), (0, 8))
+        self.assertEqual(histogram["buckets"], {"0": 1, "1": 1, "2": 2, "4": 1})
+
+    def test_dump(self):
+        """ The profile is written as JSON. """
+        profiler = symbaudio.utils.time.Profiler()
+        profiler.enable()
+        profiler.record("a", 10)
+        profiler.record("a", 30)
+        (fd, fn) = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            profiler.dump(fn)
+            with open(fn) as f:
+                timing = json.load(f)["timings"]["a"]
+        finally:
+            os.remove(fn)
+        self.assertEqual(timing, {"count": 2, "total_ns": 40, "mean_ns": 20,
+                                  "min_ns": 10, "max_ns": 30})
+        profiler.reset()
+        self.assertEqual(profiler.summary()["timings"], {})
+
 if __name__ == '__main__':
     unittest.main()